@@ -0,0 +1,323 @@
+import ast
+import json
+import math
+import os
+import string
+import threading
+from typing import Dict, List, Callable, Optional, Tuple, Any
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# The only placeholder a prompt template may use
+TEXT_FIELD = 'text'
+
+# Ollama reloads the model whenever num_ctx changes, so context sizes snap to a few buckets
+CONTEXT_BUCKETS = (2048, 4096, 8192, 16384, 32768)
+# Room above the expected output length so answers aren't cut off mid-sentence
+OUTPUT_HEADROOM = 1.5
+
+class PromptTemplateError(ValueError):
+    """Raised when a prompt template can't be compiled"""
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four ASCII characters per token, one token per other character"""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+class ContextSizes:
+    """The largest context size requested so far for each model
+
+    Ollama reloads the model whenever num_ctx changes, so once a model has been asked
+    for a bucket, smaller requests reuse it instead of shrinking the context and
+    reloading (which would also drop the cached prompt prefix).
+    """
+
+    def __init__(self):
+        self.sizes = {}
+        self._lock = threading.Lock()
+
+    def fit(self, model: str, num_ctx: int) -> int:
+        with self._lock:
+            size = max(num_ctx, self.sizes.get(model, 0))
+            self.sizes[model] = size
+        return size
+
+# Shared by all modules
+context_sizes = ContextSizes()
+
+class GenerationProfile:
+    """Per-template generation options, sized from the length of the input text"""
+
+    def __init__(self, output_ratio: float = 1.5, min_tokens: int = 256, max_tokens: int = 4096,
+                 temperature: Optional[float] = None, stop: Optional[List[str]] = None,
+                 spell_prepass: bool = False):
+        self.output_ratio = output_ratio
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stop = list(stop or [])
+        # Only safe for prompts that fix spelling alone: a dictionary can't see grammar mistakes
+        self.spell_prepass = spell_prepass
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GenerationProfile':
+        """Build a profile from its JSON form, raising PromptTemplateError on bad values"""
+        try:
+            profile = cls(
+                output_ratio=float(data.get('output_ratio', 1.5)),
+                min_tokens=int(data.get('min_tokens', 256)),
+                max_tokens=int(data.get('max_tokens', 4096)),
+                temperature=None if data.get('temperature') is None else float(data['temperature']),
+                stop=[str(s) for s in data.get('stop', [])],
+                spell_prepass=bool(data.get('spell_prepass', False))
+            )
+        except (TypeError, ValueError) as e:
+            raise PromptTemplateError(f"Invalid generation profile: {e}")
+        if profile.output_ratio <= 0:
+            raise PromptTemplateError("Output ratio must be positive")
+        if not 0 < profile.min_tokens <= profile.max_tokens:
+            raise PromptTemplateError("Token limits must satisfy 0 < min <= max")
+        if profile.temperature is not None and not 0 <= profile.temperature <= 2:
+            raise PromptTemplateError("Temperature must be between 0 and 2")
+        return profile
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'output_ratio': self.output_ratio,
+            'min_tokens': self.min_tokens,
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'stop': list(self.stop),
+            'spell_prepass': self.spell_prepass
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, GenerationProfile) and self.to_dict() == other.to_dict()
+
+    def options(self, prompt: str, text: str, model: Optional[str] = None) -> Dict[str, Any]:
+        """Ollama options for a request whose full prompt is prompt and whose input text is text
+
+        With a model, num_ctx never drops below the largest size already used for it.
+        """
+        expected = estimate_tokens(text) * self.output_ratio * OUTPUT_HEADROOM
+        num_predict = max(self.min_tokens, min(self.max_tokens, math.ceil(expected)))
+        needed = estimate_tokens(prompt) + num_predict
+        num_ctx = next((size for size in CONTEXT_BUCKETS if size >= needed), CONTEXT_BUCKETS[-1])
+        if needed > num_ctx:
+            logger.warning(f"Prompt needs about {needed} tokens but the context is capped at {num_ctx}; "
+                           f"Ollama will truncate the input")
+        if model:
+            num_ctx = context_sizes.fit(model, num_ctx)
+        options = {'num_predict': num_predict, 'num_ctx': num_ctx}
+        if self.temperature is not None:
+            options['temperature'] = self.temperature
+        if self.stop:
+            options['stop'] = list(self.stop)
+        return options
+
+class PromptTemplate:
+    """A prompt template parsed once into literal chunks around the {text} placeholder"""
+
+    def __init__(self, name: str, template: str, version: int = 0,
+                 profile: Optional[GenerationProfile] = None):
+        self.name = name
+        self.template = template
+        self.version = version
+        self.profile = profile or GenerationProfile()
+        self.chunks = self.compile(template)
+
+    @staticmethod
+    def compile(template: str) -> List[str]:
+        """Split a template into the literal text between {text} placeholders"""
+        chunks = []
+        literal = ''
+        try:
+            for text, field, spec, conversion in string.Formatter().parse(template):
+                literal += text
+                if field is None:
+                    continue
+                if field != TEXT_FIELD or spec or conversion:
+                    placeholder = field + (f"!{conversion}" if conversion else '') + (f":{spec}" if spec else '')
+                    raise PromptTemplateError(
+                        f"Unsupported placeholder '{{{placeholder}}}', only {{{TEXT_FIELD}}} is allowed "
+                        f"(use {{{{ and }}}} for literal braces)"
+                    )
+                chunks.append(literal)
+                literal = ''
+        except ValueError as e:
+            if isinstance(e, PromptTemplateError):
+                raise
+            raise PromptTemplateError(f"Invalid template: {e}")
+        if not chunks:
+            raise PromptTemplateError(f"Template must contain {{{TEXT_FIELD}}} placeholder")
+        chunks.append(literal)
+        return chunks
+
+    def render(self, text: str) -> str:
+        return text.join(self.chunks)
+
+    @property
+    def system_prefix(self) -> str:
+        """The fixed instructions before the first {text}"""
+        return self.chunks[0].strip()
+
+    def split(self, text: str) -> Tuple[str, str]:
+        """Render as a stable system prefix and a variable user part"""
+        return self.system_prefix, text.join([''] + self.chunks[1:]).strip()
+
+    def options(self, text: str, model: Optional[str] = None, extra: str = '') -> Dict[str, Any]:
+        """Generation options for this template applied to text, sent to model
+
+        extra is anything appended to the prompt; it counts toward the context size but
+        not toward the expected output length.
+        """
+        system, prompt = self.split(text)
+        return self.profile.options(system + prompt + extra, text, model)
+
+def validate_template(template: str):
+    """Raise PromptTemplateError if the template can't be compiled"""
+    PromptTemplate.compile(template)
+
+def load_legacy_prompts(path: str) -> Dict[str, str]:
+    """Read llm_prompts from an old saved_prompts.py file without executing it"""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and
+                any(isinstance(t, ast.Name) and t.id == 'llm_prompts' for t in node.targets)):
+            prompts = ast.literal_eval(node.value)
+            if isinstance(prompts, dict):
+                return {str(k): str(v) for k, v in prompts.items()}
+    raise ValueError("No llm_prompts dictionary found")
+
+class PromptRegistry:
+    """Versioned store of compiled prompt templates backed by a JSON file"""
+
+    def __init__(self, path: str, defaults: Dict[str, str], legacy_path: Optional[str] = None,
+                 default_profile: Optional[Callable[[str], GenerationProfile]] = None):
+        self.path = path
+        self.defaults = defaults
+        self.legacy_path = legacy_path
+        self.default_profile = default_profile or (lambda name: GenerationProfile())
+        self.version = 0
+        self.templates = {}
+        self.subscribers = []
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """Load templates from the JSON file, migrating the legacy Python file if needed"""
+        data = None
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            elif self.legacy_path and os.path.exists(self.legacy_path):
+                data = {'version': 1, 'templates': load_legacy_prompts(self.legacy_path)}
+                logger.info(f"Migrating prompts from {self.legacy_path}")
+        except Exception as e:
+            logger.error(f"Error loading prompts: {e}")
+
+        if not data or not data.get('templates'):
+            data = {'version': 1, 'templates': self.defaults}
+
+        with self._lock:
+            self.version = int(data.get('version', 1))
+            self.templates = {}
+            profiles = data.get('profiles', {})
+            # Templates saved before per-template versions were kept take the global one
+            versions = data.get('versions', {})
+            for name, template in data['templates'].items():
+                try:
+                    profile = self.default_profile(name)
+                    if name in profiles:
+                        profile = GenerationProfile.from_dict(profiles[name])
+                    version = int(versions.get(name, self.version))
+                    self.templates[name] = PromptTemplate(name, template, version, profile)
+                except PromptTemplateError as e:
+                    logger.error(f"Skipping invalid prompt '{name}': {e}")
+
+        if not os.path.exists(self.path):
+            self.save()
+
+    def save(self):
+        """Write templates to the JSON file"""
+        with self._lock:
+            data = {
+                'version': self.version,
+                'templates': {name: t.template for name, t in self.templates.items()},
+                'versions': {name: t.version for name, t in self.templates.items()},
+                'profiles': {name: t.profile.to_dict() for name, t in self.templates.items()}
+            }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self.templates.keys())
+
+    def get(self, name: str) -> Optional[PromptTemplate]:
+        with self._lock:
+            return self.templates.get(name)
+
+    def as_dict(self) -> Dict[str, str]:
+        with self._lock:
+            return {name: t.template for name, t in self.templates.items()}
+
+    def profiles(self) -> Dict[str, GenerationProfile]:
+        with self._lock:
+            return {name: t.profile for name, t in self.templates.items()}
+
+    def render(self, name: str, text: str) -> str:
+        """Render a template with the given text"""
+        template = self.get(name)
+        if template is None:
+            raise KeyError(f"Unknown prompt template: {name}")
+        return template.render(text)
+
+    def replace_all(self, templates: Dict[str, str],
+                    profiles: Optional[Dict[str, GenerationProfile]] = None):
+        """Validate and replace every template, then save and notify subscribers
+
+        Templates without an entry in profiles keep their current profile.
+        """
+        profiles = profiles or {}
+        compiled = {}
+        for name, template in templates.items():
+            try:
+                compiled[name] = PromptTemplate.compile(template)
+            except PromptTemplateError as e:
+                raise PromptTemplateError(f"Prompt '{name}': {e}")
+        if not compiled:
+            raise PromptTemplateError("At least one prompt is required")
+
+        with self._lock:
+            self.version += 1
+            new_templates = {}
+            for name, template in templates.items():
+                old = self.templates.get(name)
+                profile = profiles.get(name) or (old.profile if old else self.default_profile(name))
+                if old and old.template == template and old.profile == profile:
+                    # Unchanged templates keep their version so caches stay valid
+                    new_templates[name] = old
+                else:
+                    new_templates[name] = PromptTemplate(name, template, self.version, profile)
+            self.templates = new_templates
+        self.save()
+        self.notify()
+
+    def subscribe(self, callback: Callable[['PromptRegistry'], None]):
+        """Register a callback for template changes"""
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def notify(self):
+        for callback in list(self.subscribers):
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"Error notifying prompt update: {e}")
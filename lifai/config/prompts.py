@@ -1,4 +1,5 @@
 import os
+from lifai.config.prompt_registry import PromptRegistry, GenerationProfile
 
 # Default prompts
 default_prompts = {
@@ -96,18 +97,56 @@ Provide only the rewrite version without your commonts.
 When rewrite your response, make sure you are aware of the input text type. If it is an email format, you will response with an email. If it is a message, you will respond message. So on and so forth."""
 }
 
-# Try to load saved prompts, fall back to defaults if not found
-saved_prompts_file = os.path.join(os.path.dirname(__file__), 'saved_prompts.py')
-try:
-    if os.path.exists(saved_prompts_file):
-        namespace = {}
-        with open(saved_prompts_file, 'r', encoding='utf-8') as f:
-            exec(f.read(), namespace)
-        llm_prompts = namespace.get('llm_prompts', default_prompts)
-    else:
-        llm_prompts = default_prompts.copy()
-except Exception:
-    llm_prompts = default_prompts.copy()
+# Models that ignore "output only" tend to append notes after a blank line
+COMMENTARY_STOPS = ["\n\nNote:", "\n\n(Note:"]
+
+# Generation profiles: output_ratio is the expected output length relative to the input
+default_profiles = {
+    "Fix spelling and grammar": GenerationProfile(output_ratio=1.1, min_tokens=32, temperature=0.2,
+                                                  stop=COMMENTARY_STOPS),
+    "Improve writing quality": GenerationProfile(output_ratio=1.2, min_tokens=64, stop=COMMENTARY_STOPS),
+    "Make text more polite and friendly": GenerationProfile(output_ratio=1.4, min_tokens=64,
+                                                            stop=COMMENTARY_STOPS),
+    "Simplify text": GenerationProfile(output_ratio=1.1, min_tokens=64, stop=COMMENTARY_STOPS),
+    "Summarize": GenerationProfile(output_ratio=0.25, min_tokens=64, max_tokens=2048, stop=COMMENTARY_STOPS),
+    "Analyze and respond": GenerationProfile(output_ratio=2.0, min_tokens=256),
+    "Translate to Chinese": GenerationProfile(output_ratio=1.2, min_tokens=64, temperature=0.3,
+                                             stop=COMMENTARY_STOPS),
+    "Translate to English": GenerationProfile(output_ratio=1.5, min_tokens=64, temperature=0.3,
+                                             stop=COMMENTARY_STOPS),
+    "Call centre vibe": GenerationProfile(output_ratio=1.5, min_tokens=256)
+}
+
+def default_profile(name: str) -> GenerationProfile:
+    """Profile for a template without a saved one, guessed from its name for custom prompts"""
+    if name in default_profiles:
+        return default_profiles[name]
+    lowered = name.lower()
+    if 'summar' in lowered:
+        return default_profiles["Summarize"]
+    if 'spell' in lowered or 'grammar' in lowered:
+        return default_profiles["Fix spelling and grammar"]
+    if 'translat' in lowered:
+        return default_profiles["Translate to English"]
+    return GenerationProfile()
+
+# Load saved prompts from the registry, falling back to defaults
+prompt_registry = PromptRegistry(
+    path=os.path.join(os.path.dirname(__file__), 'prompts.json'),
+    defaults=default_prompts,
+    legacy_path=os.path.join(os.path.dirname(__file__), 'saved_prompts.py'),
+    default_profile=default_profile
+)
+
+llm_prompts = prompt_registry.as_dict()
 
 # Get options from llm_prompts keys
-improvement_options = list(llm_prompts.keys())
\ No newline at end of file
+improvement_options = list(llm_prompts.keys())
+
+def _sync_prompt_globals(registry: PromptRegistry):
+    """Keep the module-level views in step with the registry"""
+    llm_prompts.clear()
+    llm_prompts.update(registry.as_dict())
+    improvement_options[:] = list(llm_prompts.keys())
+
+prompt_registry.subscribe(_sync_prompt_globals)
@@ -3,7 +3,9 @@ from tkinter import ttk, scrolledtext, messagebox
 import logging
 import os
 import sys
-import json
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
 # Add project root to Python path
@@ -17,51 +19,207 @@ from lifai.core.toggle_switch import ToggleSwitch
 from lifai.modules.prompt_editor.editor import PromptEditorWindow
 from lifai.modules.AI_chat.ai_chat import ChatWindow
 from lifai.modules.agent_workspace.workspace import AgentWorkspaceWindow
+from lifai.utils.prompt_eval_stats import prompt_eval_stats
+from lifai.utils.spell_index import spell_stats
+from lifai.utils.translation_memory import translation_stats
+from lifai.utils.request_scheduler import INTERACTIVE, CHAT, BATCH
+from lifai.utils.logger_utils import setup_file_logging
+from lifai.core.settings_store import SettingsStore
+from lifai.core.event_loop import TkQtEventLoop
+from lifai.core.daemon import LifAiDaemon, DEFAULT_PORT
+from lifai.utils.stall_detector import StallDetector
+from lifai.utils.sampling_profiler import SamplingProfiler
+from lifai.utils.memory_monitor import MemoryMonitor
+from lifai.utils.job_queue import JobQueue, PENDING
+from PyQt6.QtCore import QTimer
 
 logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class LogHandler(logging.Handler):
-    def __init__(self, text_widget: scrolledtext.ScrolledText):
+    """Buffers records from any thread and writes them to the log widget in batches on the Tk thread"""
+
+    LEVEL_COLORS = {
+        'error': '#FF5252',    # Red
+        'warning': '#FFA726',  # Orange
+        'info': '#4CAF50',     # Green
+        'debug': '#9E9E9E'     # Gray
+    }
+
+    def __init__(self, text_widget: scrolledtext.ScrolledText, max_lines: int = 2000,
+                 max_pending: int = 5000, flush_interval: int = 100):
         super().__init__()
         self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval
+        # Bounded so a burst drops the oldest pending records instead of piling up
+        self.pending = deque(maxlen=max_pending)
+        self.dropped = 0
+        self.buffer_lock = threading.Lock()
+        self.after_id = None
         
         # Create a formatter
         self.formatter = logging.Formatter(
             '%(asctime)s - %(levelname)s - %(message)s',
             datefmt='%H:%M:%S'
         )
+        for tag, color in self.LEVEL_COLORS.items():
+            self.text_widget.tag_configure(tag, foreground=color)
 
     def emit(self, record):
-        msg = self.formatter.format(record)
-        self.text_widget.configure(state='normal')
-        
-        # Add color tags based on log level
+        """Queue a record; safe to call from any thread"""
+        try:
+            msg = self.formatter.format(record)
+        except Exception:
+            self.handleError(record)
+            return
         if record.levelno >= logging.ERROR:
             tag = 'error'
-            color = '#FF5252'  # Red
         elif record.levelno >= logging.WARNING:
             tag = 'warning'
-            color = '#FFA726'  # Orange
         elif record.levelno >= logging.INFO:
             tag = 'info'
-            color = '#4CAF50'  # Green
         else:
             tag = 'debug'
-            color = '#9E9E9E'  # Gray
-            
-        # Configure tag if it doesn't exist
-        if tag not in self.text_widget.tag_names():
-            self.text_widget.tag_configure(tag, foreground=color)
-        
-        # Insert the message with appropriate tag
-        self.text_widget.insert(tk.END, msg + '\n', tag)
-        self.text_widget.see(tk.END)  # Auto-scroll to bottom
+        with self.buffer_lock:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append((msg + '\n', tag))
+
+    def start(self):
+        """Start flushing on the Tk thread"""
+        if self.after_id is None:
+            self.after_id = self.text_widget.after(self.flush_interval, self.flush)
+
+    def close(self):
+        if self.after_id is not None:
+            try:
+                self.text_widget.after_cancel(self.after_id)
+            except tk.TclError:
+                pass
+            self.after_id = None
+        super().close()
+
+    def clear(self):
+        """Drop pending records and empty the widget"""
+        with self.buffer_lock:
+            self.pending.clear()
+            self.dropped = 0
+        self.text_widget.configure(state='normal')
+        self.text_widget.delete(1.0, tk.END)
         self.text_widget.configure(state='disabled')
 
+    def flush(self):
+        """Write pending records in one insert and trim the oldest lines"""
+        with self.buffer_lock:
+            records = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+        try:
+            if records:
+                widget = self.text_widget
+                at_bottom = widget.yview()[1] >= 0.999
+                args = []
+                if dropped:
+                    args += [f"... {dropped} log records dropped ...\n", 'warning']
+                for msg, tag in records:
+                    args += [msg, tag]
+                widget.configure(state='normal')
+                widget.insert(tk.END, *args)
+                excess = int(widget.index('end-1c').split('.')[0]) - self.max_lines
+                if excess > 0:
+                    widget.delete('1.0', f'{excess + 1}.0')
+                widget.configure(state='disabled')
+                if at_bottom:
+                    widget.see(tk.END)  # Auto-scroll unless the user scrolled up
+        except tk.TclError:
+            # Widget destroyed
+            self.after_id = None
+            return
+        self.after_id = self.text_widget.after(self.flush_interval, self.flush)
+
+class JobQueueWindow:
+    """Lists the durable background jobs and lets the user retry, cancel or clear them"""
+
+    COLUMNS = (('id', 'ID', 50), ('module', 'Module', 100), ('label', 'Item', 160), ('model', 'Model', 120),
+               ('status', 'Status', 80), ('attempts', 'Tries', 50), ('when', 'Next try', 80))
+
+    def __init__(self, root: tk.Tk, job_queue: JobQueue):
+        self.job_queue = job_queue
+        self.window = tk.Toplevel(root)
+        self.window.title("Job Queue")
+        self.window.geometry("700x350")
+
+        self.summary_label = ttk.Label(self.window, text="", foreground='gray')
+        self.summary_label.pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        self.tree = ttk.Treeview(self.window, columns=[c[0] for c in self.COLUMNS], show='headings')
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, stretch=column == 'label')
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        buttons = ttk.Frame(self.window)
+        buttons.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(buttons, text="Retry", command=self.retry).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Cancel", command=self.cancel).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Clear Finished", command=self.clear_finished).pack(side=tk.RIGHT, padx=5)
+        self.refresh()
+
+    def selected_ids(self):
+        return [int(item) for item in self.tree.selection()]
+
+    def retry(self):
+        for job_id in self.selected_ids():
+            self.job_queue.retry(job_id)
+        self.refresh(reschedule=False)
+
+    def cancel(self):
+        for job_id in self.selected_ids():
+            self.job_queue.cancel(job_id)
+        self.refresh(reschedule=False)
+
+    def clear_finished(self):
+        self.job_queue.clear_finished()
+        self.refresh(reschedule=False)
+
+    def refresh(self, reschedule: bool = True):
+        if not self.window.winfo_exists():
+            return
+        try:
+            selection = self.tree.selection()
+            self.tree.delete(*self.tree.get_children())
+            now = time.time()
+            for job in self.job_queue.jobs():
+                when = ''
+                if job['status'] == PENDING and job['next_attempt_at'] > now:
+                    when = f"in {job['next_attempt_at'] - now:.0f}s"
+                self.tree.insert('', tk.END, iid=str(job['id']), values=(
+                    job['id'], job['module'], job['label'], job['model'], job['status'], job['attempts'], when))
+            self.tree.selection_set([item for item in selection if self.tree.exists(item)])
+            self.summary_label.configure(text=self.job_queue.summary())
+        except Exception as e:
+            logging.error(f"Error refreshing job queue: {e}")
+        if reschedule:
+            self.window.after(2000, self.refresh)
+
 class LifAiHub:
+    HEARTBEAT_MS = 50
+    MEMORY_SAMPLE_MS = 30000
+
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("LifAi Control Hub")
+        self.event_loop = TkQtEventLoop(self.root)
+        
+        # Watchdog for UI freezes, fed by heartbeats from both toolkits
+        self.stall_detector = StallDetector(threshold_ms=100)
+        self.stall_detector.register('tk', self.HEARTBEAT_MS)
+        self.stall_detector.register('qt', self.HEARTBEAT_MS)
+        self.qt_heartbeat = QTimer()
+        self.qt_heartbeat.setInterval(self.HEARTBEAT_MS)
+        self.qt_heartbeat.timeout.connect(lambda: self.stall_detector.heartbeat('qt'))
+        self.qt_heartbeat.start()
+        self.tk_heartbeat()
         self.root.geometry("600x500")
         
         # Configure background color
@@ -74,68 +232,94 @@ class LifAiHub:
         # Initialize Ollama client
         self.ollama_client = OllamaClient()
         
-        # Load last selected model
+        # Shared settings, persisted except for the fetched models list
         self.config_file = os.path.join(project_root, 'lifai', 'config', 'app_settings.json')
-        last_model = self.load_last_model()
+        self.settings = SettingsStore(
+            self.config_file,
+            defaults={'model': '', 'models_list': [], 'fallback_model': '', 'fallback_url': '',
+                      'hedge_delay': 2.0, 'daemon_enabled': False, 'daemon_port': DEFAULT_PORT,
+                      'spell_wordlist': ''},
+            transient=('models_list',)
+        )
+        if 'last_model' in self.settings:
+            # Older versions saved the selection as last_model
+            self.settings.set('model', self.settings.get('model') or self.settings.get('last_model'))
+            self.settings.remove('last_model')
+        
+        # The model dropdown's Tk variable mirrors the store's 'model' setting
+        self.model_var = tk.StringVar(value=self.settings.get('model'))
+        self.model_var.trace_add('write', self.on_model_change)
         
-        # Shared settings
-        self.settings = {
-            'model': tk.StringVar(value=last_model),
-            'models_list': []
-        }
+        # Slow interactive generations are hedged to the fallback model or backend
+        self.apply_hedge_settings()
+        for key in ('fallback_model', 'fallback_url', 'hedge_delay'):
+            self.settings.subscribe(self.apply_hedge_settings, key)
+        
+        # Background generations that must survive Ollama outages and restarts
+        self.job_queue = JobQueue(os.path.join(project_root, 'data', 'jobs.sqlite3'), self.ollama_client)
+        self.job_queue.start()
+        self.job_window = None
         
         self.setup_ui()
         self.modules = {}
         self.initialize_modules()
         
+        # Local tools reach the templates through this process, sharing its client and cache
+        self.daemon = None
+        if self.settings.get('daemon_enabled'):
+            self.daemon = LifAiDaemon(self.ollama_client, lambda: self.settings.get('model'),
+                                      port=self.settings.get('daemon_port'))
+            self.daemon.start()
+        
+        # Memory instrumentation for long-running sessions
+        self.memory_monitor = MemoryMonitor(self.root)
+        self.memory_monitor.register_counter('chat_history', lambda: len(self.modules['chat'].chat_history))
+        self.memory_monitor.register_counter(
+            'log_lines', lambda: int(self.log_widget.index('end-1c').split('.')[0]))
+        self.sample_memory()
+        
         # Log initialization
         logging.info("LifAi Control Hub initialized")
         
         # Bind window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Bind model selection change
-        self.settings['model'].trace_add('write', self.on_model_change)
+        # Heartbeats only flow once the event loop runs, so watch from its first turn
+        self.root.after(0, self.stall_detector.start)
 
-    def load_last_model(self) -> str:
-        """Load the last selected model from config file"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    return config.get('last_model', '')
-        except Exception as e:
-            logging.error(f"Error loading last model: {e}")
-        return ''
+    def on_model_change(self, *args):
+        """Handle model selection change; the store saves it once changes settle"""
+        self.settings.set('model', self.model_var.get())
 
-    def save_last_model(self):
-        """Save the current model selection to config file"""
-        try:
-            config = {'last_model': self.settings['model'].get()}
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f)
-        except Exception as e:
-            logging.error(f"Error saving last model: {e}")
+    def apply_hedge_settings(self, *args):
+        policy = self.ollama_client.hedge_policy
+        policy.fallback_model = self.settings.get('fallback_model')
+        policy.fallback_url = self.settings.get('fallback_url')
+        policy.delay = float(self.settings.get('hedge_delay'))
 
-    def on_model_change(self, *args):
-        """Handle model selection change"""
-        self.save_last_model()
+    def on_hedge_change(self, *args):
+        self.settings.set('fallback_model', self.fallback_var.get())
+        try:
+            self.settings.set('hedge_delay', float(self.hedge_delay_var.get()))
+        except (tk.TclError, ValueError):
+            pass  # Half-typed value in the spinbox
 
     def refresh_models(self):
         """Refresh the list of available models"""
         try:
-            current_model = self.settings['model'].get()
+            current_model = self.model_var.get()
             self.models_list = self.ollama_client.fetch_models()
+            self.settings['models_list'] = self.models_list
             self.model_dropdown['values'] = self.models_list
+            self.fallback_dropdown['values'] = [''] + self.models_list
             
             # Try to keep the current selection if it still exists
             if current_model in self.models_list:
-                self.settings['model'].set(current_model)
+                self.model_var.set(current_model)
             elif self.models_list:
-                self.settings['model'].set(self.models_list[0])
+                self.model_var.set(self.models_list[0])
             else:
-                self.settings['model'].set('')
+                self.model_var.set('')
                 
             logging.info("Models list refreshed successfully")
         except Exception as e:
@@ -161,9 +345,10 @@ class LifAiHub:
         
         # Model selection with longer width
         self.models_list = self.ollama_client.fetch_models()
+        self.settings['models_list'] = self.models_list
         self.model_dropdown = ttk.Combobox(
             model_container, 
-            textvariable=self.settings['model'],
+            textvariable=self.model_var,
             values=self.models_list,
             state='readonly'
         )
@@ -178,9 +363,51 @@ class LifAiHub:
         )
         refresh_btn.pack(side=tk.LEFT, padx=5)
         
+        # Fallback model for hedging slow interactive requests
+        hedge_container = ttk.Frame(self.settings_frame)
+        hedge_container.pack(fill=tk.X, expand=True, pady=(5, 0))
+        ttk.Label(hedge_container, text="Fallback:").pack(side=tk.LEFT, padx=(0, 5))
+        self.fallback_var = tk.StringVar(value=self.settings.get('fallback_model'))
+        self.fallback_dropdown = ttk.Combobox(
+            hedge_container,
+            textvariable=self.fallback_var,
+            values=[''] + self.models_list,
+            state='readonly'
+        )
+        self.fallback_dropdown.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Label(hedge_container, text="Hedge after (s):").pack(side=tk.LEFT, padx=(5, 5))
+        self.hedge_delay_var = tk.DoubleVar(value=self.settings.get('hedge_delay'))
+        ttk.Spinbox(
+            hedge_container,
+            from_=0.5,
+            to=30.0,
+            increment=0.5,
+            textvariable=self.hedge_delay_var,
+            width=5
+        ).pack(side=tk.LEFT, padx=5)
+        self.fallback_var.trace_add('write', self.on_hedge_change)
+        self.hedge_delay_var.trace_add('write', self.on_hedge_change)
+        
+        # Request scheduler metrics
+        self.scheduler_label = ttk.Label(
+            self.settings_frame,
+            text="",
+            foreground='gray'
+        )
+        self.scheduler_label.pack(fill=tk.X, pady=(5, 0))
+        
+        # Event loop overhead
+        self.event_loop_label = ttk.Label(
+            self.settings_frame,
+            text="",
+            foreground='gray'
+        )
+        self.event_loop_label.pack(fill=tk.X)
+        self.update_scheduler_metrics()
+        
         # Set initial model selection
-        if self.settings['model'].get() in self.models_list:
-            self.model_dropdown.set(self.settings['model'].get())
+        if self.model_var.get() in self.models_list:
+            self.model_dropdown.set(self.model_var.get())
         elif self.models_list:
             self.model_dropdown.current(0)
         
@@ -258,8 +485,12 @@ class LifAiHub:
             root_logger.removeHandler(handler)
         
         # Add our custom handler
-        log_handler = LogHandler(self.log_widget)
-        root_logger.addHandler(log_handler)
+        self.log_handler = LogHandler(self.log_widget)
+        root_logger.addHandler(self.log_handler)
+        self.log_handler.start()
+        
+        # Persist structured logs from a background thread so they survive a hang or crash
+        self.log_listener = setup_file_logging(os.path.join(project_root, 'logs'))
         
         # Create log controls at the bottom
         self.create_log_controls()
@@ -270,6 +501,29 @@ class LifAiHub:
         logging.warning("Warning message test")
         logging.error("Error message test")
 
+    def tk_heartbeat(self):
+        self.stall_detector.heartbeat('tk')
+        self.root.after(self.HEARTBEAT_MS, self.tk_heartbeat)
+
+    def sample_memory(self):
+        try:
+            self.memory_monitor.sample()
+        except Exception as e:
+            logging.error(f"Error sampling memory: {e}")
+        self.root.after(self.MEMORY_SAMPLE_MS, self.sample_memory)
+
+    def update_scheduler_metrics(self):
+        """Refresh the queue depth and wait time display"""
+        try:
+            self.scheduler_label.configure(
+                text=f"{self.ollama_client.scheduler.summary()} | {self.ollama_client.single_flight.summary()} | "
+                     f"{self.ollama_client.hedge_stats.summary()} | {self.job_queue.summary()}")
+            if self.event_loop.started_at is not None:
+                self.event_loop_label.configure(text=self.event_loop.summary())
+        except Exception as e:
+            logging.error(f"Error updating scheduler metrics: {e}")
+        self.root.after(1000, self.update_scheduler_metrics)
+
     def create_log_controls(self):
         control_frame = ttk.Frame(self.debug_frame)
         control_frame.pack(fill=tk.X, pady=(5, 0))
@@ -289,6 +543,16 @@ class LifAiHub:
         # Bind log level change
         level_combo.bind('<<ComboboxSelected>>', self.change_log_level)
         
+        # Sampling profiler toggle
+        self.profiler = SamplingProfiler()
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            control_frame,
+            text="Profile",
+            variable=self.profile_var,
+            command=self.toggle_profiler
+        ).pack(side=tk.LEFT, padx=5)
+        
         # Clear logs button
         ttk.Button(
             control_frame,
@@ -302,18 +566,87 @@ class LifAiHub:
             text="Save Logs",
             command=self.save_logs
         ).pack(side=tk.RIGHT, padx=5)
+        
+        # Prompt eval stats button
+        ttk.Button(
+            control_frame,
+            text="Prompt Stats",
+            command=self.show_prompt_stats
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        # Memory buttons
+        ttk.Button(
+            control_frame,
+            text="Heap Diff",
+            command=self.show_heap_diff
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        ttk.Button(
+            control_frame,
+            text="Memory",
+            command=self.show_memory
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        # Durable job queue view
+        ttk.Button(
+            control_frame,
+            text="Jobs",
+            command=self.show_jobs
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        # UI stall report button
+        ttk.Button(
+            control_frame,
+            text="Stalls",
+            command=self.show_stalls
+        ).pack(side=tk.RIGHT, padx=5)
 
     def change_log_level(self, event=None):
         level = getattr(logging, self.log_level.get())
         logging.getLogger().setLevel(level)
         logging.info(f"Log level changed to {self.log_level.get()}")
 
+    def toggle_profiler(self):
+        """Start sampling all threads, or stop and write the profile to logs/"""
+        try:
+            if self.profile_var.get():
+                self.profiler.start()
+            else:
+                self.profiler.stop()
+                self.profiler.save(os.path.join(project_root, 'logs'))
+        except Exception as e:
+            logging.error(f"Profiler error: {e}")
+
     def clear_logs(self):
-        self.log_widget.configure(state='normal')
-        self.log_widget.delete(1.0, tk.END)
-        self.log_widget.configure(state='disabled')
+        self.log_handler.clear()
         logging.info("Logs cleared")
 
+    def show_prompt_stats(self):
+        """Log prompt-eval cost, prefix reuse savings, spell pre-pass skips and translation memory hits"""
+        logging.info(f"Prompt eval stats:\n{prompt_eval_stats.report()}")
+        logging.info(f"Spell pre-pass:\n{spell_stats.report()}")
+        logging.info(f"Translation memory:\n{translation_stats.report()}")
+
+    def show_stalls(self):
+        """Log UI stalls aggregated by the call site that blocked the main thread"""
+        logging.info(self.stall_detector.report())
+
+    def show_jobs(self):
+        """Open the job queue window, or raise it if it is already open"""
+        if self.job_window is not None and self.job_window.window.winfo_exists():
+            self.job_window.window.lift()
+            return
+        self.job_window = JobQueueWindow(self.root, self.job_queue)
+
+    def show_memory(self):
+        """Log RSS, live widgets per window and tracked sizes"""
+        self.memory_monitor.sample()
+        logging.info(f"Memory:\n{self.memory_monitor.report()}")
+
+    def show_heap_diff(self):
+        """Log what the Python heap gained since the last diff (the first click starts tracing)"""
+        logging.info(self.memory_monitor.heap_diff())
+
     def save_logs(self):
         try:
             # Create logs directory if it doesn't exist
@@ -338,26 +671,28 @@ class LifAiHub:
         )
         
         # Initialize other modules
+        # Each module gets a view of the shared client with its scheduling priority
         self.modules['text_improver'] = TextImproverWindow(
             settings=self.settings,
-            ollama_client=self.ollama_client
+            ollama_client=self.ollama_client.for_module('text_improver', INTERACTIVE)
         )
         
         self.modules['floating_toolbar'] = FloatingToolbarModule(
             settings=self.settings,
-            ollama_client=self.ollama_client
+            ollama_client=self.ollama_client.for_module('floating_toolbar', INTERACTIVE, hedge=True)
         )
 
         # Initialize AI Chat module
         self.modules['chat'] = ChatWindow(
             settings=self.settings,
-            ollama_client=self.ollama_client
+            ollama_client=self.ollama_client.for_module('chat', CHAT, hedge=True),
+            job_queue=self.job_queue
         )
 
         # Initialize Agent Workspace module
         self.modules['agent_workspace'] = AgentWorkspaceWindow(
             settings=self.settings,
-            ollama_client=self.ollama_client
+            ollama_client=self.ollama_client.for_module('agent_workspace', BATCH)
         )
 
         # Register prompt update callbacks
@@ -404,18 +739,32 @@ class LifAiHub:
     def run(self):
         # Make sure the hub window stays on top
         self.root.attributes('-topmost', True)
-        self.root.mainloop()
+        # Qt owns the loop and pumps Tk, so the Qt windows get events as promptly as the Tk ones
+        self.event_loop.run()
 
     def on_closing(self):
         """Handle application closing"""
-        # Save current model selection
-        self.save_last_model()
+        # Write any pending settings changes
+        self.settings.flush()
         
         # Destroy all module windows
         for module in self.modules.values():
             if hasattr(module, 'destroy'):
                 module.destroy()
         
+        if self.daemon is not None:
+            self.daemon.stop()
+        self.job_queue.stop()
+        
+        logging.getLogger().removeHandler(self.log_handler)
+        self.log_handler.close()
+        self.stall_detector.stop()
+        if self.profiler.running:
+            self.profiler.stop()
+            self.profiler.save(os.path.join(project_root, 'logs'))
+        self.qt_heartbeat.stop()
+        self.event_loop.quit()
+        self.log_listener.stop()
         self.root.destroy()
 
 if __name__ == "__main__":
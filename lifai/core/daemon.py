@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import socketserver
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from lifai.utils.ollama_client import OllamaClient
+from lifai.utils.request_scheduler import CHAT, PRIORITY_NAMES
+from lifai.utils.text_segments import SegmentCache
+from lifai.utils.logger_utils import get_module_logger
+from lifai.config.prompts import prompt_registry
+
+logger = get_module_logger(__name__)
+
+DEFAULT_PORT = 11500
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '[::1]')
+PRIORITIES = {name: priority for priority, name in PRIORITY_NAMES.items()}
+
+def default_socket_path() -> str:
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'lifai.sock')
+    return os.path.join(os.path.expanduser('~'), '.lifai.sock')
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """Routes /v1 requests to the LifAiDaemon that owns the server"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'LifAi/1'
+
+    def log_message(self, format, *args):
+        logger.debug(f"Daemon: {format % args}")
+
+    def allowed(self) -> bool:
+        """Refuse requests a web page could have made, as Ollama does
+
+        Browsers always send Host, and send Origin on cross-site requests. A Host other
+        than localhost means a DNS rebinding attack, and any Origin means a page is
+        calling us; local tools send neither.
+        """
+        host = self.headers.get('Host')
+        hostname = host.lower() if host is not None and host.endswith(']') else (host or '').lower().rsplit(':', 1)[0]
+        if host is not None and hostname not in LOCAL_HOSTS:
+            self.send_json(403, {'error': f"Host not allowed: {host}"})
+            return False
+        if self.headers.get('Origin') is not None:
+            self.send_json(403, {'error': "Cross-origin requests are not allowed"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.allowed():
+            return
+        if self.path == '/v1/templates':
+            self.send_json(200, {'templates': self.server.lifai.templates()})
+        elif self.path == '/v1/metrics':
+            self.send_json(200, self.server.lifai.metrics())
+        else:
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if not self.allowed():
+            return
+        if not self.path.startswith('/v1/run/'):
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        # Browsers can only send JSON cross-site after a preflight, which we never answer
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self.send_json(415, {'error': "Content-Type must be application/json"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            self.send_json(400, {'error': f"Invalid JSON body: {e}"})
+            return
+        self.server.lifai.run(self, unquote(self.path[len('/v1/run/'):]), body)
+
+    def send_json(self, status: int, data: Dict):
+        raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def write_chunk(self, data: Dict):
+        raw = json.dumps(data, ensure_ascii=False).encode('utf-8') + b'\n'
+        self.wfile.write(f"{len(raw):X}\r\n".encode('ascii') + raw + b"\r\n")
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+# Windows has no Unix sockets, so the daemon listens on localhost only there
+if hasattr(socket, 'AF_UNIX'):
+    class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    ThreadingUnixHTTPServer = None
+
+class LifAiDaemon:
+    """Serves the prompt templates to other local tools over localhost HTTP and a Unix socket
+
+    Every client goes through the same OllamaClient, so they share its connection pool,
+    scheduler, coalescing and response cache with each other and with the GUI hosting
+    the daemon.
+
+        GET  /v1/templates        names, versions and generation profiles
+        POST /v1/run/{template}   URL-encoded name; {"text": ..., "model"?: ..., "stream"?: bool, "priority"?: ...}
+        GET  /v1/metrics          scheduler, cache, coalescing and hedging counters
+
+    POST bodies must be sent as application/json, and requests with an Origin header
+    or a Host other than localhost are refused. The hub starts it only when
+    daemon_enabled is set.
+    """
+
+    def __init__(self, ollama_client: OllamaClient, default_model: Callable[[], str],
+                 port: int = DEFAULT_PORT, socket_path: Optional[str] = None):
+        self.ollama_client = ollama_client
+        self.default_model = default_model
+        self.port = port
+        self.socket_path = socket_path if socket_path is not None else default_socket_path()
+        self.cache = ollama_client.response_cache
+        self.servers = []
+        self.started_at = None
+        self.requests = 0
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        try:
+            server = ThreadingHTTPServer(('127.0.0.1', self.port), DaemonRequestHandler)
+            server.daemon_threads = True
+            self.add_server(server, f"http://127.0.0.1:{self.port}")
+        except OSError as e:
+            logger.warning(f"Daemon could not listen on port {self.port}, "
+                           f"another LifAi may already be serving: {e}")
+
+        if self.socket_path and ThreadingUnixHTTPServer is not None:
+            try:
+                self.remove_stale_socket()
+                server = ThreadingUnixHTTPServer(self.socket_path, DaemonRequestHandler)
+                os.chmod(self.socket_path, 0o600)
+                self.add_server(server, self.socket_path)
+            except OSError as e:
+                logger.warning(f"Daemon could not listen on {self.socket_path}: {e}")
+        self.started_at = time.time()
+
+    def add_server(self, server: socketserver.BaseServer, address: str):
+        server.lifai = self
+        self.servers.append(server)
+        threading.Thread(target=server.serve_forever, name='lifai-daemon', daemon=True).start()
+        logger.info(f"LifAi daemon listening on {address}")
+
+    def remove_stale_socket(self):
+        """Remove a socket file left by a process that exited, but not one still in use"""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise OSError(f"{self.socket_path} is in use")
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+            if server.address_family != socket.AF_INET and os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        self.servers = []
+
+    def templates(self):
+        templates = []
+        for name in prompt_registry.names():
+            template = prompt_registry.get(name)
+            templates.append({
+                'name': name,
+                'version': template.version,
+                'profile': template.profile.to_dict()
+            })
+        return templates
+
+    def metrics(self) -> Dict:
+        client = self.ollama_client
+        with self._lock:
+            daemon = {
+                'uptime_s': round(time.time() - self.started_at, 1) if self.started_at else 0.0,
+                'requests': self.requests,
+                'active': self.active
+            }
+        return {
+            'daemon': daemon,
+            'scheduler': client.scheduler.metrics(),
+            'models': client.scheduler.model_limits(),
+            'coalescing': {'leaders': client.single_flight.leaders,
+                           'coalesced': client.single_flight.coalesced},
+            'hedging': {'calls': client.hedge_stats.calls, 'hedged': client.hedge_stats.hedged,
+                        'hedge_wins': client.hedge_stats.hedge_wins, 'failovers': client.hedge_stats.failovers,
+                        'saved_s': round(client.hedge_stats.saved_seconds, 2)},
+            'cache': {'entries': len(self.cache.entries), 'hits': self.cache.hits,
+                      'misses': self.cache.misses}
+        }
+
+    def run(self, handler: DaemonRequestHandler, name: str, body: Dict):
+        template = prompt_registry.get(name)
+        if template is None:
+            handler.send_json(404, {'error': f"Unknown template: {name}"})
+            return
+        text = body.get('text')
+        if not isinstance(text, str) or not text.strip():
+            handler.send_json(400, {'error': "'text' must be a non-empty string"})
+            return
+        model = body.get('model') or self.default_model()
+        if not model:
+            handler.send_json(503, {'error': "No model selected; pass 'model'"})
+            return
+        priority = PRIORITIES.get(body.get('priority', 'chat'), CHAT)
+        client = self.ollama_client.for_module('daemon', priority)
+
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+        try:
+            if body.get('stream'):
+                self.run_stream(handler, client, template, text, model)
+            else:
+                key = SegmentCache.key(template, model, text)
+                result = self.cache.get(key)
+                cached = result is not None
+                if not cached:
+                    result = client.generate_template(template, text, model)
+                    if result is None:
+                        handler.send_json(502, {'error': "Generation failed"})
+                        return
+                    self.cache.put(key, result)
+                handler.send_json(200, {'template': name, 'model': model, 'response': result, 'cached': cached})
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def run_stream(self, handler: DaemonRequestHandler, client: OllamaClient, template, text: str, model: str):
+        key = SegmentCache.key(template, model, text)
+        cached = self.cache.get(key)
+        handler.start_stream()
+        if cached is not None:
+            handler.write_chunk({'response': cached, 'done': False})
+            handler.write_chunk({'response': '', 'done': True, 'cached': True})
+            handler.end_stream()
+            return
+
+        cancel_event = threading.Event()
+        system, prompt = template.split(text)
+        parts = []
+        chunks = client.generate_stream(prompt, model, system=system, cancel_event=cancel_event,
+                                        options=template.options(text, model), template_name=template.name)
+        try:
+            for chunk in chunks:
+                parts.append(chunk.get('response', ''))
+                out = {'response': chunk.get('response', ''), 'done': bool(chunk.get('done'))}
+                if out['done']:
+                    out['cached'] = False
+                    self.cache.put(key, ''.join(parts).strip())
+                handler.write_chunk(out)
+            handler.end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Daemon client disconnected, cancelling its stream")
+        finally:
+            cancel_event.set()
+            chunks.close()
+
+def main():
+    from lifai.core.settings_store import SettingsStore
+
+    parser = argparse.ArgumentParser(description="Serve LifAi prompt templates to local tools")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', default=default_socket_path(), help="Unix socket path, '' to disable")
+    parser.add_argument('--ollama-url', default="http://localhost:11434")
+    parser.add_argument('--model', help="Default model; the hub's last selection if omitted")
+    args = parser.parse_args()
+
+    settings = SettingsStore(os.path.join(project_root, 'lifai', 'config', 'app_settings.json'),
+                             defaults={'model': ''})
+    daemon = LifAiDaemon(OllamaClient(args.ollama_url), lambda: args.model or settings.get('model'),
+                         port=args.port, socket_path=args.socket)
+    daemon.start()
+    if not daemon.servers:
+        sys.exit(1)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        daemon.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import sys
+import time
+import tkinter as tk
+import _tkinter
+from collections import deque
+from typing import Dict
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer, Qt
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+class TkQtEventLoop:
+    """Runs the Qt event loop and pumps Tk from a Qt timer, so both toolkits share one thread
+
+    Each tick drains pending Tk events up to a cap, so a flood of Tk events can't
+    starve Qt repaints and Tk latency stays bounded by the tick interval. The pump
+    measures its own cost and how late Qt delivers its ticks.
+    """
+
+    def __init__(self, root: tk.Tk, interval_ms: int = 8, max_events_per_tick: int = 500):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.max_events_per_tick = max_events_per_tick
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        # Tk windows are invisible to Qt, so closing the last Qt window must not end the app
+        self.app.setQuitOnLastWindowClosed(False)
+
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.pump)
+
+        # Measurements
+        self.started_at = None
+        self.last_tick = None
+        self.ticks = 0
+        self.events = 0
+        self.capped_ticks = 0
+        self.pump_seconds = 0.0
+        self.max_pump_ms = 0.0
+        self.lags_ms = deque(maxlen=1000)
+
+    def run(self):
+        """Enter the Qt loop; returns after quit()"""
+        self.started_at = time.perf_counter()
+        self.timer.start()
+        self.app.exec()
+        self.timer.stop()
+        logger.info(f"Event loop stopped. {self.summary()}")
+
+    def quit(self):
+        self.timer.stop()
+        self.app.quit()
+
+    def pump(self):
+        """Process pending Tk events, at most max_events_per_tick of them"""
+        start = time.perf_counter()
+        if self.last_tick is not None:
+            # How late Qt delivered this tick: time Qt spent busy on its own work
+            self.lags_ms.append(max(0.0, (start - self.last_tick) * 1000 - self.interval_ms))
+        processed = 0
+        try:
+            while processed < self.max_events_per_tick and self.root.dooneevent(_tkinter.DONT_WAIT):
+                processed += 1
+        except tk.TclError:
+            # The Tk root is gone, so the app is shutting down
+            self.quit()
+            return
+        end = time.perf_counter()
+
+        self.ticks += 1
+        self.events += processed
+        if processed == self.max_events_per_tick:
+            self.capped_ticks += 1
+        elapsed = end - start
+        self.pump_seconds += elapsed
+        self.max_pump_ms = max(self.max_pump_ms, elapsed * 1000)
+        self.last_tick = end
+
+    def stats(self) -> Dict[str, float]:
+        wall = time.perf_counter() - self.started_at if self.started_at else 0.0
+        lags = sorted(self.lags_ms)
+        return {
+            'ticks': self.ticks,
+            'tk_events': self.events,
+            'capped_ticks': self.capped_ticks,
+            'pump_overhead': self.pump_seconds / wall if wall else 0.0,
+            'avg_pump_ms': self.pump_seconds / self.ticks * 1000 if self.ticks else 0.0,
+            'max_pump_ms': self.max_pump_ms,
+            'p95_qt_lag_ms': lags[int(len(lags) * 0.95)] if lags else 0.0,
+            'max_qt_lag_ms': lags[-1] if lags else 0.0
+        }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"Tk pump {s['pump_overhead']:.1%} of wall time, {s['avg_pump_ms']:.2f} ms/tick avg, "
+                f"{s['max_pump_ms']:.0f} ms max | Qt tick lag p95 {s['p95_qt_lag_ms']:.0f} ms, "
+                f"max {s['max_qt_lag_ms']:.0f} ms")
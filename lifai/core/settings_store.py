@@ -0,0 +1,157 @@
+import os
+import json
+import atexit
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+class SettingHandle:
+    """One setting with the get()/set() interface of a Tk variable, safe to use from any thread"""
+
+    def __init__(self, store: 'SettingsStore', key: str):
+        self.store = store
+        self.key = key
+
+    def get(self) -> Any:
+        return self.store.get(self.key)
+
+    def set(self, value: Any):
+        self.store.set(self.key, value)
+
+    def subscribe(self, callback: Callable[[str, Any], None]):
+        self.store.subscribe(callback, self.key)
+
+class SettingsStore:
+    """In-memory settings backed by a JSON file that is written atomically once changes settle
+
+    Reads never touch the disk. Writes update memory, notify subscribers and schedule
+    a save after `debounce` seconds, so a burst of changes costs one write. Keys listed
+    in `transient` are shared at runtime but never saved.
+    """
+
+    def __init__(self, path: str, defaults: Optional[Dict[str, Any]] = None,
+                 transient: Iterable[str] = (), debounce: float = 0.5):
+        self.path = path
+        self.transient = set(transient)
+        self.debounce = debounce
+        self.values = dict(defaults or {})
+        self.subscribers = {}
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self.load()
+        atexit.register(self.flush)
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                with self._lock:
+                    self.values.update({k: v for k, v in data.items() if k not in self.transient})
+        except Exception as e:
+            logger.error(f"Error loading settings from {self.path}: {e}")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self.values.get(key, default)
+
+    def set(self, key: str, value: Any):
+        self.update({key: value})
+
+    def update(self, values: Dict[str, Any]):
+        """Change several settings at once; unchanged values don't notify or save"""
+        with self._lock:
+            changed = {k: v for k, v in values.items() if self.values.get(k) != v or k not in self.values}
+            if not changed:
+                return
+            self.values.update(changed)
+            if any(k not in self.transient for k in changed):
+                self._schedule_save_locked()
+        for key, value in changed.items():
+            self.notify(key, value)
+
+    def remove(self, key: str):
+        with self._lock:
+            if key not in self.values:
+                return
+            del self.values[key]
+            if key not in self.transient:
+                self._schedule_save_locked()
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.values)
+
+    # Dict-style access; indexing returns a handle so settings['model'].get() keeps working
+    def __getitem__(self, key: str) -> SettingHandle:
+        return SettingHandle(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        self.set(key, value)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self.values
+
+    def subscribe(self, callback: Callable[[str, Any], None], key: Optional[str] = None):
+        """Call callback(key, value) when key changes, or on any change if key is None
+
+        Callbacks run in the thread that made the change; UI code should marshal to its own thread.
+        """
+        with self._lock:
+            callbacks = self.subscribers.setdefault(key, [])
+            if callback not in callbacks:
+                callbacks.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, Any], None], key: Optional[str] = None):
+        with self._lock:
+            if callback in self.subscribers.get(key, []):
+                self.subscribers[key].remove(callback)
+
+    def notify(self, key: str, value: Any):
+        with self._lock:
+            callbacks = self.subscribers.get(key, []) + self.subscribers.get(None, [])
+        for callback in callbacks:
+            try:
+                callback(key, value)
+            except Exception as e:
+                logger.error(f"Error notifying settings change for '{key}': {e}")
+
+    def _schedule_save_locked(self):
+        self._dirty = True
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Write pending changes now"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                data = {k: v for k, v in self.values.items() if k not in self.transient}
+                self._dirty = False
+            self._write(data)
+
+    def _write(self, data: Dict[str, Any]):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            # Atomic on both POSIX and Windows, so a crash leaves the old or the new file
+            os.replace(tmp_path, self.path)
+            logger.debug(f"Settings saved to {self.path}")
+        except Exception as e:
+            logger.error(f"Error saving settings to {self.path}: {e}")
@@ -1,13 +1,16 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, 
                             QPushButton, QLabel, QScrollArea, QFrame,
                             QFileDialog, QProgressBar)
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QObject, pyqtSignal
 from PyQt6.QtGui import QFont, QColor, QPalette, QCloseEvent
-from typing import Dict
+from typing import Dict, Optional
 import os
+import uuid
 from datetime import datetime
 from lifai.utils.ollama_client import OllamaClient
 from lifai.utils.logger_utils import get_module_logger
+from lifai.utils.request_scheduler import BATCH
+from lifai.utils.job_queue import JobQueue, DONE
 import json
 from pathlib import Path
 
@@ -77,12 +80,18 @@ class MessageBubble(QFrame):
             }
         """)
 
+class ChatSignals(QObject):
+    """Carries finished upload jobs from the job queue's worker threads to the GUI thread"""
+    job_finished = pyqtSignal(object)
+
 class ChatWindow(QWidget):
-    def __init__(self, settings: Dict, ollama_client: OllamaClient):
+    def __init__(self, settings: Dict, ollama_client: OllamaClient, job_queue: Optional[JobQueue] = None):
         super().__init__(None)
         logger.info("Initializing AI Chat Window")
         self.settings = settings
         self.ollama_client = ollama_client
+        # Whole-file analysis is background work and must not hold up interactive requests
+        self.upload_client = ollama_client.for_module('chat_upload', BATCH)
         self.chat_history = []
         
         # Create chat history directory
@@ -95,6 +104,13 @@ class ChatWindow(QWidget):
         # Then load chat history
         self.load_chat_history()
         
+        # File analysis goes through the durable job queue, so an Ollama outage only delays it
+        self.job_queue = job_queue
+        self.signals = ChatSignals()
+        self.signals.job_finished.connect(self.on_upload_finished)
+        if job_queue is not None:
+            job_queue.subscribe('chat_upload', self.signals.job_finished.emit)
+        
         # Set window flags to prevent closing
         self.setWindowFlags(
             Qt.WindowType.Window |
@@ -329,7 +345,15 @@ class ChatWindow(QWidget):
                 
                 # Process file content
                 prompt = f"Please analyze this file content:\n\n{content}"
-                response = self.ollama_client.generate_response(
+                if self.job_queue is not None:
+                    # Each upload is its own job, so uploading the same file again analyzes it again
+                    self.job_queue.submit('chat_upload', prompt, self.settings['model'].get(), label=filename,
+                                          key=f"chat_upload:{uuid.uuid4().hex}")
+                    self.progress_bar.setValue(100)
+                    self.add_message(f"⏳ Queued {filename} for analysis; the result will appear here, "
+                                     f"even after a restart.", False)
+                    return
+                response = self.upload_client.generate_response(
                     prompt=prompt,
                     model=self.settings['model'].get()
                 )
@@ -347,6 +371,13 @@ class ChatWindow(QWidget):
             finally:
                 self.progress_bar.hide()
 
+    def on_upload_finished(self, job: Dict):
+        """Show the analysis of an uploaded file once its queued job completes"""
+        if job['status'] == DONE and job.get('result', '').strip():
+            self.add_message(job['result'].strip(), False)
+        else:
+            self.add_message(f"Sorry, I couldn't analyze {job['label'] or 'the file'}.", False)
+
     def show(self):
         """Show the window"""
         super().show()
@@ -0,0 +1,316 @@
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Callable, Optional
+import requests
+from lifai.utils.ollama_client import OllamaClient
+from lifai.utils.logger_utils import get_module_logger
+from lifai.modules.agent_workspace.trace import AgentTrace, prompt_key
+
+logger = get_module_logger(__name__)
+
+# Step states reported through the progress callback
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+SKIPPED = 'skipped'
+
+class AgentStep:
+    def __init__(self, step_id: str, kind: str, description: str,
+                 func: Callable[[Dict[str, str]], str],
+                 depends_on: Optional[List[str]] = None,
+                 timeout: float = 60.0):
+        self.step_id = step_id
+        self.kind = kind
+        self.description = description
+        self.func = func
+        self.depends_on = depends_on or []
+        self.timeout = timeout
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class AgentBudget:
+    """Overall limits for one agent run"""
+    def __init__(self, max_seconds: float = 180.0, max_tokens: int = 8000):
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.started_at = time.time()
+        self.tokens_used = 0
+        self._lock = threading.Lock()
+
+    def add_tokens(self, count: int):
+        with self._lock:
+            self.tokens_used += count
+
+    def remaining_seconds(self) -> float:
+        return self.max_seconds - (time.time() - self.started_at)
+
+    def exhausted(self) -> Optional[str]:
+        """Return the reason the budget is exhausted, or None"""
+        if self.remaining_seconds() <= 0:
+            return f"time budget of {self.max_seconds:.0f}s exceeded"
+        if self.tokens_used >= self.max_tokens:
+            return f"token budget of {self.max_tokens} exceeded ({self.tokens_used} used)"
+        return None
+
+class AgentEngine:
+    """Plans an agent task as a DAG of steps and runs independent steps concurrently"""
+
+    def __init__(self, ollama_client: OllamaClient, model: str,
+                 search_fn: Optional[Callable[[str], list]] = None,
+                 max_workers: int = 4, step_timeout: float = 60.0,
+                 fetch_count: int = 3, search_engine: str = '',
+                 fetch_fn: Optional[Callable[[str], str]] = None,
+                 trace: Optional[AgentTrace] = None):
+        self.ollama_client = ollama_client
+        self.model = model
+        self.search_fn = search_fn
+        self.search_engine = search_engine
+        self.fetch_fn = fetch_fn or self.fetch_url
+        self.trace = trace or AgentTrace()
+        self.max_workers = max_workers
+        self.step_timeout = step_timeout
+        self.fetch_count = fetch_count
+        self.budget = None
+
+    # Planning
+
+    def plan(self, task: str, agent_type: str) -> List[AgentStep]:
+        """Build the step graph for a task"""
+        steps = []
+        research_steps = []
+
+        if agent_type == "Research Agent" and self.search_fn:
+            steps.append(AgentStep(
+                'search', 'search', "Search the web",
+                lambda inputs: self.run_search(task),
+                timeout=self.step_timeout
+            ))
+            for i in range(self.fetch_count):
+                steps.append(AgentStep(
+                    f'fetch_{i + 1}', 'fetch', f"Fetch source {i + 1}",
+                    lambda inputs, i=i: self.run_fetch(inputs['search'], i),
+                    depends_on=['search'],
+                    timeout=min(self.step_timeout, 20.0)
+                ))
+                steps.append(AgentStep(
+                    f'summarize_{i + 1}', 'summarize', f"Summarize source {i + 1}",
+                    lambda inputs, i=i: self.run_summarize(task, inputs.get(f'fetch_{i + 1}', '')),
+                    depends_on=[f'fetch_{i + 1}'],
+                    timeout=self.step_timeout
+                ))
+                research_steps.append(f'summarize_{i + 1}')
+
+        steps.append(AgentStep(
+            'draft', 'draft', "Draft the answer",
+            lambda inputs: self.run_draft(task, agent_type, [inputs[s] for s in research_steps if s in inputs]),
+            depends_on=research_steps,
+            timeout=self.step_timeout * 2
+        ))
+        steps.append(AgentStep(
+            'critique', 'critique', "Critique and revise the draft",
+            lambda inputs: self.run_critique(task, agent_type, inputs['draft']),
+            depends_on=['draft'],
+            timeout=self.step_timeout * 2
+        ))
+        return steps
+
+    # Step implementations
+
+    def run_search(self, task: str) -> list:
+        with self.trace.span(f"search ({self.search_engine or 'default'})", 'search',
+                             engine=self.search_engine) as attrs:
+            results = self.search_fn(task)
+            attrs['result_count'] = len(results)
+            attrs['results'] = results
+        if not results:
+            raise RuntimeError("No search results found")
+        return results
+
+    def run_fetch(self, search_results: list, index: int) -> str:
+        if index >= len(search_results):
+            raise RuntimeError("No search result for this slot")
+        result = search_results[index]
+        text = f"{result['title']}\n{result['snippet']}\nSource: {result['link']}"
+        with self.trace.span(f"fetch {result['link'][:60]}", 'fetch', url=result['link']) as attrs:
+            try:
+                page = self.fetch_fn(result['link'])
+                attrs['chars'] = len(page)
+                attrs['text'] = page
+                if page:
+                    text += f"\n\n{page}"
+            except Exception as e:
+                # The snippet alone is still useful for the summary
+                attrs['error'] = str(e)
+                logger.debug(f"Failed to fetch {result['link']}: {e}")
+        return text
+
+    def fetch_url(self, url: str) -> str:
+        """Download a page and reduce it to plain text"""
+        response = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
+        response.raise_for_status()
+        page = re.sub(r'(?is)<(script|style).*?</\1>', ' ', response.text)
+        page = re.sub(r'<[^>]+>', ' ', page)
+        return re.sub(r'\s+', ' ', page).strip()[:6000]
+
+    def run_summarize(self, task: str, source: str) -> str:
+        prompt = (f"Summarize the parts of the following source that are relevant to this task:\n\n"
+                  f"Task: {task}\n\nSource:\n{source}\n\n"
+                  f"Provide a short factual summary and keep the source link.")
+        return self.generate(prompt)
+
+    def run_draft(self, task: str, agent_type: str, summaries: List[str]) -> str:
+        with self.trace.span("build draft prompt", 'prompt') as attrs:
+            prompt = f"You are a {agent_type}. Please help with this task:\n\n{task}\n\n"
+            if summaries:
+                prompt += "\nBased on these research notes:\n"
+                for i, summary in enumerate(summaries, 1):
+                    prompt += f"\n{i}. {summary}\n"
+            prompt += "\nProvide your response in a clear, step-by-step format."
+            attrs['prompt_chars'] = len(prompt)
+            attrs['sources'] = len(summaries)
+        return self.generate(prompt)
+
+    def run_critique(self, task: str, agent_type: str, draft: str) -> str:
+        prompt = (f"You are a critical reviewer working with a {agent_type}. Review the draft answer below "
+                  f"for mistakes, gaps and unclear steps, then output an improved final version.\n\n"
+                  f"Task:\n{task}\n\nDraft:\n{draft}\n\n"
+                  f"Output only the improved final answer in a clear, step-by-step format.")
+        return self.generate(prompt)
+
+    def generate(self, prompt: str) -> str:
+        timeout = max(1.0, min(self.step_timeout * 2, self.budget.remaining_seconds()))
+        with self.trace.span("generate", 'generate', model=self.model,
+                             prompt_chars=len(prompt), prompt_key=prompt_key(prompt)) as attrs:
+            response = self.ollama_client.generate(prompt=prompt, model=self.model, timeout=timeout)
+            if not response:
+                raise RuntimeError("No response generated from the model")
+            # Ollama reports durations in nanoseconds
+            for field in ('prompt_eval_count', 'eval_count', 'total_duration', 'load_duration',
+                          'prompt_eval_duration', 'eval_duration'):
+                attrs[field] = response.get(field, 0)
+            attrs['response'] = response.get('response', '')
+        self.budget.add_tokens(response.get('prompt_eval_count', 0) + response.get('eval_count', 0))
+        return response.get('response', '').strip()
+
+    # Execution
+
+    def run(self, task: str, agent_type: str, budget: AgentBudget,
+            on_progress: Optional[Callable[[AgentStep, List[AgentStep]], None]] = None) -> str:
+        """Execute the planned steps and return the final answer"""
+        self.budget = budget
+        self.trace.metadata.update({
+            'task': task,
+            'agent_type': agent_type,
+            'model': self.model,
+            'search_engine': self.search_engine,
+            'fetch_count': self.fetch_count,
+            'max_seconds': budget.max_seconds,
+            'max_tokens': budget.max_tokens
+        })
+        steps = self.plan(task, agent_type)
+        by_id = {step.step_id: step for step in steps}
+        running = {}
+
+        def report(step):
+            if on_progress:
+                try:
+                    on_progress(step, steps)
+                except Exception as e:
+                    logger.error(f"Error reporting agent progress: {e}")
+
+        for step in steps:
+            report(step)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='agent-step')
+        try:
+            while True:
+                reason = budget.exhausted()
+
+                # Skip steps whose dependencies can no longer produce anything
+                for step in steps:
+                    if step.status != PENDING:
+                        continue
+                    deps = [by_id[d] for d in step.depends_on]
+                    if reason or (deps and all(d.status in (FAILED, TIMEOUT, SKIPPED) for d in deps)
+                                  and step.kind != 'draft'):
+                        step.status = SKIPPED
+                        step.error = reason or "dependencies did not complete"
+                        report(step)
+
+                # Start every step whose dependencies have settled
+                for step in steps:
+                    if step.status != PENDING:
+                        continue
+                    if all(by_id[d].status not in (PENDING, RUNNING) for d in step.depends_on):
+                        inputs = {d: by_id[d].result for d in step.depends_on if by_id[d].status == DONE}
+                        if step.kind == 'critique' and 'draft' not in inputs:
+                            step.status = SKIPPED
+                            step.error = "no draft to critique"
+                            report(step)
+                            continue
+                        step.status = RUNNING
+                        step.started_at = time.time()
+                        running[executor.submit(self.run_step, step, inputs)] = step
+                        report(step)
+
+                if not running:
+                    break
+
+                # Wait until a step finishes or the nearest step deadline passes
+                now = time.time()
+                deadline = min(step.started_at + step.timeout for step in running.values())
+                done, _ = wait(list(running), timeout=max(0.05, min(deadline, now + budget.remaining_seconds()) - now),
+                               return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    step = running.pop(future)
+                    step.finished_at = time.time()
+                    try:
+                        step.result = future.result()
+                        step.status = DONE
+                    except Exception as e:
+                        step.status = FAILED
+                        step.error = str(e)
+                        logger.warning(f"Agent step {step.step_id} failed: {e}")
+                    report(step)
+
+                # Abandon steps that overran their timeout or the overall budget
+                now = time.time()
+                for future, step in list(running.items()):
+                    if now - step.started_at > step.timeout or budget.remaining_seconds() <= 0:
+                        running.pop(future)
+                        future.cancel()
+                        step.finished_at = now
+                        step.status = TIMEOUT
+                        step.error = f"exceeded {step.timeout:g}s"
+                        logger.warning(f"Agent step {step.step_id} timed out")
+                        report(step)
+        finally:
+            # Don't block on abandoned steps; their HTTP timeouts will end them
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        self.trace.finish()
+        self.trace.metadata['steps'] = {step.step_id: step.status for step in steps}
+        self.trace.metadata['tokens_used'] = budget.tokens_used
+
+        for step_id in ('critique', 'draft'):
+            if by_id[step_id].status == DONE and by_id[step_id].result:
+                return by_id[step_id].result
+        raise RuntimeError(by_id['draft'].error or "Agent run produced no answer")
+
+    def run_step(self, step: AgentStep, inputs: Dict):
+        with self.trace.span(f"step {step.step_id}", 'step', kind=step.kind):
+            return step.func(inputs)
@@ -0,0 +1,185 @@
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+def prompt_key(prompt: str) -> str:
+    """Stable key used to match recorded generations during replay"""
+    return hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+
+class AgentTrace:
+    """Structured span trace of a single agent run"""
+
+    def __init__(self, metadata: Optional[Dict] = None):
+        self.metadata = dict(metadata or {})
+        self.metadata.setdefault('created', datetime.now().isoformat(timespec='seconds'))
+        self.spans = []
+        self.started_at = time.perf_counter()
+        self.wall_time = None
+        self._lock = threading.Lock()
+        self._thread_ids = {}
+
+    def _thread_index(self) -> int:
+        ident = threading.get_ident()
+        if ident not in self._thread_ids:
+            self._thread_ids[ident] = len(self._thread_ids) + 1
+        return self._thread_ids[ident]
+
+    @contextmanager
+    def span(self, name: str, category: str, **attrs):
+        """Record the duration of a block; attrs can be added to while it runs"""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs['error'] = str(e)
+            raise
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.spans.append({
+                    'name': name,
+                    'category': category,
+                    'start': start - self.started_at,
+                    'end': end - self.started_at,
+                    'thread': self._thread_index(),
+                    'attrs': attrs
+                })
+
+    def finish(self):
+        if self.wall_time is None:
+            self.wall_time = time.perf_counter() - self.started_at
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s['start'])
+        return {
+            'metadata': self.metadata,
+            'wall_time': self.wall_time,
+            'spans': spans
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AgentTrace':
+        trace = cls(data.get('metadata'))
+        trace.spans = list(data.get('spans', []))
+        trace.wall_time = data.get('wall_time')
+        return trace
+
+    def summary(self) -> Dict[str, float]:
+        """Total time spent per span category"""
+        totals = {}
+        for span in self.spans:
+            totals[span['category']] = totals.get(span['category'], 0.0) + span['end'] - span['start']
+        return totals
+
+    def to_chrome_trace(self) -> Dict:
+        """Convert to the Chrome trace-event format (chrome://tracing, Perfetto)"""
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': 1,
+            'args': {'name': f"LifAi agent: {self.metadata.get('agent_type', '')}"}
+        }]
+        for span in self.to_dict()['spans']:
+            args = {k: v for k, v in span['attrs'].items() if k not in ('response', 'results', 'text')}
+            events.append({
+                'name': span['name'],
+                'cat': span['category'],
+                'ph': 'X',
+                'ts': int(span['start'] * 1_000_000),
+                'dur': int((span['end'] - span['start']) * 1_000_000),
+                'pid': 1,
+                'tid': span['thread'],
+                'args': args
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.metadata}
+
+class TraceStore:
+    """Stores agent traces as JSON files in a local directory"""
+
+    def __init__(self, directory: Path, keep: int = 50):
+        self.directory = Path(directory)
+        self.directory.mkdir(exist_ok=True)
+        self.keep = keep
+
+    def save(self, trace: AgentTrace) -> Path:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        filepath = self.directory / f'trace_{timestamp}.json'
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(trace.to_dict(), f, ensure_ascii=False, indent=2)
+        logger.info(f"Agent trace saved to {filepath}")
+
+        # Clean up old traces
+        trace_files = self.list()
+        for old_file in trace_files[:-self.keep]:
+            old_file.unlink()
+        return filepath
+
+    def list(self) -> List[Path]:
+        return sorted(self.directory.glob('trace_*.json'))
+
+    def load(self, filepath: Path) -> AgentTrace:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return AgentTrace.from_dict(json.load(f))
+
+class StubOllamaClient:
+    """Replays recorded generations with their recorded latency instead of calling Ollama"""
+
+    def __init__(self, trace: AgentTrace, speed: float = 1.0):
+        self.speed = speed
+        self.recordings = {}
+        for span in trace.spans:
+            if span['category'] == 'generate' and 'prompt_key' in span['attrs']:
+                self.recordings.setdefault(span['attrs']['prompt_key'], []).append(span)
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, model: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        with self._lock:
+            recorded = self.recordings.get(prompt_key(prompt))
+            span = recorded.pop(0) if recorded else None
+            if span is None:
+                self.misses += 1
+        if span is None:
+            logger.warning("Replay: no recorded generation for prompt, returning empty response")
+            return {'response': '', 'prompt_eval_count': 0, 'eval_count': 0}
+        time.sleep((span['end'] - span['start']) * self.speed)
+        attrs = span['attrs']
+        return {
+            'response': attrs.get('response', ''),
+            'prompt_eval_count': attrs.get('prompt_eval_count', 0),
+            'eval_count': attrs.get('eval_count', 0),
+            'total_duration': attrs.get('total_duration', 0),
+            'prompt_eval_duration': attrs.get('prompt_eval_duration', 0),
+            'eval_duration': attrs.get('eval_duration', 0)
+        }
+
+def recorded_search(trace: AgentTrace, speed: float = 1.0):
+    """Build a search function that returns the recorded search results"""
+    spans = [s for s in trace.spans if s['category'] == 'search']
+
+    def search(query: str) -> list:
+        if not spans:
+            return []
+        span = spans[0]
+        time.sleep((span['end'] - span['start']) * speed)
+        return span['attrs'].get('results', [])
+    return search
+
+def recorded_fetch(trace: AgentTrace, speed: float = 1.0):
+    """Build a fetch function that returns the recorded page text"""
+    pages = {s['attrs'].get('url'): s for s in trace.spans if s['category'] == 'fetch'}
+
+    def fetch(url: str) -> str:
+        span = pages.get(url)
+        if span is None:
+            return ''
+        time.sleep((span['end'] - span['start']) * speed)
+        return span['attrs'].get('text', '')
+    return fetch
@@ -1,18 +1,77 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QTabWidget, QTextEdit, QPushButton, QComboBox,
                             QLabel, QProgressBar, QFrame, QLineEdit, QFormLayout,
-                            QMessageBox, QGroupBox)
-from PyQt6.QtCore import Qt
-from typing import Dict
+                            QMessageBox, QGroupBox, QSpinBox, QTreeWidget,
+                            QTreeWidgetItem, QListWidget, QScrollArea,
+                            QFileDialog)
+from PyQt6.QtCore import Qt, QObject, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor
+from typing import Dict, Optional
+from pathlib import Path
 import requests
 import json
 import os
+import threading
 
 from lifai.utils.ollama_client import OllamaClient
 from lifai.utils.logger_utils import get_module_logger
+from lifai.core.settings_store import SettingsStore
+from lifai.modules.agent_workspace.agent_engine import (AgentEngine, AgentBudget,
+                                                        PENDING, RUNNING)
+from lifai.modules.agent_workspace.trace import (AgentTrace, TraceStore, StubOllamaClient,
+                                                 recorded_search, recorded_fetch)
 
 logger = get_module_logger(__name__)
 
+class AgentRunSignals(QObject):
+    """Carries agent progress from the worker thread to the GUI thread"""
+    step_changed = pyqtSignal(str, str, str, float, int, int)
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    trace_saved = pyqtSignal(str)
+
+class TraceTimeline(QWidget):
+    """Draws the spans of an agent trace as a timeline"""
+    ROW_HEIGHT = 20
+    LABEL_WIDTH = 260
+    COLORS = {
+        'step': '#B0BEC5',
+        'search': '#42A5F5',
+        'fetch': '#26A69A',
+        'prompt': '#FFA726',
+        'generate': '#AB47BC'
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.trace = None
+        self.setMinimumHeight(self.ROW_HEIGHT)
+
+    def set_trace(self, trace: Optional[AgentTrace]):
+        self.trace = trace
+        rows = len(trace.spans) if trace else 0
+        self.setMinimumHeight(max(1, rows) * self.ROW_HEIGHT + 10)
+        self.update()
+
+    def paintEvent(self, event):
+        if not self.trace or not self.trace.spans:
+            return
+        painter = QPainter(self)
+        spans = sorted(self.trace.spans, key=lambda s: s['start'])
+        total = self.trace.wall_time or max(s['end'] for s in spans) or 1.0
+        scale = max(1, self.width() - self.LABEL_WIDTH - 10) / total
+
+        for row, span in enumerate(spans):
+            y = row * self.ROW_HEIGHT + 5
+            duration = span['end'] - span['start']
+            painter.setPen(QColor('#000000'))
+            painter.drawText(5, y + 14, f"{span['name'][:32]}  {duration * 1000:.0f} ms")
+            x = self.LABEL_WIDTH + int(span['start'] * scale)
+            width = max(2, int(duration * scale))
+            painter.fillRect(x, y + 2, width, self.ROW_HEIGHT - 4,
+                             QColor(self.COLORS.get(span['category'], '#9E9E9E')))
+        painter.end()
+
 class AgentWorkspaceWindow(QMainWindow):
     def __init__(self, settings: Dict, ollama_client: OllamaClient):
         super().__init__()
@@ -21,7 +80,21 @@ class AgentWorkspaceWindow(QMainWindow):
         
         # Load API settings
         self.config_file = os.path.join(os.path.dirname(__file__), 'config.json')
-        self.api_settings = self.load_api_settings()
+        self.api_settings = SettingsStore(self.config_file, defaults={
+            'searxng_instance': 'https://searx.be',  # Default public instance
+            'results_count': 5
+        })
+        
+        # Agent run state
+        self.agent_thread = None
+        self.step_items = {}
+        self.agent_signals = AgentRunSignals()
+        self.agent_signals.step_changed.connect(self.update_step_view)
+        self.agent_signals.finished.connect(self.on_agent_finished)
+        self.agent_signals.failed.connect(self.on_agent_failed)
+        self.agent_signals.trace_saved.connect(self.on_trace_saved)
+        self.trace_store = TraceStore(Path(__file__).parent / 'traces')
+        self.current_trace = None
         
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowType.WindowCloseButtonHint)
         self.setup_ui()
@@ -72,10 +145,26 @@ class AgentWorkspaceWindow(QMainWindow):
         self.agent_types.addItems(["Task Planner", "Research Agent", "Code Assistant", "Data Analyst"])
         control_layout.addWidget(self.agent_types)
         
+        # Budget controls
+        control_layout.addWidget(QLabel("Time Budget (s):"))
+        self.time_budget = QSpinBox()
+        self.time_budget.setRange(10, 3600)
+        self.time_budget.setValue(int(self.api_settings.get('agent_time_budget', 180)))
+        self.time_budget.valueChanged.connect(lambda value: self.api_settings.set('agent_time_budget', value))
+        control_layout.addWidget(self.time_budget)
+        
+        control_layout.addWidget(QLabel("Token Budget:"))
+        self.token_budget = QSpinBox()
+        self.token_budget.setRange(500, 200000)
+        self.token_budget.setSingleStep(1000)
+        self.token_budget.setValue(int(self.api_settings.get('agent_token_budget', 8000)))
+        self.token_budget.valueChanged.connect(lambda value: self.api_settings.set('agent_token_budget', value))
+        control_layout.addWidget(self.token_budget)
+        
         # Execute button
-        execute_btn = QPushButton("Execute Task")
-        execute_btn.clicked.connect(self.execute_task)
-        control_layout.addWidget(execute_btn)
+        self.execute_btn = QPushButton("Execute Task")
+        self.execute_btn.clicked.connect(self.execute_task)
+        control_layout.addWidget(self.execute_btn)
         
         layout.addWidget(control_group)
         
@@ -85,6 +174,12 @@ class AgentWorkspaceWindow(QMainWindow):
         self.progress_bar = QProgressBar()
         progress_layout.addWidget(self.progress_bar)
         
+        # Step list, updated as the agent engine reports progress
+        self.steps_view = QTreeWidget()
+        self.steps_view.setHeaderLabels(["Step", "Status", "Time"])
+        self.steps_view.setColumnWidth(0, 300)
+        progress_layout.addWidget(self.steps_view)
+        
         layout.addWidget(progress_group)
         
         # Output group
@@ -197,32 +292,131 @@ class AgentWorkspaceWindow(QMainWindow):
 
     def create_monitoring_tab(self):
         widget = QWidget()
-        layout = QVBoxLayout(widget)
-        layout.addWidget(QLabel("Agent Monitoring - Coming Soon"))
+        layout = QHBoxLayout(widget)
+        
+        # Recorded traces
+        traces_group = QGroupBox("Recorded Runs")
+        traces_layout = QVBoxLayout(traces_group)
+        self.trace_list = QListWidget()
+        self.trace_list.currentRowChanged.connect(self.on_trace_selected)
+        traces_layout.addWidget(self.trace_list)
+        
+        button_layout = QHBoxLayout()
+        export_btn = QPushButton("Export Chrome Trace")
+        export_btn.clicked.connect(self.export_trace)
+        button_layout.addWidget(export_btn)
+        self.replay_btn = QPushButton("Replay")
+        self.replay_btn.clicked.connect(self.replay_trace)
+        button_layout.addWidget(self.replay_btn)
+        traces_layout.addLayout(button_layout)
+        layout.addWidget(traces_group, 1)
+        
+        # Timeline of the selected trace
+        timeline_group = QGroupBox("Timeline")
+        timeline_layout = QVBoxLayout(timeline_group)
+        self.trace_summary = QLabel("Select a run to see its timeline")
+        self.trace_summary.setWordWrap(True)
+        timeline_layout.addWidget(self.trace_summary)
+        
+        self.timeline = TraceTimeline()
+        timeline_scroll = QScrollArea()
+        timeline_scroll.setWidgetResizable(True)
+        timeline_scroll.setWidget(self.timeline)
+        timeline_layout.addWidget(timeline_scroll)
+        layout.addWidget(timeline_group, 3)
+        
+        self.refresh_trace_list()
         return widget
 
-    def load_api_settings(self):
-        """Load API settings from config file"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading API settings: {e}")
-        return {
-            'searxng_instance': 'https://searx.be',  # Default public instance
-            'results_count': 5
-        }
+    def refresh_trace_list(self):
+        """Reload the list of recorded traces, newest first"""
+        self.trace_files = list(reversed(self.trace_store.list()))
+        self.trace_list.clear()
+        for filepath in self.trace_files:
+            self.trace_list.addItem(filepath.stem.replace('trace_', ''))
 
-    def save_api_settings(self):
-        """Save API settings to config file"""
+    def on_trace_selected(self, row: int):
+        """Show the timeline of the selected trace"""
+        if row < 0 or row >= len(self.trace_files):
+            return
         try:
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            with open(self.config_file, 'w') as f:
-                json.dump(self.api_settings, f, indent=4)
-            logger.info("API settings saved successfully")
+            self.current_trace = self.trace_store.load(self.trace_files[row])
         except Exception as e:
-            logger.error(f"Error saving API settings: {e}")
+            logger.error(f"Error loading trace: {e}")
+            return
+        
+        meta = self.current_trace.metadata
+        totals = self.current_trace.summary()
+        breakdown = ", ".join(f"{cat}: {secs:.2f}s" for cat, secs in sorted(totals.items()) if cat != 'step')
+        generations = [s['attrs'] for s in self.current_trace.spans if s['category'] == 'generate']
+        eval_tokens = sum(g.get('eval_count', 0) for g in generations)
+        eval_seconds = sum(g.get('eval_duration', 0) for g in generations) / 1e9
+        tokens_per_sec = f"{eval_tokens / eval_seconds:.1f} tok/s" if eval_seconds else "n/a"
+        self.trace_summary.setText(
+            f"{meta.get('agent_type', '')} with {meta.get('model', '')}"
+            f"{' (replay of ' + meta['replay_of'] + ')' if meta.get('replay_of') else ''}\n"
+            f"Wall time: {self.current_trace.wall_time or 0:.2f}s | {breakdown}\n"
+            f"Generations: {len(generations)}, {eval_tokens} tokens, {tokens_per_sec}"
+        )
+        self.timeline.set_trace(self.current_trace)
+
+    def on_trace_saved(self, name: str):
+        self.refresh_trace_list()
+        self.trace_list.setCurrentRow(0)
+
+    def export_trace(self):
+        """Export the selected trace in Chrome trace-event format"""
+        if not self.current_trace:
+            QMessageBox.information(self, "Export", "Select a recorded run first")
+            return
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Export Chrome Trace", "agent_trace.json", "JSON Files (*.json)"
+        )
+        if filename:
+            try:
+                with open(filename, 'w', encoding='utf-8') as f:
+                    json.dump(self.current_trace.to_chrome_trace(), f)
+                logger.info(f"Trace exported to {filename}")
+            except Exception as e:
+                logger.error(f"Error exporting trace: {e}")
+                QMessageBox.critical(self, "Error", f"Failed to export trace: {e}")
+
+    def replay_trace(self):
+        """Re-run the selected trace against a stub backend"""
+        if not self.current_trace:
+            QMessageBox.information(self, "Replay", "Select a recorded run first")
+            return
+        if self.agent_thread and self.agent_thread.is_alive():
+            logger.warning("An agent task is already running")
+            return
+        
+        recorded = self.current_trace
+        meta = recorded.metadata
+        row = self.trace_list.currentRow()
+        engine = AgentEngine(
+            ollama_client=StubOllamaClient(recorded),
+            model=meta.get('model', ''),
+            search_fn=recorded_search(recorded),
+            search_engine=meta.get('search_engine', ''),
+            fetch_fn=recorded_fetch(recorded),
+            fetch_count=meta.get('fetch_count', 3),
+            trace=AgentTrace({'replay_of': self.trace_files[row].name})
+        )
+        budget = AgentBudget(
+            max_seconds=meta.get('max_seconds', 180),
+            max_tokens=meta.get('max_tokens', 8000)
+        )
+        
+        self.steps_view.clear()
+        self.step_items = {}
+        self.execute_btn.setEnabled(False)
+        logger.info(f"Replaying trace {self.trace_files[row].name}")
+        self.agent_thread = threading.Thread(
+            target=self.run_agent,
+            args=(engine, meta.get('task', ''), meta.get('agent_type', ''), budget),
+            daemon=True
+        )
+        self.agent_thread.start()
 
     def test_search_connection(self):
         """Test connection to selected search engine"""
@@ -294,13 +488,14 @@ class AgentWorkspaceWindow(QMainWindow):
             'bing_api_key': self.bing_api_key.text(),
             'results_count': int(self.results_count.currentText())
         })
-        self.save_api_settings()
+        self.api_settings.flush()
+        logger.info("API settings saved successfully")
         QMessageBox.information(self, "Success", "Settings saved successfully!")
 
     def searxng_search(self, query: str) -> list:
         """Perform search using SearXNG"""
         try:
-            instance_url = self.api_settings['searxng_instance']
+            instance_url = self.api_settings.get('searxng_instance')
             
             # Basic parameters without format specification
             params = {
@@ -375,7 +570,7 @@ class AgentWorkspaceWindow(QMainWindow):
                                 'link': link
                             })
                         
-                    if len(results) >= self.api_settings['results_count']:
+                    if len(results) >= self.api_settings.get('results_count'):
                         break
                         
                 except Exception as e:
@@ -415,7 +610,7 @@ class AgentWorkspaceWindow(QMainWindow):
                 'key': api_key,
                 'cx': cx,
                 'q': query,
-                'num': min(int(self.api_settings['results_count']), 10)
+                'num': min(int(self.api_settings.get('results_count')), 10)
             }
             
             response = requests.get(url, params=params)
@@ -445,7 +640,7 @@ class AgentWorkspaceWindow(QMainWindow):
             headers = {"Ocp-Apim-Subscription-Key": api_key}
             params = {
                 "q": query,
-                "count": min(int(self.api_settings['results_count']), 50)
+                "count": min(int(self.api_settings.get('results_count')), 50)
             }
             
             response = requests.get(url, headers=headers, params=params)
@@ -464,62 +659,90 @@ class AgentWorkspaceWindow(QMainWindow):
 
     def execute_task(self):
         """Execute the selected task with the chosen agent"""
-        try:
-            task_text = self.task_input.toPlainText().strip()
-            agent_type = self.agent_types.currentText()
-            
-            if not task_text:
-                logger.warning("No task text provided")
-                return
-                
-            logger.info(f"Executing task with {agent_type}")
-            self.progress_bar.setValue(10)
-            
-            # For Research Agent, perform web search first
-            search_results = []
-            if agent_type == "Research Agent":
-                logger.info("Performing web search...")
-                search_results = self.web_search(task_text)
-                if not search_results:
-                    logger.warning("No search results found")
+        if self.agent_thread and self.agent_thread.is_alive():
+            logger.warning("An agent task is already running")
+            return
             
-            # Construct the prompt based on agent type and search results
-            prompt = f"You are a {agent_type}. Please help with this task:\n\n{task_text}\n\n"
-            
-            if search_results:
-                prompt += "\nBased on these search results:\n"
-                for i, result in enumerate(search_results, 1):
-                    prompt += f"\n{i}. {result['title']}\n"
-                    prompt += f"   {result['snippet']}\n"
-                    prompt += f"   Source: {result['link']}\n"
-            
-            prompt += "\nProvide your response in a clear, step-by-step format."
-            
-            logger.debug(f"Generated prompt with {'web search results' if search_results else 'no search results'}")
-            self.progress_bar.setValue(30)
-            
-            # Generate response using ollama
-            response = self.ollama_client.generate_response(
-                prompt=prompt,
-                model=self.settings['model'].get()
-            )
-            
-            self.progress_bar.setValue(70)
+        task_text = self.task_input.toPlainText().strip()
+        agent_type = self.agent_types.currentText()
+        
+        if not task_text:
+            logger.warning("No task text provided")
+            return
             
-            if response:
-                self.task_output.clear()
-                self.task_output.setPlainText(response)
-                self.progress_bar.setValue(100)
-                logger.info("Task executed successfully")
-            else:
-                logger.error("No response generated from the model")
-                self.task_output.setPlainText("Error: Failed to generate response")
-                self.progress_bar.setValue(0)
-                
+        logger.info(f"Executing task with {agent_type}")
+        
+        engine = AgentEngine(
+            ollama_client=self.ollama_client,
+            model=self.settings['model'].get(),
+            search_fn=self.web_search,
+            search_engine=self.api_settings.get('search_engine', 'SearXNG'),
+            fetch_count=min(3, int(self.api_settings.get('results_count', 5)))
+        )
+        budget = AgentBudget(
+            max_seconds=self.time_budget.value(),
+            max_tokens=self.token_budget.value()
+        )
+        
+        self.steps_view.clear()
+        self.step_items = {}
+        self.task_output.clear()
+        self.progress_bar.setValue(0)
+        self.execute_btn.setEnabled(False)
+        
+        self.agent_thread = threading.Thread(
+            target=self.run_agent,
+            args=(engine, task_text, agent_type, budget),
+            daemon=True
+        )
+        self.agent_thread.start()
+
+    def run_agent(self, engine: AgentEngine, task_text: str, agent_type: str, budget: AgentBudget):
+        """Run the agent engine in a worker thread"""
+        try:
+            result = engine.run(task_text, agent_type, budget, on_progress=self.on_agent_progress)
+            logger.info(f"Task executed successfully ({budget.tokens_used} tokens)")
+            self.agent_signals.finished.emit(result)
         except Exception as e:
             logger.error(f"Error executing task: {e}")
-            self.task_output.setPlainText(f"Error: {str(e)}")
-            self.progress_bar.setValue(0)
+            self.agent_signals.failed.emit(str(e))
+        finally:
+            try:
+                engine.trace.finish()
+                filepath = self.trace_store.save(engine.trace)
+                self.agent_signals.trace_saved.emit(filepath.name)
+            except Exception as e:
+                logger.error(f"Error saving agent trace: {e}")
+
+    def on_agent_progress(self, step, steps):
+        """Forward step progress from the worker thread to the GUI"""
+        settled = sum(1 for s in steps if s.status not in (PENDING, RUNNING))
+        self.agent_signals.step_changed.emit(
+            step.step_id, step.description, step.status,
+            step.duration, settled, len(steps)
+        )
+
+    def update_step_view(self, step_id: str, description: str, status: str,
+                         duration: float, settled: int, total: int):
+        """Update the step list in the Task Planning tab"""
+        item = self.step_items.get(step_id)
+        if item is None:
+            item = QTreeWidgetItem([description, "", ""])
+            self.steps_view.addTopLevelItem(item)
+            self.step_items[step_id] = item
+        item.setText(1, status)
+        item.setText(2, f"{duration:.1f}s" if duration else "")
+        self.progress_bar.setValue(int(settled * 100 / total) if total else 0)
+
+    def on_agent_finished(self, result: str):
+        self.task_output.setPlainText(result)
+        self.progress_bar.setValue(100)
+        self.execute_btn.setEnabled(True)
+
+    def on_agent_failed(self, error: str):
+        self.task_output.setPlainText(f"Error: {error}")
+        self.progress_bar.setValue(0)
+        self.execute_btn.setEnabled(True)
 
     def closeEvent(self, event):
         event.ignore()
@@ -0,0 +1,124 @@
+import time
+import threading
+from typing import Optional
+from lifai.utils.ollama_client import OllamaClient
+from lifai.utils.logger_utils import get_module_logger
+from lifai.utils.prompt_eval_stats import prompt_eval_stats
+from lifai.config.prompts import prompt_registry
+
+logger = get_module_logger(__name__)
+
+class SpeculativeJob:
+    def __init__(self, prompt_name: str, model: str, text: str):
+        self.prompt_name = prompt_name
+        self.model = model
+        self.text = text
+        self.result = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+        self.cancel_event = threading.Event()
+
+    def matches(self, prompt_name: str, model: str, text: str) -> bool:
+        return (self.prompt_name, self.model, self.text.strip()) == (prompt_name, model, text.strip())
+
+class SpeculativeGenerator:
+    """Pre-generates a result for the latest selection and commits or discards it"""
+
+    def __init__(self, ollama_client: OllamaClient, max_age: float = 120.0):
+        self.ollama_client = ollama_client
+        self.max_age = max_age
+        self.job = None
+        self._lock = threading.Lock()
+
+        # Hit/waste tracking
+        self.submitted = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.seconds_saved = 0.0
+
+    @property
+    def pending(self) -> Optional[SpeculativeJob]:
+        with self._lock:
+            return self.job
+
+    def submit(self, prompt_name: str, model: str, text: str):
+        """Start generating for a selection, cancelling any speculation for an older one"""
+        with self._lock:
+            if self.job and self.job.matches(prompt_name, model, text):
+                return
+            self._discard_locked()
+            job = SpeculativeJob(prompt_name, model, text)
+            self.job = job
+            self.submitted += 1
+        logger.debug(f"Speculating '{prompt_name}' for {len(text)} characters")
+        threading.Thread(target=self.run_job, args=(job,), daemon=True).start()
+
+    def run_job(self, job: SpeculativeJob):
+        try:
+            template = prompt_registry.get(job.prompt_name)
+            system, prompt = template.split(job.text)
+            parts = []
+            final = {}
+            for chunk in self.ollama_client.generate_stream(prompt, job.model, system=system,
+                                                            cancel_event=job.cancel_event,
+                                                            options=template.options(job.text, job.model),
+                                                            template_name=job.prompt_name):
+                parts.append(chunk.get('response', ''))
+                if chunk.get('done'):
+                    final = chunk
+            if final and not job.cancel_event.is_set():
+                job.result = ''.join(parts).strip()
+                prompt_eval_stats.record(job.prompt_name, len(system) + len(prompt), final)
+        except Exception as e:
+            logger.error(f"Error in speculative generation: {e}")
+        finally:
+            job.finished_at = time.time()
+            job.done.set()
+
+    def take(self, prompt_name: str, model: str, text: str, timeout: float = 300.0) -> Optional[str]:
+        """Commit the speculation if it matches the confirmed request, waiting for it to finish"""
+        with self._lock:
+            job = self.job
+            if job is None:
+                return None
+            if not job.matches(prompt_name, model, text) or time.time() - job.started_at > self.max_age:
+                self._discard_locked()
+                self.misses += 1
+                return None
+            self.job = None
+
+        confirmed_at = time.time()
+        job.done.wait(timeout)
+        if not job.result:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            # Time the user didn't have to wait because generation started early
+            self.seconds_saved += min(job.finished_at, confirmed_at) - job.started_at
+        logger.info(f"Speculative hit for '{prompt_name}'. {self.report()}")
+        return job.result
+
+    def cancel(self):
+        """Drop the pending speculation"""
+        with self._lock:
+            self._discard_locked()
+
+    def _discard_locked(self):
+        if self.job is not None:
+            self.job.cancel_event.set()
+            self.wasted += 1
+            self.job = None
+
+    def report(self) -> str:
+        with self._lock:
+            if not self.submitted:
+                return "No speculative generations yet"
+            return (f"Speculation: {self.submitted} submitted, {self.hits} hits "
+                    f"({self.hits / self.submitted:.0%}), {self.wasted} wasted "
+                    f"({self.wasted / self.submitted:.0%}), {self.misses} misses, "
+                    f"{self.seconds_saved:.1f}s of waiting saved")
@@ -1,21 +1,90 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import Dict, Callable
+from typing import Dict, Callable, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
 from pynput import mouse
 from lifai.utils.ollama_client import OllamaClient
 from lifai.utils.clipboard_utils import ClipboardManager
 from lifai.utils.logger_utils import get_module_logger
-from lifai.config.prompts import improvement_options, llm_prompts
+from lifai.config.prompts import prompt_registry
+from lifai.modules.floating_toolbar.speculative import SpeculativeGenerator
+from lifai.utils.text_segments import SegmentedRewriter
+from lifai.utils.spell_index import SpellPrepass
+from lifai.utils.translation_memory import TranslationMemory
+from collections import Counter
 import time
 import threading
 
 logger = get_module_logger(__name__)
 
+class VariantChooser(tk.Toplevel):
+    """Compact window listing fan-out results as they finish"""
+    def __init__(self, variants: List[Tuple[str, str]], on_choose: Callable[[str], None]):
+        super().__init__()
+        self.on_choose = on_choose
+        self.results = {}
+        self.rows = []
+        
+        self.title("LifAi Results")
+        self.attributes('-topmost', True)
+        self.resizable(False, False)
+        
+        frame = ttk.Frame(self, padding=5)
+        frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(frame, text="Pick a result to paste:").pack(anchor=tk.W, pady=(0, 5))
+        
+        for index, (prompt_name, model) in enumerate(variants):
+            row = ttk.Frame(frame)
+            row.pack(fill=tk.X, pady=2)
+            ttk.Label(row, text=f"{prompt_name} · {model.split('/')[-1]}",
+                      font=('Segoe UI', 9, 'bold')).pack(anchor=tk.W)
+            preview = ttk.Label(row, text="Generating...", foreground='gray',
+                                wraplength=380, justify=tk.LEFT)
+            preview.pack(anchor=tk.W, fill=tk.X)
+            use_btn = ttk.Button(row, text="Use", width=6, state='disabled',
+                                 command=lambda i=index: self.choose(i))
+            use_btn.pack(anchor=tk.E)
+            self.rows.append((preview, use_btn))
+        
+        ttk.Button(frame, text="Cancel", command=self.destroy).pack(anchor=tk.E, pady=(5, 0))
+        
+    def post_result(self, index: int, text: Optional[str], elapsed: float):
+        """Thread-safe: show a finished variant"""
+        try:
+            self.after(0, self.show_result, index, text, elapsed)
+        except (RuntimeError, tk.TclError):
+            pass  # Chooser already closed
+            
+    def show_result(self, index: int, text: Optional[str], elapsed: float):
+        if not self.winfo_exists():
+            return
+        preview, use_btn = self.rows[index]
+        if text:
+            self.results[index] = text
+            short = text if len(text) <= 300 else text[:300] + "..."
+            preview.configure(text=f"{short}\n({elapsed:.1f}s)", foreground='black')
+            use_btn.configure(state='normal')
+        else:
+            preview.configure(text=f"Failed ({elapsed:.1f}s)", foreground='#FF5252')
+            
+    def choose(self, index: int):
+        text = self.results.get(index)
+        self.destroy()
+        if text:
+            self.on_choose(text)
+
 class FloatingToolbar(tk.Toplevel):
-    def __init__(self, callback: Callable, clipboard: ClipboardManager):
+    def __init__(self, callback: Callable, clipboard: ClipboardManager,
+                 settings: Optional[Dict] = None, fanout_callback: Optional[Callable] = None,
+                 speculate_callback: Optional[Callable] = None,
+                 commit_callback: Optional[Callable] = None):
         super().__init__()
         self.callback = callback
         self.clipboard = clipboard
+        self.settings = settings or {}
+        self.fanout_callback = fanout_callback
+        self.speculate_callback = speculate_callback
+        self.commit_callback = commit_callback
         
         # Prevent window from being closed with X button
         self.protocol("WM_DELETE_WINDOW", lambda: None)
@@ -46,16 +115,59 @@ class FloatingToolbar(tk.Toplevel):
         title_frame.bind('<B1-Motion>', self.on_drag)
         
         # Create prompt selection
-        self.selected_prompt = tk.StringVar(value=improvement_options[0])
+        prompt_names = prompt_registry.names()
+        self.selected_prompt = tk.StringVar(value=prompt_names[0])
         self.prompt_combo = ttk.Combobox(
             self.main_frame,
             textvariable=self.selected_prompt,
-            values=improvement_options,
+            values=prompt_names,
             state='readonly',
             width=30
         )
         self.prompt_combo.pack(pady=(0, 5))
         
+        # Fan-out mode runs the selection through several prompts/models at once
+        self.fanout_enabled = tk.BooleanVar(value=False)
+        if self.fanout_callback:
+            ttk.Checkbutton(
+                self.main_frame,
+                text="Compare prompts/models",
+                variable=self.fanout_enabled,
+                command=self.toggle_fanout
+            ).pack(anchor=tk.W, pady=(0, 5))
+        
+        self.fanout_frame = ttk.Frame(self.main_frame)
+        ttk.Label(self.fanout_frame, text="Prompts:").pack(anchor=tk.W)
+        self.fanout_prompts = tk.Listbox(self.fanout_frame, selectmode=tk.MULTIPLE,
+                                         exportselection=False, height=5, width=30)
+        self.fanout_prompts.pack(fill=tk.X)
+        ttk.Label(self.fanout_frame, text="Models:").pack(anchor=tk.W)
+        self.fanout_models = tk.Listbox(self.fanout_frame, selectmode=tk.MULTIPLE,
+                                        exportselection=False, height=3, width=30)
+        self.fanout_models.pack(fill=tk.X, pady=(0, 5))
+        
+        # Speculative mode pre-generates as soon as a selection is made
+        self.speculate_enabled = tk.BooleanVar(value=False)
+        if self.speculate_callback:
+            ttk.Checkbutton(
+                self.main_frame,
+                text="Speculate on selection",
+                variable=self.speculate_enabled,
+                command=self.toggle_speculation
+            ).pack(anchor=tk.W, pady=(0, 5))
+        # Segment mode only re-sends the parts of long selections that changed
+        self.segment_enabled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.main_frame,
+            text="Segment long selections",
+            variable=self.segment_enabled
+        ).pack(anchor=tk.W, pady=(0, 5))
+        
+        self.speculation_listener = None
+        self.speculation_timer = None
+        self.speculation_ready = False
+        self.spec_mouse_down_time = None
+        
         # Create enhance button
         self.enhance_btn = ttk.Button(
             self.main_frame,
@@ -132,22 +244,120 @@ class FloatingToolbar(tk.Toplevel):
         y = self.mini_window.winfo_y() - self.drag_data["y"] + event.y
         self.mini_window.geometry(f"+{x}+{y}")
         
+    def toggle_fanout(self):
+        """Show or hide the fan-out variant lists"""
+        if self.fanout_enabled.get():
+            self.fill_listbox(self.fanout_prompts, self.prompt_combo['values'], [self.selected_prompt.get()])
+            models = list(self.settings.get('models_list') or [])
+            current_model = self.settings['model'].get() if 'model' in self.settings else ''
+            if current_model and current_model not in models:
+                models.insert(0, current_model)
+            self.fill_listbox(self.fanout_models, models, [current_model])
+            self.fanout_frame.pack(fill=tk.X, before=self.enhance_btn)
+        else:
+            self.fanout_frame.pack_forget()
+            
+    def fill_listbox(self, listbox: tk.Listbox, values, selected):
+        """Replace listbox contents, keeping the given values selected"""
+        listbox.delete(0, tk.END)
+        for i, value in enumerate(values):
+            listbox.insert(tk.END, value)
+            if value in selected:
+                listbox.selection_set(i)
+                
+    def selected_variants(self) -> List[Tuple[str, str]]:
+        """Every selected (prompt, model) combination for fan-out mode"""
+        prompts = [self.fanout_prompts.get(i) for i in self.fanout_prompts.curselection()]
+        models = [self.fanout_models.get(i) for i in self.fanout_models.curselection()]
+        prompts = prompts or [self.selected_prompt.get()]
+        models = models or [self.settings['model'].get()]
+        return [(prompt, model) for prompt in prompts for model in models]
+        
+    def toggle_speculation(self):
+        """Start or stop watching selections for speculative generation"""
+        if self.speculate_enabled.get():
+            if not self.speculation_listener:
+                self.speculation_listener = mouse.Listener(on_click=self.on_speculative_click)
+                self.speculation_listener.start()
+                logger.info("Speculative mode enabled")
+        else:
+            self.stop_speculation()
+            logger.info("Speculative mode disabled")
+            
+    def stop_speculation(self):
+        if self.speculation_timer:
+            self.speculation_timer.cancel()
+            self.speculation_timer = None
+        if self.speculation_listener:
+            self.speculation_listener.stop()
+            self.speculation_listener = None
+        self.set_speculation_ready(False)
+            
+    def on_speculative_click(self, x, y, button, pressed):
+        """Capture drag-selections in the background, debounced"""
+        if button != mouse.Button.left or self.waiting_for_selection:
+            return
+        if pressed:
+            self.spec_mouse_down_time = time.time()
+            # A new press may start a new selection, so hold off any pending capture
+            if self.speculation_timer:
+                self.speculation_timer.cancel()
+                self.speculation_timer = None
+        elif self.spec_mouse_down_time:
+            hold_duration = time.time() - self.spec_mouse_down_time
+            self.spec_mouse_down_time = None
+            if hold_duration > 0.2:
+                self.speculation_timer = threading.Timer(0.15, self.capture_speculation)
+                self.speculation_timer.daemon = True
+                self.speculation_timer.start()
+                
+    def capture_speculation(self):
+        """Read the new selection and hand it to the speculative generator"""
+        self.speculation_timer = None
+        selected_text = self.clipboard.peek_selected_text()
+        if selected_text.strip():
+            logger.debug(f"Speculative capture: {selected_text[:100]}...")
+            self.speculate_callback(selected_text)
+            self.after(0, self.set_speculation_ready, True)
+            
+    def set_speculation_ready(self, ready: bool):
+        self.speculation_ready = ready
+        if not self.waiting_for_selection:
+            self.enhance_btn.configure(
+                text="✨ Enhance Selection" if ready else "✨ Select & Enhance",
+                state='normal'
+            )
+        
     def start_enhancement(self):
         """Start the enhancement process"""
         if self.waiting_for_selection:
             return
             
         selected_prompt = self.selected_prompt.get()
-        prompt_template = llm_prompts[selected_prompt]
+        
+        # Confirm the speculative job for the selection that was already captured
+        if self.speculation_ready and not self.fanout_enabled.get():
+            self.speculation_ready = False
+            self.enhance_btn.configure(text="Processing...", state='disabled')
+            
+            def commit():
+                try:
+                    self.commit_callback(selected_prompt)
+                finally:
+                    self.after(0, self.set_speculation_ready, False)
+            threading.Thread(target=commit, daemon=True).start()
+            return
+            
+        variants = self.selected_variants() if self.fanout_enabled.get() else None
         self.enhance_btn.configure(text="Select text now...", state='disabled')
         self.waiting_for_selection = True
         
         # Start waiting for selection in a separate thread
         threading.Thread(target=self.wait_for_selection, 
-                       args=(prompt_template,), 
+                       args=(selected_prompt, variants), 
                        daemon=True).start()
         
-    def wait_for_selection(self, prompt_template):
+    def wait_for_selection(self, prompt_name, variants=None):
         """Wait for text selection and then process it"""
         try:
             self.mouse_down = False
@@ -170,7 +380,10 @@ class FloatingToolbar(tk.Toplevel):
                                 if selected_text:
                                     logger.debug(f"Selection complete after {hold_duration:.2f}s: {selected_text[:100]}...")
                                     self.waiting_for_selection = False
-                                    self.callback(prompt_template, selected_text)
+                                    if variants:
+                                        self.fanout_callback(variants, selected_text)
+                                    else:
+                                        self.callback(prompt_name, selected_text)
                                     return False  # Stop listener
                             else:
                                 logger.debug(f"Ignored quick click ({hold_duration:.2f}s)")
@@ -192,6 +405,10 @@ class FloatingToolbar(tk.Toplevel):
                 state='normal'
             ))
             
+    def destroy(self):
+        self.stop_speculation()
+        super().destroy()
+            
     def update_prompts(self, new_options):
         """Update the prompts dropdown with new options"""
         current = self.selected_prompt.get()
@@ -205,8 +422,15 @@ class FloatingToolbar(tk.Toplevel):
         
         # Force the combobox to refresh
         self.prompt_combo.update()
+        
+        if self.fanout_enabled.get():
+            selected = [self.fanout_prompts.get(i) for i in self.fanout_prompts.curselection()]
+            self.fill_listbox(self.fanout_prompts, new_options, selected)
 
 class FloatingToolbarModule:
+    # Shorter selections are cheaper to send in one request
+    SEGMENT_MIN_CHARS = 1500
+
     def __init__(self, settings: Dict, ollama_client: OllamaClient):
         logger.info("Initializing Floating Toolbar Module")
         self.settings = settings
@@ -214,13 +438,25 @@ class FloatingToolbarModule:
         self.clipboard = ClipboardManager()
         self.toolbar = None
         self.cached_options = None
+        self.speculator = SpeculativeGenerator(ollama_client)
+        self.rewriter = SegmentedRewriter(ollama_client)
+        # Spelling-only templates that opt in send just the sentences a dictionary check flags
+        self.spell_prepass = SpellPrepass(settings.get('spell_wordlist'))
+        # Translation templates reuse earlier sentence translations
+        self.translation_memory = TranslationMemory()
+        self.template_usage = Counter()
+        self.speculative_focus = None
 
     def enable(self):
         logger.info("Enabling Floating Toolbar")
         if not self.toolbar:
             self.toolbar = FloatingToolbar(
                 callback=self.process_text,
-                clipboard=self.clipboard
+                clipboard=self.clipboard,
+                settings=self.settings,
+                fanout_callback=self.process_fanout,
+                speculate_callback=self.speculate,
+                commit_callback=self.commit_speculation
             )
             # Apply any cached updates
             if self.cached_options:
@@ -230,23 +466,76 @@ class FloatingToolbarModule:
 
     def disable(self):
         logger.info("Disabling Floating Toolbar")
+        self.speculator.cancel()
         if self.toolbar:
             self.toolbar.destroy()
             self.toolbar = None
 
-    def process_text(self, prompt_template: str, selected_text: str):
+    def most_used_template(self) -> str:
+        """The template to speculate with"""
+        for name, _ in self.template_usage.most_common():
+            if prompt_registry.get(name):
+                return name
+        return self.toolbar.selected_prompt.get() if self.toolbar else prompt_registry.names()[0]
+
+    def speculate(self, selected_text: str):
+        """Pre-generate the most-used template for a fresh selection"""
+        self.speculative_focus = self.clipboard.remember_focus()
+        self.speculator.submit(
+            self.most_used_template(),
+            self.settings['model'].get(),
+            selected_text
+        )
+
+    def commit_speculation(self, prompt_name: str):
+        """Paste the result for the speculatively captured selection"""
+        job = self.speculator.pending
+        if job is None:
+            return
+        self.clipboard.restore_focus(self.speculative_focus)
+        self.process_text(prompt_name, job.text)
+
+    def process_text(self, prompt_name: str, selected_text: str):
         """Process the text after user selects it"""
         try:
-            logger.info("Processing text with prompt template")
+            logger.info(f"Processing text with prompt template: {prompt_name}")
             logger.debug(f"Selected text length: {len(selected_text)}")
+            self.template_usage[prompt_name] += 1
+            model = self.settings['model'].get()
 
-            prompt = prompt_template.format(text=selected_text)
+            # Use the speculative result if it was generated for this exact request
+            improved_text = self.speculator.take(prompt_name, model, selected_text)
+            if improved_text is None:
+                template = prompt_registry.get(prompt_name)
+                if template is None:
+                    raise KeyError(f"Unknown prompt template: {prompt_name}")
 
-            logger.debug("Sending request to Ollama")
-            improved_text = self.ollama_client.generate_response(
-                prompt=prompt,
-                model=self.settings['model'].get()
-            )
+                logger.debug("Sending request to Ollama")
+                if self.translation_memory.applies(template):
+                    improved_text = self.translation_memory.translate(
+                        template,
+                        selected_text,
+                        lambda text, reference: self.ollama_client.generate_template(
+                            template=template, text=text, model=model, reference=reference)
+                    )
+                elif self.toolbar and self.toolbar.segment_enabled.get() and len(selected_text) > self.SEGMENT_MIN_CHARS:
+                    improved_text = self.rewriter.rewrite(
+                        template=template,
+                        text=selected_text,
+                        model=model
+                    )
+                elif self.spell_prepass.applies(template):
+                    improved_text = self.spell_prepass.run(
+                        template,
+                        selected_text,
+                        lambda text: self.ollama_client.generate_template(template=template, text=text, model=model)
+                    )
+                else:
+                    improved_text = self.ollama_client.generate_template(
+                        template=template,
+                        text=selected_text,
+                        model=model
+                    )
 
             if improved_text:
                 logger.info("Successfully processed text")
@@ -259,6 +548,62 @@ class FloatingToolbarModule:
             logger.error(f"Error processing text: {str(e)}")
             messagebox.showerror("Error", f"Error processing text: {e}")
 
+    def process_fanout(self, variants: List[Tuple[str, str]], selected_text: str):
+        """Run the selection through several prompt/model variants concurrently"""
+        logger.info(f"Fan-out over {len(variants)} variants")
+        focus = self.clipboard.remember_focus()
+        
+        # The chooser has to be created on the Tk thread
+        chooser_ready = threading.Event()
+        holder = {}
+        
+        def open_chooser():
+            holder['chooser'] = VariantChooser(
+                variants,
+                on_choose=lambda text: self.use_variant(text, focus)
+            )
+            chooser_ready.set()
+            
+        self.toolbar.after(0, open_chooser)
+        if not chooser_ready.wait(timeout=5):
+            logger.error("Variant chooser did not open")
+            return
+        chooser = holder['chooser']
+        started = time.time()
+        elapsed = []
+        
+        def run_variant(index: int, prompt_name: str, model: str):
+            variant_start = time.time()
+            result = None
+            try:
+                template = prompt_registry.get(prompt_name)
+                result = self.ollama_client.generate_template(
+                    template=template,
+                    text=selected_text,
+                    model=model
+                )
+            except Exception as e:
+                logger.error(f"Error processing variant {prompt_name} / {model}: {e}")
+            duration = time.time() - variant_start
+            elapsed.append(duration)
+            chooser.post_result(index, result, duration)
+            
+        executor = ThreadPoolExecutor(max_workers=len(variants), thread_name_prefix='fanout')
+        futures = [executor.submit(run_variant, i, name, model) for i, (name, model) in enumerate(variants)]
+        executor.shutdown(wait=True)
+        for future in futures:
+            future.result()
+        logger.info(f"Fan-out finished in {time.time() - started:.1f}s "
+                    f"(serial would take about {sum(elapsed):.1f}s)")
+        
+    def use_variant(self, text: str, focus):
+        """Paste the chosen fan-out result back into the original window"""
+        def paste():
+            self.clipboard.restore_focus(focus)
+            time.sleep(0.1)  # Let the target window take focus
+            self.clipboard.replace_selected_text(text.strip())
+        threading.Thread(target=paste, daemon=True).start()
+
     def update_prompts(self, new_options):
         """Handle prompt updates whether toolbar is active or not"""
         self.cached_options = new_options
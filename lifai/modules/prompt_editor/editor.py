@@ -2,10 +2,12 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import json
 import os
-from typing import Dict, Callable
+from typing import Dict, Callable, Optional
 from datetime import datetime
 from lifai.utils.logger_utils import get_module_logger
-from lifai.config.prompts import improvement_options, llm_prompts
+from lifai.config.prompts import prompt_registry, default_profile
+from lifai.config.prompt_registry import (PromptRegistry, PromptTemplateError, GenerationProfile,
+                                          validate_template, load_legacy_prompts)
 
 logger = get_module_logger(__name__)
 
@@ -13,65 +15,39 @@ class PromptEditorWindow:
     def __init__(self, settings: Dict):
         self.settings = settings
         self.window = None
-        self.prompts_file = os.path.join(os.path.dirname(__file__), '../../config/saved_prompts.py')
+        self.registry = prompt_registry
         
-        # Load saved prompts or use defaults
+        # Work on a copy of the registry templates until changes are applied
         self.prompts_data = {
-            'templates': self.load_saved_prompts()
+            'templates': self.load_saved_prompts(),
+            'profiles': {name: p.to_dict() for name, p in self.registry.profiles().items()}
         }
         self.update_callbacks = []
         self.is_visible = False
         self.has_unsaved_changes = False
+        self.registry.subscribe(self.notify_prompt_updates)
         
     def load_saved_prompts(self):
-        """Load prompts from saved file or return defaults"""
-        try:
-            if os.path.exists(self.prompts_file):
-                namespace = {}
-                with open(self.prompts_file, 'r', encoding='utf-8') as f:
-                    exec(f.read(), namespace)
-                if 'llm_prompts' in namespace:
-                    logger.info("Loaded saved prompts successfully")
-                    return namespace['llm_prompts']
-        except Exception as e:
-            logger.error(f"Error loading saved prompts: {e}")
-        return llm_prompts.copy()
+        """Load prompts from the prompt registry"""
+        return self.registry.as_dict()
 
-    def save_prompts_to_file(self):
-        """Save current prompts to file"""
-        try:
-            os.makedirs(os.path.dirname(self.prompts_file), exist_ok=True)
-            with open(self.prompts_file, 'w', encoding='utf-8') as f:
-                f.write("llm_prompts = {\n")
-                for name, template in self.prompts_data['templates'].items():
-                    f.write(f"    \"{name}\": \"\"\"{template}\"\"\",\n")
-                f.write("}\n\n")
-                f.write("# Get options from llm_prompts keys\n")
-                f.write("improvement_options = list(llm_prompts.keys())\n")
-            logger.info("Prompts saved to file successfully")
-        except Exception as e:
-            logger.error(f"Error saving prompts to file: {e}")
-            messagebox.showerror("Error", f"Failed to save prompts: {e}")
+    def save_prompts_to_file(self, prompts_data: Optional[Dict] = None):
+        """Validate prompts (the current ones by default) and store them in the registry"""
+        prompts_data = prompts_data or self.prompts_data
+        profiles = {name: GenerationProfile.from_dict(data)
+                    for name, data in prompts_data['profiles'].items()
+                    if name in prompts_data['templates']}
+        self.registry.replace_all(prompts_data['templates'], profiles)
+        logger.info(f"Prompts saved to registry (version {self.registry.version})")
 
     def add_update_callback(self, callback: Callable):
         """Add a callback to be notified when prompts are updated"""
         if callback not in self.update_callbacks:
             self.update_callbacks.append(callback)
         
-    def notify_prompt_updates(self):
-        """Update the global prompts"""
-        # Update global variables
-        llm_prompts.clear()
-        llm_prompts.update(self.prompts_data['templates'])
-        
-        # Get the list of options
-        options = list(llm_prompts.keys())
-        
-        # Update improvement_options
-        improvement_options.clear()
-        improvement_options.extend(options)
-        
-        # Notify all callbacks with the new options
+    def notify_prompt_updates(self, registry: PromptRegistry):
+        """Notify all callbacks with the new prompt options"""
+        options = registry.names()
         for callback in self.update_callbacks:
             try:
                 callback(options)
@@ -98,7 +74,7 @@ class PromptEditorWindow:
             
         self.window = tk.Toplevel()
         self.window.title("Prompt Editor")
-        self.window.geometry("600x500")
+        self.window.geometry("650x640")
         
         # Prevent window from being closed with X button
         self.window.protocol("WM_DELETE_WINDOW", lambda: None)
@@ -140,6 +116,36 @@ class PromptEditorWindow:
         help_text = "Use {text} as placeholder for the selected text in your prompt template"
         ttk.Label(editor_frame, text=help_text, foreground='gray').pack(anchor=tk.W)
         
+        # Generation profile
+        profile_frame = ttk.LabelFrame(editor_frame, text="Generation", padding=5)
+        profile_frame.pack(fill=tk.X, pady=(5, 0))
+        self.profile_vars = {
+            'output_ratio': tk.StringVar(),
+            'min_tokens': tk.StringVar(),
+            'max_tokens': tk.StringVar(),
+            'temperature': tk.StringVar()
+        }
+        labels = [
+            ('output_ratio', "Output length (× input):"),
+            ('min_tokens', "Min tokens:"),
+            ('max_tokens', "Max tokens:"),
+            ('temperature', "Temperature (blank = model default):")
+        ]
+        for row, (key, label) in enumerate(labels):
+            ttk.Label(profile_frame, text=label).grid(row=row, column=0, sticky=tk.W)
+            ttk.Entry(profile_frame, textvariable=self.profile_vars[key], width=10).grid(
+                row=row, column=1, sticky=tk.W, padx=5, pady=1)
+        ttk.Label(profile_frame, text="Stop sequences (one per line, \\n for newline):").grid(
+            row=len(labels), column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        self.stop_text = tk.Text(profile_frame, height=3, width=40)
+        self.stop_text.grid(row=len(labels) + 1, column=0, columnspan=2, sticky=tk.EW)
+        self.spell_prepass_var = tk.BooleanVar()
+        ttk.Checkbutton(profile_frame, text="Skip the model when a dictionary finds no misspellings "
+                        "(spelling-only prompts)", variable=self.spell_prepass_var).grid(
+            row=len(labels) + 2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        profile_frame.columnconfigure(1, weight=1)
+        self.show_profile(GenerationProfile())
+        
         # Buttons frame
         buttons_frame = ttk.Frame(editor_frame)
         buttons_frame.pack(fill=tk.X, pady=10)
@@ -212,11 +218,39 @@ class PromptEditorWindow:
         self.template_text.delete('1.0', tk.END)
         self.template_text.insert('1.0', template)
         
+        profile = self.prompts_data['profiles'].get(name)
+        self.show_profile(GenerationProfile.from_dict(profile) if profile else default_profile(name))
+        
+    def show_profile(self, profile: GenerationProfile):
+        """Fill the generation fields from a profile"""
+        self.profile_vars['output_ratio'].set(f"{profile.output_ratio:g}")
+        self.profile_vars['min_tokens'].set(str(profile.min_tokens))
+        self.profile_vars['max_tokens'].set(str(profile.max_tokens))
+        self.profile_vars['temperature'].set('' if profile.temperature is None else f"{profile.temperature:g}")
+        self.stop_text.delete('1.0', tk.END)
+        self.stop_text.insert('1.0', '\n'.join(s.replace('\n', '\\n') for s in profile.stop))
+        self.spell_prepass_var.set(profile.spell_prepass)
+        
+    def read_profile(self) -> GenerationProfile:
+        """Build a profile from the generation fields, raising PromptTemplateError on bad input"""
+        temperature = self.profile_vars['temperature'].get().strip()
+        stop = [line.replace('\\n', '\n') for line in self.stop_text.get('1.0', 'end-1c').splitlines()
+                if line.strip()]
+        return GenerationProfile.from_dict({
+            'output_ratio': self.profile_vars['output_ratio'].get().strip(),
+            'min_tokens': self.profile_vars['min_tokens'].get().strip(),
+            'max_tokens': self.profile_vars['max_tokens'].get().strip(),
+            'temperature': temperature or None,
+            'stop': stop,
+            'spell_prepass': self.spell_prepass_var.get()
+        })
+        
     def new_prompt(self):
         """Clear the editor for a new prompt"""
         self.name_entry.delete(0, tk.END)
         self.template_text.delete('1.0', tk.END)
         self.prompts_list.selection_clear(0, tk.END)
+        self.show_profile(GenerationProfile())
         
     def save_prompt(self):
         """Save the current prompt"""
@@ -227,12 +261,16 @@ class PromptEditorWindow:
             messagebox.showerror("Error", "Name and template are required")
             return
             
-        if "{text}" not in template:
-            messagebox.showerror("Error", "Template must contain {text} placeholder")
+        try:
+            validate_template(template)
+            profile = self.read_profile()
+        except PromptTemplateError as e:
+            messagebox.showerror("Error", str(e))
             return
             
         # Update data
         self.prompts_data['templates'][name] = template
+        self.prompts_data['profiles'][name] = profile.to_dict()
         
         # Refresh list if it's a new prompt
         if name not in self.prompts_list.get(0, tk.END):
@@ -251,6 +289,7 @@ class PromptEditorWindow:
         name = self.prompts_list.get(selection[0])
         if messagebox.askyesno("Confirm Delete", f"Delete prompt '{name}'?"):
             self.prompts_data['templates'].pop(name, None)
+            self.prompts_data['profiles'].pop(name, None)
             self.prompts_list.delete(selection[0])
             self.new_prompt()
             
@@ -269,20 +308,9 @@ class PromptEditorWindow:
     def apply_changes(self):
         """Apply changes to all modules"""
         try:
-            # Update the global prompt variables
-            llm_prompts.clear()
-            llm_prompts.update(self.prompts_data['templates'])
-            
-            # Save to file
+            # Save to the registry, which notifies all registered callbacks
             self.save_prompts_to_file()
             
-            # Notify all registered callbacks
-            for callback in self.update_callbacks:
-                try:
-                    callback(list(llm_prompts.keys()))
-                except Exception as e:
-                    logger.error(f"Error notifying prompt update: {e}")
-            
             # Reset status
             self.has_unsaved_changes = False
             self.status_label.config(
@@ -300,14 +328,10 @@ class PromptEditorWindow:
     def export_prompts(self):
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'prompts_export_{timestamp}.py'
+            filename = f'prompts_export_{timestamp}.json'
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write("llm_prompts = {\n")
-                for name, template in self.prompts_data['templates'].items():
-                    f.write(f"    \"{name}\": \"\"\"{template}\"\"\",\n")
-                f.write("}\n\n")
-                f.write("# Get options from llm_prompts keys\n")
-                f.write("improvement_options = list(llm_prompts.keys())\n")
+                json.dump({'templates': self.prompts_data['templates'],
+                           'profiles': self.prompts_data['profiles']}, f, ensure_ascii=False, indent=2)
             messagebox.showinfo("Success", f"Prompts exported to {filename}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export: {e}")
@@ -316,25 +340,31 @@ class PromptEditorWindow:
         try:
             filename = filedialog.askopenfilename(
                 title="Import Prompts",
-                filetypes=[("Python files", "*.py"), ("JSON files", "*.json")]
+                filetypes=[("JSON files", "*.json"), ("Python files", "*.py")]
             )
             if filename:
+                profiles = {}
                 if filename.endswith('.json'):
-                    with open(filename) as f:
+                    with open(filename, encoding='utf-8') as f:
                         data = json.load(f)
-                        self.prompts_data = {'templates': data['templates']}
-                else:  # Python file
-                    namespace = {}
-                    with open(filename) as f:
-                        exec(f.read(), namespace)
-                    self.prompts_data = {'templates': namespace.get('llm_prompts', {})}
+                    templates = data.get('templates', {})
+                    profiles = data.get('profiles', {})
+                else:  # Legacy Python export, parsed rather than executed
+                    templates = load_legacy_prompts(filename)
                 
-                if self.prompts_data['templates']:
-                    self.refresh_list()
-                    self.notify_prompt_updates()
-                    messagebox.showinfo("Success", "Prompts imported successfully")
-                else:
+                if not templates:
                     raise ValueError("Invalid prompts file format")
+                
+                prompts_data = {
+                    'templates': dict(templates),
+                    'profiles': {name: profiles.get(name) or default_profile(name).to_dict()
+                                 for name in templates}
+                }
+                # Only replace the working copy once the registry has accepted the import
+                self.save_prompts_to_file(prompts_data)
+                self.prompts_data = prompts_data
+                self.refresh_list()
+                messagebox.showinfo("Success", "Prompts imported successfully")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to import: {e}")
             
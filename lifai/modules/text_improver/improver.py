@@ -2,16 +2,27 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit,
                             QPushButton, QComboBox, QLabel, QFrame, QToolBar,
-                            QProgressBar)
+                            QProgressBar, QCheckBox)
 from PyQt6.QtGui import QTextCharFormat, QFont, QColor, QTextCursor
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, pyqtSignal
 from typing import Dict
+import threading
 from lifai.utils.ollama_client import OllamaClient
-from lifai.config.prompts import improvement_options, llm_prompts
+from lifai.config.prompts import prompt_registry
 from lifai.utils.logger_utils import get_module_logger
+from lifai.utils.text_segments import SegmentedRewriter, word_diff
+from lifai.utils.prompt_eval_stats import prompt_eval_stats
+from lifai.modules.text_improver.output_renderer import StreamingMarkdownRenderer
 
 logger = get_module_logger(__name__)
 
+class GenerationSignals(QObject):
+    """Carries streamed output from the worker thread to the GUI thread"""
+    token = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(str, str)
+    failed = pyqtSignal(str)
+
 class TextImproverWindow(QWidget):
     def __init__(self, settings: Dict, ollama_client: OllamaClient):
         super().__init__()
@@ -19,6 +30,16 @@ class TextImproverWindow(QWidget):
         self.settings = settings
         self.ollama_client = ollama_client
         self.selected_improvement = None
+        self.rewriter = SegmentedRewriter(ollama_client)
+        self.last_input = None
+        self.last_output = None
+        self.streamed = False
+        self.worker_thread = None
+        self.signals = GenerationSignals()
+        self.signals.token.connect(self.on_token)
+        self.signals.progress.connect(self.on_segment_progress)
+        self.signals.finished.connect(self.on_generation_finished)
+        self.signals.failed.connect(self.on_generation_failed)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowType.WindowCloseButtonHint)
         self.setup_ui()
         self.hide()  # Start hidden
@@ -68,6 +89,7 @@ class TextImproverWindow(QWidget):
         self.setup_editor(self.output_text)
         self.output_text.setReadOnly(True)
         output_layout.addWidget(self.output_text)
+        self.renderer = StreamingMarkdownRenderer(self.output_text)
         
         editor_layout.addWidget(output_frame)
         
@@ -77,9 +99,20 @@ class TextImproverWindow(QWidget):
         # Improvement selection
         controls_layout.addWidget(QLabel("Select Prompts:"))
         self.improvement_dropdown = QComboBox()
-        self.improvement_dropdown.addItems(improvement_options)
+        self.improvement_dropdown.addItems(prompt_registry.names())
         controls_layout.addWidget(self.improvement_dropdown)
         
+        # Segment mode sends only paragraphs/sentences that haven't been processed yet
+        self.segment_checkbox = QCheckBox("Segment mode")
+        self.segment_checkbox.setToolTip("Process long text paragraph by paragraph, "
+                                         "reusing results for unchanged segments")
+        controls_layout.addWidget(self.segment_checkbox)
+        
+        # Word-level diff view of the output
+        self.diff_checkbox = QCheckBox("Show changes")
+        self.diff_checkbox.toggled.connect(self.render_output)
+        controls_layout.addWidget(self.diff_checkbox)
+        
         # Process button
         self.enhance_button = QPushButton("Process")
         self.enhance_button.clicked.connect(self.process_text)
@@ -154,47 +187,125 @@ class TextImproverWindow(QWidget):
         self.input_text.setAlignment(alignment)
 
     def process_text(self):
-        """Process the text while preserving formatting"""
+        """Start processing the text in a worker thread, streaming the output"""
         text = self.input_text.toPlainText().strip()
         if not text:
             return
+        if self.worker_thread and self.worker_thread.is_alive():
+            return
+
+        improvement = self.improvement_dropdown.currentText()
+        template = prompt_registry.get(improvement)
+        model = self.settings['model'].get()
+        segmented = template is not None and self.segment_checkbox.isChecked()
 
         self.status_label.setText("Processing...")
         self.enhance_button.setEnabled(False)
-        self.progress_bar.setValue(0)
-        self.repaint()
+        self.progress_bar.setValue(20)
+        self.last_input = text
+        self.last_output = None
+        self.renderer.clear()
+        self.streamed = False
+
+        self.worker_thread = threading.Thread(
+            target=self.run_generation,
+            args=(template, text, model, segmented),
+            daemon=True
+        )
+        self.worker_thread.start()
 
+    def run_generation(self, template, text: str, model: str, segmented: bool):
+        """Worker thread: generate and report back through Qt signals"""
         try:
-            # Simulate progress (since we can't get real-time progress from ollama)
-            self.progress_bar.setValue(20)
-            
-            improvement = self.improvement_dropdown.currentText()
-            prompt = llm_prompts.get(improvement, "Please improve this text:")
-            prompt = prompt.format(text=text)
-            
-            self.progress_bar.setValue(40)
-            
-            improved_text = self.ollama_client.generate_response(
-                prompt=prompt,
-                model=self.settings['model'].get()
-            )
-            
-            self.progress_bar.setValue(80)
-            
-            if improved_text:
-                # Preserve formatting by copying HTML format
-                self.output_text.setHtml(improved_text)
-                self.status_label.setText("Text processed successfully!")
-                self.progress_bar.setValue(100)
+            if segmented:
+                improved_text = self.rewriter.rewrite(
+                    template=template,
+                    text=text,
+                    model=model,
+                    on_progress=self.signals.progress.emit
+                )
+                stats = self.rewriter.last_stats
+                self.signals.finished.emit(
+                    improved_text, f" ({stats['sent']} of {stats['segments']} segments sent)"
+                )
+                return
+
+            if template:
+                system, prompt = template.split(text)
+                options = template.options(text, model)
             else:
-                self.show_error("Failed to generate improved text")
-                self.progress_bar.setValue(0)
+                system, prompt = None, f"Please improve this text:\n\n{text}"
+                options = None
+
+            parts = []
+            final = {}
+            for chunk in self.ollama_client.generate_stream(prompt, model, system=system, options=options,
+                                                            template_name=template.name if template else None):
+                token = chunk.get('response', '')
+                if token:
+                    parts.append(token)
+                    self.signals.token.emit(token)
+                if chunk.get('done'):
+                    final = chunk
+            if template and final:
+                prompt_eval_stats.record(template.name, len(system) + len(prompt), final)
+            self.signals.finished.emit(''.join(parts).strip() if final else '', "")
         except Exception as e:
             logger.error(f"Error processing text: {e}")
-            self.show_error(f"An error occurred: {e}")
+            self.signals.failed.emit(f"An error occurred: {e}")
+
+    def on_token(self, token: str):
+        if not self.streamed:
+            self.streamed = True
+            self.progress_bar.setValue(40)
+        self.renderer.append(token)
+
+    def on_segment_progress(self, done: int, total: int):
+        """Update progress while segments complete"""
+        self.progress_bar.setValue(40 + int(50 * done / max(1, total)))
+
+    def on_generation_finished(self, improved_text: str, detail: str):
+        self.enhance_button.setEnabled(True)
+        if improved_text:
+            self.last_output = improved_text
+            self.renderer.finish()
+            # Segmented output arrives in one piece; the diff view needs the full text
+            if self.diff_checkbox.isChecked() or not self.streamed:
+                self.render_output()
+            self.status_label.setText(f"Text processed successfully!{detail}")
+            self.progress_bar.setValue(100)
+        else:
+            self.renderer.finish()
+            self.status_label.setText("")
+            self.show_error("Failed to generate improved text")
             self.progress_bar.setValue(0)
-        finally:
-            self.enhance_button.setEnabled(True)
+
+    def on_generation_failed(self, message: str):
+        self.enhance_button.setEnabled(True)
+        self.renderer.finish()
+        self.status_label.setText("")
+        self.show_error(message)
+        self.progress_bar.setValue(0)
+
+    def render_output(self):
+        """Show the last output, either as formatted text or as a word-level diff against the input"""
+        if self.last_output is None:
+            return
+        if not self.diff_checkbox.isChecked():
+            self.renderer.render_text(self.last_output)
+            return
+        
+        self.output_text.clear()
+        cursor = QTextCursor(self.output_text.document())
+        for op, chunk in word_diff(self.last_input, self.last_output):
+            char_format = QTextCharFormat()
+            if op == 'delete':
+                char_format.setForeground(QColor('#C62828'))
+                char_format.setFontStrikeOut(True)
+            elif op == 'insert':
+                char_format.setForeground(QColor('#2E7D32'))
+                char_format.setBackground(QColor('#E8F5E9'))
+            cursor.insertText(chunk, char_format)
 
     def show_error(self, message: str):
         """Show error message"""
@@ -0,0 +1,196 @@
+import re
+from PyQt6.QtWidgets import QTextEdit
+from PyQt6.QtGui import QTextCursor, QTextCharFormat, QTextBlockFormat, QFont, QColor
+from PyQt6.QtCore import QObject, QTimer
+
+# Inline markdown: **bold**, __bold__, *italic*, _italic_, `code`
+INLINE_PATTERN = re.compile(r'(\*\*[^*\n]+\*\*|__[^_\n]+__|`[^`\n]+`|\*[^*\s][^*\n]*\*|\b_[^_\n]+_\b)')
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*)$')
+BULLET_PATTERN = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+NUMBERED_PATTERN = re.compile(r'^(\s*)(\d+[.)])\s+(.*)$')
+QUOTE_PATTERN = re.compile(r'^>\s?(.*)$')
+
+class StreamingMarkdownRenderer(QObject):
+    """Appends streamed text to a QTextEdit, formatting markdown one completed line at a time"""
+
+    def __init__(self, editor: QTextEdit, fps: int = 60):
+        super().__init__(editor)
+        self.editor = editor
+        self.document = editor.document()
+        self.base_font = editor.font()
+        self.pending = ''
+        self.tail = ''
+        self.tail_pos = None
+        self.tail_was_first = False
+        self.in_code_block = False
+        self.first_block = True
+        self.follow = True
+
+        # Repaints are throttled to the display rate
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(1, 1000 // fps))
+        self.timer.timeout.connect(self.flush)
+
+    def clear(self):
+        self.timer.stop()
+        self.editor.clear()
+        self.pending = ''
+        self.tail = ''
+        self.tail_pos = None
+        self.in_code_block = False
+        self.first_block = True
+
+    def append(self, text: str):
+        """Queue streamed text; it is rendered on the next timer tick"""
+        self.pending += text
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def finish(self):
+        """Render everything that is left, including an unterminated last line"""
+        self.timer.stop()
+        self.flush()
+        if self.tail:
+            self.begin_update()
+            self.remove_tail()
+            self.render_line(self.tail)
+            self.tail = ''
+            self.end_update()
+
+    def render_text(self, text: str):
+        """Render a complete text in one pass"""
+        self.clear()
+        self.pending = text
+        self.finish()
+
+    def flush(self):
+        """Render the lines completed since the last tick"""
+        if not self.pending:
+            self.timer.stop()
+            return
+        self.begin_update()
+        self.remove_tail()
+        lines = (self.tail + self.pending).split('\n')
+        self.pending = ''
+        self.tail = lines.pop()
+        for line in lines:
+            self.render_line(line)
+        self.show_tail()
+        self.end_update()
+
+    def show_tail(self):
+        """Show the unfinished last line as raw text until its newline arrives"""
+        if not self.tail:
+            return
+        cursor = self.end_cursor()
+        self.tail_pos = cursor.position()
+        self.tail_was_first = self.first_block
+        if self.first_block:
+            self.first_block = False
+        else:
+            cursor.insertBlock(QTextBlockFormat(), self.plain_format())
+        cursor.insertText(self.tail, self.plain_format())
+
+    def remove_tail(self):
+        if self.tail_pos is None:
+            return
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(self.tail_pos)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self.first_block = self.tail_was_first
+        self.tail_pos = None
+
+    def begin_update(self):
+        scrollbar = self.editor.verticalScrollBar()
+        self.follow = scrollbar.value() >= scrollbar.maximum() - 4
+        self.editor.setUpdatesEnabled(False)
+
+    def end_update(self):
+        self.editor.setUpdatesEnabled(True)
+        if self.follow:
+            scrollbar = self.editor.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
+
+    def end_cursor(self) -> QTextCursor:
+        cursor = QTextCursor(self.document)
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        return cursor
+
+    def plain_format(self) -> QTextCharFormat:
+        char_format = QTextCharFormat()
+        char_format.setFont(self.base_font)
+        return char_format
+
+    def code_format(self) -> QTextCharFormat:
+        char_format = QTextCharFormat()
+        char_format.setFontFamilies(['Consolas', 'Courier New', 'monospace'])
+        char_format.setBackground(QColor('#F5F5F5'))
+        return char_format
+
+    def new_block(self, block_format: QTextBlockFormat = None) -> QTextCursor:
+        cursor = self.end_cursor()
+        block_format = block_format or QTextBlockFormat()
+        if self.first_block:
+            cursor.setBlockFormat(block_format)
+            self.first_block = False
+        else:
+            cursor.insertBlock(block_format, self.plain_format())
+        return cursor
+
+    def render_line(self, line: str):
+        """Render one completed line as a formatted block"""
+        if line.strip().startswith('```'):
+            self.in_code_block = not self.in_code_block
+            return
+        if self.in_code_block:
+            self.new_block().insertText(line, self.code_format())
+            return
+
+        block_format = QTextBlockFormat()
+        prefix = ''
+        base = self.plain_format()
+
+        heading = HEADING_PATTERN.match(line)
+        bullet = BULLET_PATTERN.match(line)
+        numbered = NUMBERED_PATTERN.match(line)
+        quote = QUOTE_PATTERN.match(line)
+        if heading:
+            level = len(heading.group(1))
+            base.setFontWeight(QFont.Weight.Bold)
+            base.setFontPointSize(self.base_font.pointSizeF() + max(0, 6 - level) * 1.5)
+            line = heading.group(2)
+        elif bullet:
+            block_format.setIndent(1 + len(bullet.group(1)) // 2)
+            prefix = '• '
+            line = bullet.group(2)
+        elif numbered:
+            block_format.setIndent(1 + len(numbered.group(1)) // 2)
+            prefix = numbered.group(2) + ' '
+            line = numbered.group(3)
+        elif quote:
+            block_format.setIndent(1)
+            base.setForeground(QColor('#616161'))
+            base.setFontItalic(True)
+            line = quote.group(1)
+
+        cursor = self.new_block(block_format)
+        if prefix:
+            cursor.insertText(prefix, base)
+        self.insert_inline(cursor, line, base)
+
+    def insert_inline(self, cursor: QTextCursor, line: str, base: QTextCharFormat):
+        for part in INLINE_PATTERN.split(line):
+            if not part:
+                continue
+            char_format = QTextCharFormat(base)
+            if (part.startswith('**') and part.endswith('**')) or (part.startswith('__') and part.endswith('__')):
+                char_format.setFontWeight(QFont.Weight.Bold)
+                part = part[2:-2]
+            elif part.startswith('`') and part.endswith('`') and len(part) > 1:
+                char_format = self.code_format()
+                part = part[1:-1]
+            elif len(part) > 1 and part[0] == part[-1] and part[0] in '*_':
+                char_format.setFontItalic(True)
+                part = part[1:-1]
+            cursor.insertText(part, char_format)
@@ -0,0 +1,137 @@
+"""Benchmark AsyncOllamaClient against a local stub of Ollama's streaming API
+
+    python -m lifai.utils.async_ollama_bench --streams 500 --chunks 50 --delay 0.02
+
+The stub runs on its own thread; every client stream runs on the main thread's event loop.
+"""
+import json
+import time
+import asyncio
+import argparse
+import threading
+from typing import Dict
+from lifai.utils.async_ollama_client import AsyncOllamaClient
+
+class StubOllamaServer:
+    """Minimal HTTP/1.1 server that answers /api/generate, streaming chunked NDJSON unless stream is false"""
+
+    def __init__(self, chunks: int = 50, delay: float = 0.02, host: str = '127.0.0.1'):
+        self.chunks = chunks
+        self.delay = delay
+        self.host = host
+        self.port = None
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='stub-ollama', daemon=True)
+
+    def start(self) -> str:
+        self.thread.start()
+        self.ready.wait()
+        return f"http://{self.host}:{self.port}"
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle, self.host, 0, backlog=4096))
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                payload = json.loads(body or b'{}')
+                if payload.get('stream') is False:
+                    await asyncio.sleep(self.delay * self.chunks)
+                    data = json.dumps({'model': payload.get('model'), 'response': 'tok ' * self.chunks,
+                                       'done': True, 'prompt_eval_count': 10,
+                                       'eval_count': self.chunks}).encode()
+                    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                                 + f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                    await writer.drain()
+                    continue
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n'
+                             b'Transfer-Encoding: chunked\r\n\r\n')
+                for i in range(self.chunks):
+                    await asyncio.sleep(self.delay)
+                    done = i == self.chunks - 1
+                    chunk = {'model': payload.get('model'), 'response': 'tok ', 'done': done}
+                    if done:
+                        chunk.update(prompt_eval_count=10, eval_count=self.chunks)
+                    data = json.dumps(chunk).encode() + b'\n'
+                    writer.write(f"{len(data):x}\r\n".encode() + data + b'\r\n')
+                    await writer.drain()
+                writer.write(b'0\r\n\r\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def run_benchmark(base_url: str, streams: int) -> Dict:
+    first_token = []
+    chunk_count = 0
+
+    async with AsyncOllamaClient(base_url, max_connections=streams) as client:
+        async def one_stream():
+            nonlocal chunk_count
+            started = time.perf_counter()
+            first = None
+            async for chunk in client.generate_stream("benchmark", "stub"):
+                if first is None:
+                    first = time.perf_counter() - started
+                chunk_count += 1
+            first_token.append(first or 0.0)
+
+        threads_before = threading.active_count()
+        started = time.perf_counter()
+        await asyncio.gather(*(one_stream() for _ in range(streams)))
+        elapsed = time.perf_counter() - started
+
+    first_token.sort()
+    return {
+        'streams': streams,
+        'chunks': chunk_count,
+        'seconds': elapsed,
+        'chunks_per_second': chunk_count / elapsed,
+        'p50_first_chunk_ms': first_token[len(first_token) // 2] * 1000,
+        'p95_first_chunk_ms': first_token[int(len(first_token) * 0.95)] * 1000,
+        'client_threads': threading.active_count() - threads_before + 1
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=500)
+    parser.add_argument('--chunks', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.02, help="Seconds between stub chunks")
+    args = parser.parse_args()
+
+    server = StubOllamaServer(chunks=args.chunks, delay=args.delay)
+    base_url = server.start()
+    try:
+        result = asyncio.run(run_benchmark(base_url, args.streams))
+    finally:
+        server.stop()
+
+    ideal = args.chunks * args.delay
+    print(f"{result['streams']} concurrent streams, {result['chunks']} chunks in {result['seconds']:.2f}s "
+          f"(one stream alone takes ~{ideal:.2f}s)")
+    print(f"{result['chunks_per_second']:.0f} chunks/s, first chunk p50 {result['p50_first_chunk_ms']:.0f} ms, "
+          f"p95 {result['p95_first_chunk_ms']:.0f} ms, client threads: {result['client_threads']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+import json
+import copy
+import queue
+import asyncio
+import threading
+import time
+from typing import Optional, List, Dict, AsyncIterator, Iterator
+import httpx
+from lifai.utils.logger_utils import get_module_logger, new_request_id
+from lifai.utils.prompt_eval_stats import prompt_eval_stats
+from lifai.utils.request_scheduler import RequestScheduler, INTERACTIVE
+from lifai.utils.single_flight import SingleFlight, flight_key
+from lifai.utils.hedging import HedgePolicy, HedgeStats, hedged_stream
+from lifai.utils.text_segments import SegmentCache
+
+logger = get_module_logger(__name__)
+
+class AsyncOllamaClient:
+    """Asyncio counterpart of OllamaClient; all requests share one pooled HTTP client"""
+
+    def __init__(self, base_url: str = "http://localhost:11434", max_connections: int = 100,
+                 timeout: Optional[float] = None):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+        logger.info(f"Initializing AsyncOllamaClient with base URL: {base_url}")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool is bound to the loop that first uses it
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> 'AsyncOllamaClient':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def fetch_models(self) -> List[str]:
+        try:
+            logger.debug("Fetching available models from Ollama")
+            response = await self.client.get("/api/tags")
+            if response.status_code == 200:
+                models = [model['name'] for model in response.json()['models']]
+                logger.info(f"Successfully fetched {len(models)} models")
+                return models
+            logger.error(f"Failed to fetch models. Status code: {response.status_code}")
+            return []
+        except Exception as e:
+            logger.error(f"Error fetching models: {str(e)}")
+            return []
+
+    async def _post(self, path: str, payload: Dict, timeout: Optional[float]) -> Optional[Dict]:
+        kwargs = {'timeout': timeout} if timeout is not None else {}
+        response = await self.client.post(path, json=payload, **kwargs)
+        if response.status_code == 200:
+            return response.json()
+        logger.error(f"Request to {path} failed. Status code: {response.status_code}")
+        return None
+
+    async def _stream(self, path: str, payload: Dict, timeout: Optional[float]) -> AsyncIterator[Dict]:
+        kwargs = {'timeout': timeout} if timeout is not None else {}
+        async with self.client.stream("POST", path, json=payload, **kwargs) as response:
+            if response.status_code != 200:
+                logger.error(f"Stream from {path} failed. Status code: {response.status_code}")
+                return
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                yield chunk
+                if chunk.get('done'):
+                    return
+
+    @staticmethod
+    def request_fields(request_id: str, model: str, template_name: Optional[str], started_at: float,
+                       payload: Optional[Dict] = None) -> Dict:
+        """Per-request fields attached to log records, matching OllamaClient.request_fields"""
+        fields = {
+            'request_id': request_id,
+            'model': model,
+            'template': template_name,
+            'latency_ms': round((time.time() - started_at) * 1000, 1)
+        }
+        if payload:
+            fields['prompt_tokens'] = payload.get('prompt_eval_count')
+            fields['eval_tokens'] = payload.get('eval_count')
+            fields['load_ms'] = round(payload.get('load_duration', 0) / 1e6, 1)
+        return fields
+
+    async def generate(self, prompt: str, model: str, timeout: Optional[float] = None,
+                       system: Optional[str] = None, options: Optional[Dict] = None,
+                       template_name: Optional[str] = None) -> Optional[Dict]:
+        """Generate a response and return the full Ollama payload"""
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if system:
+            payload["system"] = system
+        if options:
+            payload["options"] = options
+        request_id = new_request_id()
+        started_at = time.time()
+        try:
+            logger.debug(f"Generating response using model: {model}")
+            response_json = await self._post("/api/generate", payload, timeout)
+            if response_json is not None:
+                fields = self.request_fields(request_id, model, template_name, started_at, response_json)
+                logger.info(f"Generated response with {model} in {fields['latency_ms']:.0f} ms", extra=fields)
+            return response_json
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}",
+                         extra=self.request_fields(request_id, model, template_name, started_at))
+            return None
+
+    async def generate_stream(self, prompt: str, model: str, system: Optional[str] = None,
+                              timeout: Optional[float] = None,
+                              options: Optional[Dict] = None,
+                              template_name: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Stream response chunks; closing the iterator closes the connection, which stops generation"""
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        if system:
+            payload["system"] = system
+        if options:
+            payload["options"] = options
+        request_id = new_request_id()
+        started_at = time.time()
+        try:
+            async for chunk in self._stream("/api/generate", payload, timeout):
+                if chunk.get('done'):
+                    fields = self.request_fields(request_id, model, template_name, started_at, chunk)
+                    logger.info(f"Streamed response with {model} in {fields['latency_ms']:.0f} ms", extra=fields)
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}",
+                         extra=self.request_fields(request_id, model, template_name, started_at))
+
+    async def generate_response(self, prompt: str, model: str) -> Optional[str]:
+        response_json = await self.generate(prompt=prompt, model=model)
+        if response_json is None:
+            return None
+        return response_json.get('response', '').strip()
+
+    async def generate_template(self, template, text: str, model: str,
+                                timeout: Optional[float] = None) -> Optional[str]:
+        """Generate from a prompt template, sending its fixed instructions as the system prompt"""
+        system, prompt = template.split(text)
+        response_json = await self.generate(prompt=prompt, model=model, timeout=timeout, system=system,
+                                            options=template.options(text, model), template_name=template.name)
+        if response_json is None:
+            return None
+        prompt_eval_stats.record(template.name, len(system) + len(prompt), response_json)
+        return response_json.get('response', '').strip()
+
+    async def chat(self, messages: List[Dict], model: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Send a chat conversation and return the full Ollama payload"""
+        try:
+            return await self._post("/api/chat", {"model": model, "messages": messages, "stream": False},
+                                    timeout)
+        except Exception as e:
+            logger.error(f"Error in chat request: {str(e)}")
+            return None
+
+    async def chat_stream(self, messages: List[Dict], model: str,
+                          timeout: Optional[float] = None) -> AsyncIterator[Dict]:
+        try:
+            async for chunk in self._stream("/api/chat", {"model": model, "messages": messages, "stream": True},
+                                            timeout):
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error streaming chat: {str(e)}")
+
+    async def embed(self, texts: List[str], model: str,
+                    timeout: Optional[float] = None) -> Optional[List[List[float]]]:
+        """Embed a batch of texts, returning one vector per text"""
+        try:
+            response_json = await self._post("/api/embed", {"model": model, "input": texts}, timeout)
+            return response_json.get('embeddings', []) if response_json is not None else None
+        except Exception as e:
+            logger.error(f"Error embedding texts: {str(e)}")
+            return None
+
+class SyncOllamaClient:
+    """Blocking facade over AsyncOllamaClient with the same interface as OllamaClient
+
+    All requests run on one background event loop, so GUI threads can call it
+    exactly like OllamaClient while in-flight requests don't each hold a thread.
+    Scheduling, coalescing, deadlines and the shared response cache work as in
+    OllamaClient. Hedging does not: for_module accepts hedge=True but its requests
+    are never hedged, and hedge_stats stays empty.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:11434", max_connections: int = 100,
+                 scheduler: Optional[RequestScheduler] = None):
+        self.base_url = base_url
+        self.async_client = AsyncOllamaClient(base_url, max_connections=max_connections)
+        self.scheduler = scheduler or RequestScheduler()
+        self.response_cache = SegmentCache()
+        self.single_flight = SingleFlight()
+        self.hedge_policy = HedgePolicy()
+        self.hedge_stats = HedgeStats()
+        self.hedging = False
+        self.priority = INTERACTIVE
+        self.module = 'default'
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='ollama-async', daemon=True)
+        self.thread.start()
+
+    def for_module(self, module: str, priority: int, hedge: bool = False) -> 'SyncOllamaClient':
+        """A view of this client whose requests are scheduled with the given priority class
+
+        hedge is accepted for compatibility with OllamaClient and has no effect.
+        """
+        view = copy.copy(self)
+        view.module = module
+        view.priority = priority
+        view.hedging = hedge
+        return view
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        self._run(self.async_client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def fetch_models(self) -> List[str]:
+        return self._run(self.async_client.fetch_models())
+
+    def generate(self, prompt: str, model: str, timeout: Optional[float] = None,
+                 system: Optional[str] = None, options: Optional[Dict] = None,
+                 template_name: Optional[str] = None, deadline: Optional[float] = None) -> Optional[Dict]:
+        """Generate a response and return the full Ollama payload
+
+        A call identical to one already in flight at the same priority waits for that one
+        (for at most its own timeout) instead of sending its own.
+        deadline is how many seconds to wait for the first token before giving up.
+        """
+        if deadline is not None:
+            # The deadline is on the first token, so the request is streamed and reassembled
+            parts = []
+            for chunk in self.generate_stream(prompt, model, system=system, timeout=timeout, options=options,
+                                              template_name=template_name, deadline=deadline):
+                parts.append(chunk.get('response', ''))
+                if chunk.get('done'):
+                    return dict(chunk, response=''.join(parts))
+            return None
+        key = flight_key('generate', self.base_url, self.priority, model, system, prompt, options)
+        return self.single_flight.do(
+            key, lambda: self._generate(prompt, model, timeout, system, options, template_name), timeout)
+
+    def _generate(self, prompt: str, model: str, timeout: Optional[float], system: Optional[str],
+                  options: Optional[Dict], template_name: Optional[str]) -> Optional[Dict]:
+        with self.scheduler.slot(self.priority, self.module, model) as ticket:
+            ticket.result = self._run(self.async_client.generate(prompt, model, timeout=timeout, system=system,
+                                                                 options=options, template_name=template_name))
+            return ticket.result
+
+    def generate_stream(self, prompt: str, model: str, system: Optional[str] = None,
+                        timeout: Optional[float] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        options: Optional[Dict] = None,
+                        template_name: Optional[str] = None,
+                        deadline: Optional[float] = None) -> Iterator[Dict]:
+        """Stream response chunks; setting cancel_event closes the connection, which stops generation
+
+        A stream identical to one already in flight at the same priority receives that one's
+        chunks from the start.
+        If no chunk arrives within deadline seconds the stream ends empty.
+        """
+        def shared(cancel):
+            key = flight_key('stream', self.base_url, self.priority, model, system, prompt, options)
+            return self.single_flight.stream(
+                key, lambda shared_cancel: self._generate_stream(prompt, model, system, timeout, shared_cancel,
+                                                                 options, template_name),
+                cancel)
+
+        if deadline is None:
+            yield from shared(cancel_event)
+        else:
+            yield from hedged_stream(shared, None, self.hedge_policy.delay, deadline, cancel_event)
+
+    def _generate_stream(self, prompt: str, model: str, system: Optional[str], timeout: Optional[float],
+                         cancel_event: Optional[threading.Event], options: Optional[Dict],
+                         template_name: Optional[str]) -> Iterator[Dict]:
+        with self.scheduler.slot(self.priority, self.module, model) as ticket:
+            for chunk in self._iterate(self.async_client.generate_stream(prompt, model, system=system,
+                                                                         timeout=timeout, options=options,
+                                                                         template_name=template_name),
+                                       cancel_event):
+                if chunk.get('done'):
+                    ticket.result = chunk
+                yield chunk
+
+    def generate_response(self, prompt: str, model: str, deadline: Optional[float] = None) -> Optional[str]:
+        response_json = self.generate(prompt=prompt, model=model, deadline=deadline)
+        if response_json is None:
+            return None
+        return response_json.get('response', '').strip()
+
+    def generate_template(self, template, text: str, model: str,
+                          timeout: Optional[float] = None, deadline: Optional[float] = None,
+                          reference: Optional[str] = None) -> Optional[str]:
+        """Generate from a prompt template, sending its fixed instructions as the system prompt
+
+        reference, if given, is appended to the prompt after the text, leaving the
+        system prefix unchanged.
+        """
+        system, prompt = template.split(text)
+        extra = f"\n\n{reference}" if reference else ''
+        prompt += extra
+        response_json = self.generate(prompt=prompt, model=model, timeout=timeout, system=system,
+                                      options=template.options(text, model, extra),
+                                      template_name=template.name, deadline=deadline)
+        if response_json is None:
+            return None
+        prompt_eval_stats.record(template.name, len(system) + len(prompt), response_json)
+        return response_json.get('response', '').strip()
+
+    def chat(self, messages: List[Dict], model: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        with self.scheduler.slot(self.priority, self.module, model) as ticket:
+            ticket.result = self._run(self.async_client.chat(messages, model, timeout=timeout))
+            return ticket.result
+
+    def embed(self, texts: List[str], model: str,
+              timeout: Optional[float] = None) -> Optional[List[List[float]]]:
+        with self.scheduler.slot(self.priority, self.module, model):
+            return self._run(self.async_client.embed(texts, model, timeout=timeout))
+
+    def _iterate(self, stream: AsyncIterator[Dict],
+                 cancel_event: Optional[threading.Event]) -> Iterator[Dict]:
+        """Pump an async stream on the loop thread and hand its chunks to the calling thread"""
+        chunks = queue.Queue()
+        finished = object()
+
+        async def pump():
+            try:
+                async for chunk in stream:
+                    chunks.put(chunk)
+            finally:
+                chunks.put(finished)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                try:
+                    chunk = chunks.get(timeout=0.1)
+                except queue.Empty:
+                    chunk = None
+                if cancel_event is not None and cancel_event.is_set():
+                    logger.debug("Stream cancelled")
+                    return
+                if chunk is finished:
+                    return
+                if chunk is not None:
+                    yield chunk
+        finally:
+            # Cancelling the pump closes the response and with it the connection
+            future.cancel()
@@ -3,6 +3,11 @@ import keyboard
 import time
 from lifai.utils.logger_utils import get_module_logger
 
+try:
+    import win32gui
+except ImportError:  # Only available on Windows
+    win32gui = None
+
 logger = get_module_logger(__name__)
 
 class ClipboardManager:
@@ -32,6 +37,18 @@ class ClipboardManager:
             logger.error(f"Error getting selected text: {e}")
             return ""
 
+    def peek_selected_text(self) -> str:
+        """Get the selected text and put the previous clipboard content back"""
+        try:
+            previous = pyperclip.paste()
+            selected_text = self.get_selected_text()
+            if selected_text:
+                pyperclip.copy(previous)
+            return selected_text
+        except Exception as e:
+            logger.error(f"Error peeking selected text: {e}")
+            return ""
+
     def replace_selected_text(self, new_text: str):
         """Replace the currently selected text with new text."""
         try:
@@ -44,4 +61,24 @@ class ClipboardManager:
             
             logger.debug("Successfully replaced selected text")
         except Exception as e:
-            logger.error(f"Error replacing selected text: {e}")
\ No newline at end of file
+            logger.error(f"Error replacing selected text: {e}")
+
+    def remember_focus(self):
+        """Return a handle to the currently focused window, if the platform supports it"""
+        if win32gui is None:
+            return None
+        try:
+            return win32gui.GetForegroundWindow()
+        except Exception as e:
+            logger.debug(f"Could not read foreground window: {e}")
+            return None
+
+    def restore_focus(self, handle):
+        """Give focus back to a window returned by remember_focus"""
+        if win32gui is None or not handle:
+            return
+        try:
+            win32gui.SetForegroundWindow(handle)
+            time.sleep(0.05)
+        except Exception as e:
+            logger.debug(f"Could not restore foreground window: {e}")
@@ -0,0 +1,169 @@
+import time
+import queue
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterator, Optional
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+StreamStart = Callable[[threading.Event], Iterator[Dict]]
+
+class HedgePolicy:
+    """Where and when to send a hedged copy of a slow interactive generation
+
+    A hedge goes to fallback_url (another Ollama backend), to fallback_model
+    (usually a smaller model), or to both. With neither set there is nothing to
+    hedge to and calls behave as before.
+    """
+
+    def __init__(self, delay: float = 2.0, fallback_model: str = '', fallback_url: str = ''):
+        self.delay = delay
+        self.fallback_model = fallback_model
+        self.fallback_url = fallback_url
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.fallback_model or self.fallback_url)
+
+class HedgeStats:
+    """Hedge rate and an estimate of the first-token latency hedging saved
+
+    When the hedge wins, the primary is cancelled before it answers, so its first-token
+    time is estimated from the slow primaries seen earlier (those that answered after
+    the hedge delay). Without such history nothing is counted as saved. A hedge sent
+    because the primary failed is a failover, counted apart from hedges that raced it.
+    """
+
+    def __init__(self, history: int = 50):
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.deadline_misses = 0
+        self.saved_seconds = 0.0
+        self.slow_primaries = {}
+        self.history = history
+        self._lock = threading.Lock()
+
+    def record(self, model: str, winner: Optional[str], hedged: bool, first_chunk: float, delay: float,
+               failover: bool = False):
+        with self._lock:
+            self.calls += 1
+            if failover:
+                self.failovers += 1
+            else:
+                self.hedged += hedged
+            if winner is None:
+                self.deadline_misses += 1
+                return
+            slow = self.slow_primaries.setdefault(model, deque(maxlen=self.history))
+            if winner == 'primary':
+                if first_chunk > delay:
+                    slow.append(first_chunk)
+                return
+            if failover:
+                return
+            self.hedge_wins += 1
+            if slow:
+                typical = sorted(slow)[len(slow) // 2]
+                self.saved_seconds += max(0.0, typical - first_chunk)
+
+    def summary(self) -> str:
+        with self._lock:
+            rate = self.hedged / self.calls if self.calls else 0.0
+            return (f"Hedged: {self.hedged} of {self.calls} ({rate:.0%}), {self.hedge_wins} won, "
+                    f"~{self.saved_seconds:.1f}s saved, {self.failovers} failovers, "
+                    f"{self.deadline_misses} missed deadline")
+
+def hedged_stream(primary: StreamStart, hedge: Optional[StreamStart], delay: float,
+                  deadline: Optional[float] = None, cancel_event: Optional[threading.Event] = None,
+                  stats: Optional[HedgeStats] = None, model: str = '') -> Iterator[Dict]:
+    """Stream from primary, racing a hedged copy if no chunk has arrived after delay seconds
+
+    Whichever copy produces a chunk first is streamed to the caller and the other is
+    cancelled. If the primary fails before producing anything, the hedge starts at once.
+    If no copy produces a chunk within deadline seconds, both are cancelled and the
+    stream ends empty.
+    """
+    chunks = queue.Queue()
+    cancels = {}
+    running = set()
+
+    def launch(name: str, start: StreamStart):
+        cancel = threading.Event()
+        cancels[name] = cancel
+        running.add(name)
+
+        def pump():
+            try:
+                for chunk in start(cancel):
+                    chunks.put((name, chunk))
+            except Exception as e:
+                logger.error(f"Error in {name} stream: {e}")
+            finally:
+                chunks.put((name, None))
+
+        threading.Thread(target=pump, name=f'hedge-{name}', daemon=True).start()
+
+    started = time.perf_counter()
+    winner = None
+    first = None
+    failover = False
+    launch('primary', primary)
+    try:
+        while winner is None:
+            elapsed = time.perf_counter() - started
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            if deadline is not None and elapsed >= deadline:
+                logger.warning(f"No response within the {deadline:.1f}s deadline, giving up")
+                break
+            if hedge is not None and 'hedge' not in cancels and elapsed >= delay:
+                logger.info(f"No first token after {elapsed:.1f}s, sending a hedged request")
+                launch('hedge', hedge)
+            try:
+                name, chunk = chunks.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if chunk is not None:
+                winner, first = name, chunk
+            else:
+                running.discard(name)
+                if hedge is not None and 'hedge' not in cancels:
+                    logger.info("Primary request failed, sending the hedged request now")
+                    failover = True
+                    launch('hedge', hedge)
+                elif not running:
+                    break
+
+        if stats is not None:
+            stats.record(model, winner, 'hedge' in cancels, time.perf_counter() - started, delay, failover)
+        if winner is None:
+            return
+        for name, cancel in cancels.items():
+            if name != winner:
+                cancel.set()
+        if winner == 'hedge':
+            logger.info(f"Hedged request answered first after {time.perf_counter() - started:.1f}s")
+
+        yield first
+        if first.get('done'):
+            return
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                name, chunk = chunks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if name != winner:
+                continue
+            if chunk is None:
+                return
+            yield chunk
+            if chunk.get('done'):
+                return
+    finally:
+        for cancel in cancels.values():
+            cancel.set()
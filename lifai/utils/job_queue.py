@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional
+from lifai.utils.logger_utils import get_module_logger
+from lifai.utils.request_scheduler import BATCH
+from lifai.utils.single_flight import flight_key
+
+logger = get_module_logger(__name__)
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT UNIQUE NOT NULL,
+    module TEXT NOT NULL,
+    label TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    system TEXT,
+    options TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    delivered INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_attempt_at);
+"""
+
+class JobQueue:
+    """Durable queue of background generations, stored in SQLite so they survive restarts
+
+    Jobs run through the client at batch priority. When a generation fails and
+    fetch_models shows the backend is down, the queue pauses and probes the backend
+    with exponential backoff; once it answers, every waiting job becomes due again.
+    Submitting the same key twice returns the existing job, so callers can resubmit
+    freely. Results stay in the database until delivered to a subscriber of the job's
+    module, including subscribers in a later session.
+    """
+
+    def __init__(self, db_path: str, ollama_client, workers: int = 2, base_backoff: float = 5.0,
+                 max_backoff: float = 300.0, max_attempts: int = 5):
+        self.db_path = db_path
+        self.ollama_client = ollama_client
+        self.workers = workers
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.backend_up = True
+        self.probe_at = 0.0
+        self.probe_failures = 0
+        self.subscribers = {}
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        # Jobs that were running when the last session ended start over
+        self.db.execute("UPDATE jobs SET status = ? WHERE status = ?", (PENDING, RUNNING))
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.work, name=f'job-queue-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Job queue started with {self.counts().get(PENDING, 0)} pending jobs")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+        with self._lock:
+            self.db.close()
+
+    def submit(self, module: str, prompt: str, model: str, system: Optional[str] = None,
+               options: Optional[Dict] = None, label: str = '', key: Optional[str] = None) -> int:
+        """Queue a generation and return its job id; a key already queued returns that job instead
+
+        The default key is the request itself, so a finished, delivered job is not run or
+        delivered again; callers that want every submission answered pass a unique key.
+        """
+        key = key or flight_key('job', module, model, system, prompt, options)
+        now = time.time()
+        with self._lock:
+            row = self.db.execute("SELECT id, status FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                if row['status'] in (FAILED, CANCELLED):
+                    self.db.execute("UPDATE jobs SET status = ?, attempts = 0, next_attempt_at = 0, "
+                                    "error = NULL, updated_at = ? WHERE id = ?", (PENDING, now, row['id']))
+                    self._wake.set()
+                return row['id']
+            cursor = self.db.execute(
+                "INSERT INTO jobs (key, module, label, model, prompt, system, options, status, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, module, label, model, prompt, system, json.dumps(options) if options else None,
+                 PENDING, now, now))
+        self._wake.set()
+        return cursor.lastrowid
+
+    def subscribe(self, module: str, callback: Callable[[Dict], None]):
+        """Call callback(job) on a worker thread when a job of module finishes or fails for good
+
+        Jobs that finished while nobody was subscribed, even in an earlier session,
+        are delivered right away.
+        """
+        with self._lock:
+            self.subscribers.setdefault(module, []).append(callback)
+            rows = self.db.execute("SELECT * FROM jobs WHERE module = ? AND status IN (?, ?) AND delivered = 0 "
+                                   "ORDER BY id", (module, DONE, FAILED)).fetchall()
+        for row in rows:
+            self.deliver(dict(row))
+
+    def deliver(self, job: Dict):
+        """Hand a finished job to its module's subscribers, at most once even across threads"""
+        with self._lock:
+            callbacks = list(self.subscribers.get(job['module'], []))
+            if not callbacks:
+                return
+            claimed = self.db.execute("UPDATE jobs SET delivered = 1 WHERE id = ? AND delivered = 0",
+                                      (job['id'],)).rowcount == 1
+        if not claimed:
+            return
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception as e:
+                logger.error(f"Error delivering job {job['id']}: {e}")
+
+    def backoff(self, attempt: int) -> float:
+        return min(self.max_backoff, self.base_backoff * 2 ** max(0, attempt - 1))
+
+    def claim(self) -> Optional[Dict]:
+        """Mark the next due job running and return it"""
+        now = time.time()
+        with self._lock:
+            row = self.db.execute("SELECT * FROM jobs WHERE status = ? AND next_attempt_at <= ? "
+                                  "ORDER BY id LIMIT 1", (PENDING, now)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                            (RUNNING, now, row['id']))
+            job = dict(row)
+            job['attempts'] += 1
+            return job
+
+    def work(self):
+        while not self._stop.is_set():
+            if not self.backend_up:
+                self.probe()
+                continue
+            job = self.claim()
+            if job is None:
+                self._wake.wait(1.0)
+                self._wake.clear()
+                continue
+            self.run(job)
+
+    def probe(self):
+        """While the backend is down, check it with backoff and release waiting jobs once it answers"""
+        with self._lock:
+            wait = self.probe_at - time.time()
+        if wait > 0:
+            self._stop.wait(min(wait, 1.0))
+            return
+        models = self.ollama_client.fetch_models()
+        with self._lock:
+            if self.backend_up:
+                return
+            if models:
+                self.backend_up = True
+                self.probe_failures = 0
+                self.db.execute("UPDATE jobs SET next_attempt_at = 0 WHERE status = ?", (PENDING,))
+                logger.info("Ollama is back, resuming queued jobs")
+            else:
+                self.probe_failures += 1
+                self.probe_at = time.time() + self.backoff(self.probe_failures)
+
+    def run(self, job: Dict):
+        client = self.ollama_client.for_module(job['module'], BATCH)
+        options = json.loads(job['options']) if job['options'] else None
+        response = client.generate(job['prompt'], job['model'], system=job['system'], options=options)
+        if self._stop.is_set():
+            return  # Still marked running, so the next session picks it up again
+        now = time.time()
+        if response is not None:
+            with self._lock:
+                self.db.execute("UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ? "
+                                "WHERE id = ? AND status = ?",
+                                (DONE, response.get('response', ''), now, job['id'], RUNNING))
+            logger.info(f"Job {job['id']} ({job['label'] or job['module']}) finished")
+            self.deliver(dict(job, status=DONE, result=response.get('response', '')))
+            return
+
+        if not self.ollama_client.fetch_models():
+            # The backend is down: this attempt doesn't count, and every job waits for it
+            with self._lock:
+                self.db.execute("UPDATE jobs SET status = ?, attempts = attempts - 1, error = ?, updated_at = ? "
+                                "WHERE id = ? AND status = ?",
+                                (PENDING, "Ollama unavailable", now, job['id'], RUNNING))
+                if self.backend_up:
+                    self.backend_up = False
+                    self.probe_failures = 1
+                    self.probe_at = now + self.backoff(1)
+                    logger.warning("Ollama is unavailable; queued jobs will resume when it is back")
+            return
+
+        if job['attempts'] >= self.max_attempts:
+            with self._lock:
+                self.db.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ? AND status = ?",
+                                (FAILED, "Generation failed", now, job['id'], RUNNING))
+            logger.error(f"Job {job['id']} failed after {job['attempts']} attempts")
+            self.deliver(dict(job, status=FAILED, error="Generation failed"))
+            return
+        retry_in = self.backoff(job['attempts'])
+        with self._lock:
+            self.db.execute("UPDATE jobs SET status = ?, error = ?, next_attempt_at = ?, updated_at = ? "
+                            "WHERE id = ? AND status = ?",
+                            (PENDING, "Generation failed", now + retry_in, now, job['id'], RUNNING))
+        logger.warning(f"Job {job['id']} failed, retrying in {retry_in:.0f}s")
+
+    def retry(self, job_id: int):
+        with self._lock:
+            self.db.execute("UPDATE jobs SET status = ?, attempts = 0, next_attempt_at = 0, delivered = 0, "
+                            "updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                            (PENDING, time.time(), job_id, FAILED, CANCELLED))
+        self._wake.set()
+
+    def cancel(self, job_id: int):
+        with self._lock:
+            self.db.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                            (CANCELLED, time.time(), job_id, PENDING))
+
+    def clear_finished(self):
+        with self._lock:
+            self.db.execute("DELETE FROM jobs WHERE status IN (?, ?) OR (status = ? AND delivered = 1)",
+                            (CANCELLED, FAILED, DONE))
+
+    def jobs(self, limit: int = 200) -> List[Dict]:
+        with self._lock:
+            rows = self.db.execute("SELECT id, module, label, model, status, attempts, next_attempt_at, "
+                                   "created_at, updated_at, error FROM jobs ORDER BY id DESC LIMIT ?",
+                                   (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def summary(self) -> str:
+        counts = self.counts()
+        text = (f"Jobs: {counts.get(PENDING, 0)} pending · {counts.get(RUNNING, 0)} running · "
+                f"{counts.get(FAILED, 0)} failed")
+        if not self.backend_up:
+            text += f" (Ollama down, next check in {max(0.0, self.probe_at - time.time()):.0f}s)"
+        return text
@@ -1,6 +1,76 @@
 import logging
+import logging.handlers
+import gzip
+import json
+import os
+import queue
+import shutil
+import uuid
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
 
 def get_module_logger(module_name: str) -> logging.Logger:
     """Get a logger instance for the module with proper formatting."""
     logger = logging.getLogger(module_name)
-    return logger 
\ No newline at end of file
+    return logger
+
+def new_request_id() -> str:
+    """Short random ID tying together the log lines of one backend request"""
+    return uuid.uuid4().hex[:12]
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, including any fields passed with extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-based rotation that optionally gzips rotated files"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, compress: bool = True):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        if compress:
+            self.namer = lambda name: name + '.gz'
+            self.rotator = self._gzip_rotator
+
+    @staticmethod
+    def _gzip_rotator(source: str, dest: str):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+def setup_file_logging(log_dir: str = 'logs', filename: str = 'lifai.jsonl',
+                       max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5,
+                       compress: bool = True) -> logging.handlers.QueueListener:
+    """Send root logger records to a rotating JSON-lines file, written on a background thread
+
+    Returns the started listener; call stop() on shutdown to flush what's queued.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = CompressingRotatingFileHandler(
+        os.path.join(log_dir, filename), max_bytes=max_bytes, backup_count=backup_count, compress=compress
+    )
+    file_handler.setFormatter(JsonLinesFormatter())
+
+    # Unbounded so logging never blocks the caller; the listener drains it continuously
+    log_queue = queue.Queue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    logging.getLogger().addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
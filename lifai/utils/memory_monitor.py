@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter, deque
+from typing import Callable, Dict, Optional
+from lifai.utils.logger_utils import get_module_logger
+
+try:
+    import psutil
+except ImportError:  # Optional; RSS falls back to platform APIs
+    psutil = None
+
+logger = get_module_logger(__name__)
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None if it can't be read"""
+    try:
+        if psutil is not None:
+            return psutil.Process().memory_info().rss
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+    except Exception as e:
+        logger.debug(f"Could not read RSS: {e}")
+    return None
+
+def qt_widget_counts() -> Counter:
+    """Live Qt widgets grouped by the class of their top-level window"""
+    counts = Counter()
+    try:
+        from PyQt6.QtWidgets import QApplication
+        if QApplication.instance() is None:
+            return counts
+        for widget in QApplication.allWidgets():
+            counts[f"Qt:{type(widget.window()).__name__}"] += 1
+    except Exception as e:
+        logger.debug(f"Could not count Qt widgets: {e}")
+    return counts
+
+def tk_widget_counts(root) -> Counter:
+    """Live Tk widgets grouped by the title of their top-level window"""
+    counts = Counter()
+    try:
+        stack = [root]
+        while stack:
+            widget = stack.pop()
+            top = widget.winfo_toplevel()
+            counts[f"Tk:{top.title() or top.winfo_class()}"] += 1
+            stack.extend(widget.winfo_children())
+    except Exception as e:
+        logger.debug(f"Could not count Tk widgets: {e}")
+    return counts
+
+class MemoryMonitor:
+    """Periodic RSS, widget and thread counts with warnings, plus on-demand tracemalloc diffs
+
+    sample() touches widgets, so it must run on the UI thread.
+    """
+
+    def __init__(self, tk_root=None, rss_warn_mb: float = 1024, growth_warn_mb: float = 200,
+                 widget_warn: int = 5000, history: int = 2880):
+        self.tk_root = tk_root
+        self.rss_warn = rss_warn_mb * 1024 * 1024
+        self.growth_warn = growth_warn_mb * 1024 * 1024
+        self.widget_warn = widget_warn
+        self.samples = deque(maxlen=history)
+        self.counters = {}
+        self.baseline = None
+        self.warned = set()
+
+    def register_counter(self, name: str, fn: Callable[[], int]):
+        """Track a module-level size, e.g. the number of chat history entries"""
+        self.counters[name] = fn
+
+    def sample(self) -> Dict:
+        counts = qt_widget_counts()
+        if self.tk_root is not None:
+            counts.update(tk_widget_counts(self.tk_root))
+        sizes = {}
+        for name, fn in self.counters.items():
+            try:
+                sizes[name] = fn()
+            except Exception as e:
+                logger.debug(f"Memory counter '{name}' failed: {e}")
+        sample = {
+            'time': time.time(),
+            'rss': current_rss(),
+            'widgets': dict(counts),
+            'threads': threading.active_count(),
+            'sizes': sizes
+        }
+        self.samples.append(sample)
+        self.check(sample)
+        return sample
+
+    def check(self, sample: Dict):
+        """Log a warning the first time each threshold is crossed"""
+        rss = sample['rss']
+        if rss and rss > self.rss_warn:
+            self.warn('rss', f"RSS is {rss / 2**20:.0f} MB, over the {self.rss_warn / 2**20:.0f} MB threshold")
+        first = self.samples[0]
+        if rss and first['rss'] and rss - first['rss'] > self.growth_warn:
+            self.warn('growth', f"RSS grew {(rss - first['rss']) / 2**20:.0f} MB since "
+                                f"{time.strftime('%H:%M', time.localtime(first['time']))}")
+        for group, count in sample['widgets'].items():
+            if count > self.widget_warn:
+                self.warn(f"widgets:{group}", f"{group} has {count} live widgets")
+
+    def warn(self, key: str, message: str):
+        if key not in self.warned:
+            self.warned.add(key)
+            logger.warning(f"Memory: {message}")
+
+    @staticmethod
+    def snapshot() -> tracemalloc.Snapshot:
+        """A heap snapshot without tracemalloc's own and the import system's allocations"""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ])
+
+    def heap_diff(self, limit: int = 15) -> str:
+        """Diff the heap against the previous call; the first call starts tracing"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self.baseline = self.snapshot()
+            return "tracemalloc started; call again to see what grew"
+        snapshot = self.snapshot()
+        stats = snapshot.compare_to(self.baseline, 'lineno')
+        self.baseline = snapshot
+        lines = [f"Top {limit} allocation changes since the last snapshot:"]
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size_diff / 1024:+.0f} KiB ({stat.count_diff:+d} blocks) "
+                         f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        return "\n".join(lines)
+
+    def report(self) -> str:
+        if not self.samples:
+            return "No memory samples yet"
+        last = self.samples[-1]
+        first = self.samples[0]
+        lines = []
+        if last['rss']:
+            growth = (last['rss'] - first['rss']) / 2**20 if first['rss'] else 0.0
+            lines.append(f"RSS {last['rss'] / 2**20:.0f} MB ({growth:+.0f} MB since "
+                         f"{time.strftime('%H:%M', time.localtime(first['time']))}), "
+                         f"{last['threads']} threads")
+        widgets = ", ".join(f"{group} {count} ({count - first['widgets'].get(group, 0):+d})"
+                            for group, count in sorted(last['widgets'].items()))
+        lines.append(f"Widgets: {widgets or 'none'}")
+        if last['sizes']:
+            lines.append("Sizes: " + ", ".join(f"{name} {value}" for name, value in last['sizes'].items()))
+        return "\n".join(lines)
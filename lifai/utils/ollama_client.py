@@ -1,20 +1,91 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterator
+import threading
+import time
+import copy
 import requests
 import logging
-from lifai.utils.logger_utils import get_module_logger
+from lifai.utils.logger_utils import get_module_logger, new_request_id
 import json
+from lifai.utils.prompt_eval_stats import prompt_eval_stats
+from lifai.utils.request_scheduler import RequestScheduler, INTERACTIVE, PRIORITY_NAMES
+from lifai.utils.single_flight import SingleFlight, flight_key
+from lifai.utils.hedging import HedgePolicy, HedgeStats, hedged_stream
+from lifai.utils.text_segments import SegmentCache
 
 logger = get_module_logger(__name__)
 
 class OllamaClient:
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(self, base_url: str = "http://localhost:11434",
+                 scheduler: Optional[RequestScheduler] = None):
         self.base_url = base_url
+        # One connection pool per backend, so requests reuse warm keep-alive connections
+        self.session = requests.Session()
+        self.session.mount(base_url, requests.adapters.HTTPAdapter(pool_maxsize=32))
+        # Template results reused by every view, including clients of the local daemon
+        self.response_cache = SegmentCache()
+        # One scheduler per backend, shared by every module's view of the client
+        self.scheduler = scheduler or RequestScheduler()
+        # Identical concurrent generations share one backend request
+        self.single_flight = SingleFlight()
+        # Hedging is shared configuration; only views created with hedge=True use it
+        self.hedge_policy = HedgePolicy()
+        self.hedge_stats = HedgeStats()
+        self.hedging = False
+        self._fallback_clients = {}
+        self.priority = INTERACTIVE
+        self.module = 'default'
         logger.info(f"Initializing OllamaClient with base URL: {base_url}")
 
+    def for_module(self, module: str, priority: int, hedge: bool = False) -> 'OllamaClient':
+        """A view of this client whose requests are scheduled with the given priority class
+
+        With hedge=True, slow generations are raced against a copy sent to the
+        hedge policy's fallback backend or model.
+        """
+        view = copy.copy(self)
+        view.module = module
+        view.priority = priority
+        view.hedging = hedge
+        return view
+
+    def hedge_target(self, model: str):
+        """The (client, model) a hedged copy of a request for model goes to, or None"""
+        policy = self.hedge_policy
+        if not self.hedging or not policy.enabled:
+            return None
+        client = self
+        if policy.fallback_url and policy.fallback_url.rstrip('/') != self.base_url.rstrip('/'):
+            if policy.fallback_url not in self._fallback_clients:
+                self._fallback_clients[policy.fallback_url] = OllamaClient(policy.fallback_url)
+            client = self._fallback_clients[policy.fallback_url].for_module(self.module, self.priority)
+        target_model = policy.fallback_model or model
+        if client is self and target_model == model:
+            return None
+        return client, target_model
+
+    def request_fields(self, request_id: str, model: str, template_name: Optional[str],
+                       queued_at: float, started_at: Optional[float], payload: Optional[Dict] = None) -> Dict:
+        """Per-request fields attached to log records so the log file doubles as performance data"""
+        now = time.time()
+        fields = {
+            'request_id': request_id,
+            'model': model,
+            'template': template_name,
+            'caller': self.module,
+            'priority': PRIORITY_NAMES.get(self.priority, self.priority),
+            'queue_ms': round(((started_at or now) - queued_at) * 1000, 1),
+            'latency_ms': round((now - (started_at or now)) * 1000, 1)
+        }
+        if payload:
+            fields['prompt_tokens'] = payload.get('prompt_eval_count')
+            fields['eval_tokens'] = payload.get('eval_count')
+            fields['load_ms'] = round(payload.get('load_duration', 0) / 1e6, 1)
+        return fields
+
     def fetch_models(self) -> List[str]:
         try:
             logger.debug("Fetching available models from Ollama")
-            response = requests.get(f"{self.base_url}/api/tags")
+            response = self.session.get(f"{self.base_url}/api/tags")
             if response.status_code == 200:
                 models = [model['name'] for model in response.json()['models']]
                 logger.info(f"Successfully fetched {len(models)} models")
@@ -26,32 +97,227 @@ class OllamaClient:
             logger.error(f"Error fetching models: {str(e)}")
             return []
 
-    def generate_response(self, prompt: str, model: str) -> Optional[str]:
+    def generate(self, prompt: str, model: str, timeout: Optional[float] = None,
+                 system: Optional[str] = None, options: Optional[Dict] = None,
+                 template_name: Optional[str] = None, deadline: Optional[float] = None) -> Optional[Dict]:
+        """Generate a response and return the full Ollama payload, including eval counts and timings
+
+        A call identical to one already in flight at the same priority waits for that one
+        (for at most its own timeout) instead of sending its own.
+        deadline is how many seconds to wait for the first token before giving up.
+        """
+        if deadline is not None or self.hedge_target(model) is not None:
+            # Hedging needs to see the first token, so the request is streamed and reassembled
+            parts = []
+            for chunk in self.generate_stream(prompt, model, system=system, timeout=timeout, options=options,
+                                              template_name=template_name, deadline=deadline):
+                parts.append(chunk.get('response', ''))
+                if chunk.get('done'):
+                    return dict(chunk, response=''.join(parts))
+            return None
+        key = flight_key('generate', self.base_url, self.priority, model, system, prompt, options)
+        return self.single_flight.do(
+            key, lambda: self._generate(prompt, model, timeout, system, options, template_name), timeout)
+
+    def _generate(self, prompt: str, model: str, timeout: Optional[float], system: Optional[str],
+                  options: Optional[Dict], template_name: Optional[str]) -> Optional[Dict]:
+        request_id = new_request_id()
+        queued_at = time.time()
+        started_at = None
         try:
             logger.debug(f"Generating response using model: {model}")
             logger.debug(f"Prompt: {prompt[:100]}...")
 
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False  # Get complete response at once
-                }
-            )
+            payload = {
+                "model": model,
+                "prompt": prompt,
+                "stream": False  # Get complete response at once
+            }
+            if system:
+                payload["system"] = system
+            if options:
+                payload["options"] = options
+
+            with self.scheduler.slot(self.priority, self.module, model) as ticket:
+                started_at = time.time()
+                response = self.session.post(
+                    f"{self.base_url}/api/generate",
+                    json=payload,
+                    timeout=timeout
+                )
+                if response.status_code == 200:
+                    ticket.result = response.json()
 
             if response.status_code == 200:
-                # Extract just the response text from the JSON response
-                response_json = response.json()
-                result = response_json.get('response', '')
-                
-                logger.info("Successfully generated response")
-                logger.debug(f"Response length: {len(result)} characters")
-                return result.strip()
+                response_json = ticket.result
+                fields = self.request_fields(request_id, model, template_name, queued_at, started_at,
+                                             response_json)
+                logger.info(f"Generated response with {model} in {fields['latency_ms']:.0f} ms", extra=fields)
+                logger.debug(f"Response length: {len(response_json.get('response', ''))} characters")
+                return response_json
             else:
-                logger.error(f"Failed to generate response. Status code: {response.status_code}")
+                logger.error(f"Failed to generate response. Status code: {response.status_code}",
+                             extra=self.request_fields(request_id, model, template_name, queued_at, started_at))
                 return None
 
         except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            return None
\ No newline at end of file
+            logger.error(f"Error generating response: {str(e)}",
+                         extra=self.request_fields(request_id, model, template_name, queued_at, started_at))
+            return None
+
+    def generate_stream(self, prompt: str, model: str, system: Optional[str] = None,
+                        timeout: Optional[float] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        options: Optional[Dict] = None,
+                        template_name: Optional[str] = None,
+                        deadline: Optional[float] = None) -> Iterator[Dict]:
+        """Stream response chunks; setting cancel_event closes the connection, which stops generation
+
+        A stream identical to one already in flight at the same priority receives that one's
+        chunks from the start.
+        If no chunk arrives within deadline seconds the stream ends empty.
+        """
+        target = self.hedge_target(model)
+        if deadline is None and target is None:
+            yield from self._shared_stream(prompt, model, system, timeout, cancel_event, options, template_name)
+            return
+
+        def primary(cancel):
+            return self._shared_stream(prompt, model, system, timeout, cancel, options, template_name)
+
+        hedge = None
+        if target is not None:
+            client, hedge_model = target
+
+            def hedge(cancel):
+                return client._shared_stream(prompt, hedge_model, system, timeout, cancel, options,
+                                             template_name)
+
+        yield from hedged_stream(primary, hedge, self.hedge_policy.delay, deadline, cancel_event,
+                                 self.hedge_stats if hedge is not None else None, model)
+
+    def _shared_stream(self, prompt: str, model: str, system: Optional[str], timeout: Optional[float],
+                       cancel_event: Optional[threading.Event], options: Optional[Dict],
+                       template_name: Optional[str]) -> Iterator[Dict]:
+        key = flight_key('stream', self.base_url, self.priority, model, system, prompt, options)
+        yield from self.single_flight.stream(
+            key,
+            lambda shared_cancel: self._generate_stream(prompt, model, system, timeout, shared_cancel,
+                                                        options, template_name),
+            cancel_event
+        )
+
+    def _generate_stream(self, prompt: str, model: str, system: Optional[str], timeout: Optional[float],
+                         cancel_event: Optional[threading.Event], options: Optional[Dict],
+                         template_name: Optional[str]) -> Iterator[Dict]:
+        request_id = new_request_id()
+        queued_at = time.time()
+        started_at = None
+        first_chunk_at = None
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True
+        }
+        if system:
+            payload["system"] = system
+        if options:
+            payload["options"] = options
+
+        try:
+            logger.debug(f"Streaming response using model: {model}")
+            with self.scheduler.slot(self.priority, self.module, model) as ticket:
+                started_at = time.time()
+                with self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                   stream=True, timeout=timeout) as response:
+                    if response.status_code != 200:
+                        logger.error(f"Failed to stream response. Status code: {response.status_code}",
+                                     extra=self.request_fields(request_id, model, template_name,
+                                                               queued_at, started_at))
+                        return
+                    for line in response.iter_lines():
+                        if cancel_event is not None and cancel_event.is_set():
+                            logger.debug("Stream cancelled", extra={'request_id': request_id})
+                            return
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if first_chunk_at is None:
+                            first_chunk_at = time.time()
+                        if chunk.get('done'):
+                            ticket.result = chunk
+                            fields = self.request_fields(request_id, model, template_name,
+                                                         queued_at, started_at, chunk)
+                            fields['first_chunk_ms'] = round((first_chunk_at - started_at) * 1000, 1)
+                            logger.info(f"Streamed response with {model} in {fields['latency_ms']:.0f} ms",
+                                        extra=fields)
+                        yield chunk
+                        if chunk.get('done'):
+                            return
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}",
+                         extra=self.request_fields(request_id, model, template_name, queued_at, started_at))
+
+    def chat(self, messages: List[Dict], model: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Send a chat conversation and return the full Ollama payload"""
+        try:
+            logger.debug(f"Chat request with {len(messages)} messages using model: {model}")
+            with self.scheduler.slot(self.priority, self.module, model) as ticket:
+                response = self.session.post(
+                    f"{self.base_url}/api/chat",
+                    json={"model": model, "messages": messages, "stream": False},
+                    timeout=timeout
+                )
+                if response.status_code == 200:
+                    ticket.result = response.json()
+            if response.status_code == 200:
+                return ticket.result
+            logger.error(f"Failed to chat. Status code: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.error(f"Error in chat request: {str(e)}")
+            return None
+
+    def embed(self, texts: List[str], model: str, timeout: Optional[float] = None) -> Optional[List[List[float]]]:
+        """Embed a batch of texts, returning one vector per text"""
+        try:
+            with self.scheduler.slot(self.priority, self.module, model):
+                response = self.session.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": model, "input": texts},
+                    timeout=timeout
+                )
+            if response.status_code == 200:
+                return response.json().get('embeddings', [])
+            logger.error(f"Failed to embed. Status code: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.error(f"Error embedding texts: {str(e)}")
+            return None
+
+    def generate_response(self, prompt: str, model: str, deadline: Optional[float] = None) -> Optional[str]:
+        response_json = self.generate(prompt=prompt, model=model, deadline=deadline)
+        if response_json is None:
+            return None
+        # Extract just the response text from the JSON response
+        return response_json.get('response', '').strip()
+
+    def generate_template(self, template, text: str, model: str,
+                          timeout: Optional[float] = None, deadline: Optional[float] = None,
+                          reference: Optional[str] = None) -> Optional[str]:
+        """Generate from a prompt template, sending its fixed instructions as the system prompt
+
+        reference, if given, is appended to the prompt after the text, leaving the
+        system prefix unchanged.
+        """
+        # A stable system prefix lets Ollama reuse the prefix KV cache on a warm model
+        system, prompt = template.split(text)
+        extra = f"\n\n{reference}" if reference else ''
+        prompt += extra
+        response_json = self.generate(prompt=prompt, model=model, timeout=timeout, system=system,
+                                      options=template.options(text, model, extra),
+                                      template_name=template.name, deadline=deadline)
+        if response_json is None:
+            return None
+        prompt_eval_stats.record(template.name, len(system) + len(prompt), response_json)
+        return response_json.get('response', '').strip()
@@ -0,0 +1,77 @@
+import threading
+from typing import Dict, List
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+class TemplateEvalStats:
+    def __init__(self):
+        self.calls = 0
+        self.prompt_chars = 0
+        self.prompt_tokens = 0
+        self.prompt_eval_ns = 0
+        # Rates measured on calls where the whole prompt was evaluated
+        self.chars_per_token = None
+        self.ns_per_token = None
+        self.tokens_saved = 0
+        self.ns_saved = 0
+
+class PromptEvalStats:
+    """Tracks how much prompt evaluation each template costs and how much prefix reuse saves"""
+
+    def __init__(self):
+        self.templates = {}
+        self._lock = threading.Lock()
+
+    def record(self, template_name: str, prompt_chars: int, payload: Dict):
+        """Record the prompt-eval counters of one Ollama response"""
+        tokens = payload.get('prompt_eval_count', 0)
+        duration = payload.get('prompt_eval_duration', 0)
+        if not tokens:
+            return
+
+        with self._lock:
+            stats = self.templates.setdefault(template_name, TemplateEvalStats())
+            stats.calls += 1
+            stats.prompt_chars += prompt_chars
+            stats.prompt_tokens += tokens
+            stats.prompt_eval_ns += duration
+
+            if stats.chars_per_token is None:
+                # The first call for a template pays for the whole prompt
+                stats.chars_per_token = prompt_chars / tokens
+                stats.ns_per_token = duration / tokens
+                saved = 0
+            else:
+                expected = prompt_chars / stats.chars_per_token
+                saved = max(0, int(expected - tokens))
+                stats.tokens_saved += saved
+                stats.ns_saved += int(saved * stats.ns_per_token)
+
+        logger.debug(f"Prompt eval for '{template_name}': {tokens} tokens in {duration / 1e6:.0f} ms, "
+                     f"~{saved} prefix tokens reused")
+
+    def summary(self) -> List[Dict]:
+        """Per-template totals for reporting"""
+        with self._lock:
+            return [{
+                'template': name,
+                'calls': s.calls,
+                'avg_prompt_tokens': s.prompt_tokens / s.calls,
+                'avg_prompt_eval_ms': s.prompt_eval_ns / s.calls / 1e6,
+                'tokens_saved': s.tokens_saved,
+                'ms_saved': s.ns_saved / 1e6
+            } for name, s in self.templates.items()]
+
+    def report(self) -> str:
+        lines = []
+        for row in self.summary():
+            lines.append(
+                f"{row['template']}: {row['calls']} calls, {row['avg_prompt_tokens']:.0f} prompt tokens "
+                f"and {row['avg_prompt_eval_ms']:.0f} ms prompt eval on average, "
+                f"~{row['tokens_saved']} tokens / {row['ms_saved']:.0f} ms saved by prefix reuse"
+            )
+        return "\n".join(lines) or "No prompt evaluations recorded yet"
+
+# Shared by all modules
+prompt_eval_stats = PromptEvalStats()
@@ -0,0 +1,243 @@
+import os
+import time
+import threading
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+CHAT = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', CHAT: 'chat', BATCH: 'batch'}
+
+def default_concurrency() -> int:
+    """Match Ollama's OLLAMA_NUM_PARALLEL when it is set"""
+    try:
+        return max(1, int(os.environ.get('OLLAMA_NUM_PARALLEL', 4)))
+    except ValueError:
+        return 4
+
+class Ticket:
+    def __init__(self, priority: int, module: str, model: Optional[str] = None):
+        self.priority = priority
+        self.module = module
+        self.model = model
+        self.enqueued_at = time.time()
+        self.granted_at = None
+        # Whether this grant used the last slot the model had for the ticket's class
+        self.saturated = False
+        self.granted = threading.Event()
+        # The Ollama payload of the finished request, used to adapt the model's limit
+        self.result = None
+
+class AdaptiveLimit:
+    """AIMD concurrency limit for one model, driven by the timings Ollama reports
+
+    The limit grows by about one per limit's worth of completions while it is fully
+    used and each request still decodes at `tolerance` of the best tokens/s seen.
+    It shrinks by `backoff` when decoding slows below that, or when Ollama reports
+    time a request spent queued on the server. Requests granted before the last
+    decrease don't trigger another, so one overload costs one backoff.
+    """
+
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int = 32, tolerance: float = 0.7,
+                 backoff: float = 0.75, max_server_queue: float = 0.25, min_tokens: int = 8,
+                 best_half_life: float = 600.0):
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.max_server_queue = max_server_queue
+        self.min_tokens = min_tokens
+        self.best_half_life = best_half_life
+        self.best_tps = 0.0
+        self.best_at = time.time()
+        self.last_tps = 0.0
+        self.decreased_at = 0.0
+
+    @property
+    def value(self) -> int:
+        return int(self.limit)
+
+    def record(self, ticket: Ticket):
+        payload = ticket.result
+        if not payload or not payload.get('eval_duration'):
+            return
+        tokens = payload.get('eval_count', 0)
+        tps = tokens / (payload['eval_duration'] / 1e9) if tokens >= self.min_tokens else None
+        # Time the server held the request before loading, prompt eval and decode
+        accounted = sum(payload.get(k, 0) for k in ('load_duration', 'prompt_eval_duration', 'eval_duration'))
+        server_queue = max(0.0, (payload.get('total_duration', 0) - accounted) / 1e9)
+
+        if tps is not None:
+            self.last_tps = tps
+            # Slowly forget the best speed so it tracks the model's current hardware
+            now = time.time()
+            self.best_tps = max(tps, self.best_tps * 0.5 ** ((now - self.best_at) / self.best_half_life))
+            self.best_at = now
+        slow = tps is not None and tps < self.best_tps * self.tolerance
+        if slow or server_queue > self.max_server_queue:
+            if ticket.granted_at > self.decreased_at:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.decreased_at = time.time()
+                logger.info(f"Concurrency limit for {ticket.model} lowered to {self.value} "
+                            f"({tps or 0:.1f} tok/s, best {self.best_tps:.1f}; server queue {server_queue:.2f}s)")
+        elif tps is not None and ticket.saturated:
+            before = self.value
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            if self.value != before:
+                logger.info(f"Concurrency limit for {ticket.model} raised to {self.value} ({tps:.1f} tok/s)")
+
+class RequestScheduler:
+    """Grants backend slots by priority class, round-robin across modules within a class
+
+    Each model gets its own adaptive limit, starting at max_concurrency and bounded by
+    max_limit, which is also the cap across all models on this backend. Requests that
+    don't name a model are bounded only by that cap. With adaptive=False every model is
+    fixed at max_concurrency.
+    """
+
+    def __init__(self, max_concurrency: int = None, reserved_interactive: int = 1,
+                 aging_seconds: float = 30.0, adaptive: bool = True, max_limit: int = 32):
+        self.max_concurrency = max_concurrency or default_concurrency()
+        self.adaptive = adaptive
+        self.max_limit = max(max_limit, self.max_concurrency) if adaptive else self.max_concurrency
+        self.limits = {}
+        self.in_flight_by_model = {}
+        # Slots that lower classes can't take, so interactive requests never queue behind batch work
+        self.reserved_interactive = reserved_interactive
+        # Waiting this long promotes a request one class, so batch work can't starve forever
+        self.aging_seconds = aging_seconds
+        self.queues = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self.in_flight = 0
+        self.in_flight_by_class = {priority: 0 for priority in PRIORITY_NAMES}
+        self.completed = {priority: 0 for priority in PRIORITY_NAMES}
+        self.wait_times = {priority: deque(maxlen=200) for priority in PRIORITY_NAMES}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, priority: int = INTERACTIVE, module: str = 'default', model: Optional[str] = None):
+        """Block until a backend slot is granted, and hold it for the duration of the block
+
+        Yields the ticket; setting ticket.result to the Ollama payload lets the model's
+        limit adapt to how the request went.
+        """
+        ticket = Ticket(priority, module, model)
+        with self._lock:
+            self.queues[priority].setdefault(module, deque()).append(ticket)
+            self._grant_locked()
+        ticket.granted.wait()
+        try:
+            yield ticket
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.in_flight_by_class[priority] -= 1
+                self.completed[priority] += 1
+                if model is not None:
+                    self.in_flight_by_model[model] -= 1
+                    if self.adaptive:
+                        self.limit_for(model).record(ticket)
+                self._grant_locked()
+
+    def limit_for(self, model: str) -> AdaptiveLimit:
+        if model not in self.limits:
+            self.limits[model] = AdaptiveLimit(self.max_concurrency, max_limit=self.max_limit)
+        return self.limits[model]
+
+    def _free_locked(self, model: Optional[str]) -> int:
+        """Slots a request for model could take right now"""
+        free = self.max_limit - self.in_flight
+        if model is not None:
+            free = min(free, self.limit_for(model).value - self.in_flight_by_model.get(model, 0))
+        return free
+
+    def _reserve_locked(self, model: Optional[str]) -> int:
+        limit = self.limit_for(model).value if model is not None else self.max_limit
+        return self.reserved_interactive if limit > 1 else 0
+
+    def _effective_priority(self, ticket: Ticket, now: float) -> int:
+        promoted = int((now - ticket.enqueued_at) // self.aging_seconds)
+        return max(INTERACTIVE, ticket.priority - promoted)
+
+    def _next_ticket_locked(self):
+        """Pick the next grantable ticket: best effective class, then the next module in round-robin order
+
+        A ticket whose model is at its limit is passed over, so one saturated model
+        doesn't hold up requests for another. Below interactive, a ticket may not take
+        the model's last reserved slots.
+        """
+        now = time.time()
+        best = None
+        for priority, modules in self.queues.items():
+            for position, (module, tickets) in enumerate(modules.items()):
+                ticket = tickets[0]
+                effective = self._effective_priority(ticket, now)
+                free = self._free_locked(ticket.model)
+                if free <= 0 or (effective != INTERACTIVE and free <= self._reserve_locked(ticket.model)):
+                    continue
+                key = (effective, position, ticket.enqueued_at)
+                if best is None or key < best[0]:
+                    best = (key, priority, module)
+        return best
+
+    def _grant_locked(self):
+        while self.in_flight < self.max_limit:
+            best = self._next_ticket_locked()
+            if best is None:
+                return
+            _, priority, module = best
+            modules = self.queues[priority]
+            ticket = modules[module].popleft()
+            # Rotate the module to the back so modules in a class take turns
+            modules.move_to_end(module)
+            if not modules[module]:
+                del modules[module]
+            self.in_flight += 1
+            self.in_flight_by_class[priority] += 1
+            if ticket.model is not None:
+                self.in_flight_by_model[ticket.model] = self.in_flight_by_model.get(ticket.model, 0) + 1
+                reserve = self._reserve_locked(ticket.model) if priority != INTERACTIVE else 0
+                ticket.saturated = self._free_locked(ticket.model) <= reserve
+            ticket.granted_at = time.time()
+            self.wait_times[priority].append(ticket.granted_at - ticket.enqueued_at)
+            ticket.granted.set()
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Queue depth, in-flight count and wait times per priority class"""
+        with self._lock:
+            result = {}
+            for priority, name in PRIORITY_NAMES.items():
+                waits = sorted(self.wait_times[priority])
+                result[name] = {
+                    'queued': sum(len(t) for t in self.queues[priority].values()),
+                    'in_flight': self.in_flight_by_class[priority],
+                    'completed': self.completed[priority],
+                    'avg_wait': sum(waits) / len(waits) if waits else 0.0,
+                    'p95_wait': waits[int(len(waits) * 0.95)] if waits else 0.0
+                }
+            return result
+
+    def model_limits(self) -> Dict[str, Dict]:
+        """Current limit, running count and last decode speed per model"""
+        with self._lock:
+            return {model: {
+                'limit': limit.value,
+                'running': self.in_flight_by_model.get(model, 0),
+                'tps': limit.last_tps,
+                'best_tps': limit.best_tps
+            } for model, limit in self.limits.items()}
+
+    def summary(self) -> str:
+        metrics = self.metrics()
+        queued = " · ".join(f"{name} {m['queued']}" for name, m in metrics.items())
+        running = sum(m['in_flight'] for m in metrics.values())
+        waits = " · ".join(f"{name} {m['p95_wait'] * 1000:.0f}ms" for name, m in metrics.items())
+        text = f"Queued: {queued} | Running: {running}/{self.max_limit} | p95 wait: {waits}"
+        limits = " · ".join(f"{model} {m['running']}/{m['limit']}" for model, m in self.model_limits().items())
+        return f"{text} | Limits: {limits}" if limits else text
@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Tuple
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+FrameKey = Tuple[str, str, int]
+
+class SamplingProfiler:
+    """In-process statistical profiler that samples the stacks of every thread on an interval
+
+    Samples are aggregated by (thread, stack) as they arrive, so memory stays flat
+    for long sessions. Results are written as collapsed stacks (for flamegraph tools)
+    and as speedscope JSON.
+    """
+
+    def __init__(self, interval_ms: float = 5.0, max_depth: int = 128):
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at = None
+        self.stopped_at = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.stacks.clear()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        logger.info(f"Profiler started, sampling every {self.interval * 1000:.0f} ms")
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.stopped_at = time.time()
+
+    def run(self):
+        own_ident = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            frames = sys._current_frames()
+            if len(names) != len(frames):
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    name = getattr(code, 'co_qualname', code.co_name)
+                    stack.append((name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.reverse()
+                self.stacks[(names.get(ident, str(ident)), tuple(stack))] += 1
+            del frames
+            self.samples += 1
+            self.sampling_seconds += time.perf_counter() - start
+
+    @staticmethod
+    def frame_label(frame: FrameKey) -> str:
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def collapsed(self) -> List[str]:
+        """Lines of 'thread;outer;...;inner count', the format flamegraph.pl and speedscope import"""
+        lines = []
+        for (thread, stack), count in self.stacks.most_common():
+            frames = [thread] + [self.frame_label(f).replace(';', ':') for f in stack]
+            lines.append(f"{';'.join(frames)} {count}")
+        return lines
+
+    def speedscope(self) -> Dict:
+        """Speedscope file with one sampled profile per thread"""
+        frame_index = {}
+        frames = []
+        profiles = {}
+        for (thread, stack), count in self.stacks.items():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                indexes.append(frame_index[frame])
+            profile = profiles.setdefault(thread, {'samples': [], 'weights': []})
+            profile['samples'].append(indexes)
+            profile['weights'].append(count * self.interval)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f"LifAi profile {datetime.fromtimestamp(self.started_at):%Y-%m-%d %H:%M:%S}",
+            'exporter': 'lifai-sampling-profiler',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': thread,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(p['weights']),
+                'samples': p['samples'],
+                'weights': p['weights']
+            } for thread, p in profiles.items()]
+        }
+
+    def overhead(self) -> float:
+        """Share of wall time the sampler spent collecting stacks"""
+        wall = (self.stopped_at or time.time()) - self.started_at if self.started_at else 0.0
+        return self.sampling_seconds / wall if wall else 0.0
+
+    def save(self, log_dir: str = 'logs') -> Tuple[str, str]:
+        """Write collapsed stacks and speedscope JSON, returning both paths"""
+        os.makedirs(log_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started_at).strftime('%Y%m%d_%H%M%S')
+        collapsed_path = os.path.join(log_dir, f'profile_{stamp}.folded')
+        speedscope_path = os.path.join(log_dir, f'profile_{stamp}.speedscope.json')
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.collapsed()) + '\n')
+        with open(speedscope_path, 'w', encoding='utf-8') as f:
+            json.dump(self.speedscope(), f)
+        logger.info(f"Profile saved: {self.samples} samples over {self.stopped_at - self.started_at:.1f}s, "
+                    f"sampler overhead {self.overhead():.1%}. Files: {collapsed_path}, {speedscope_path}")
+        return collapsed_path, speedscope_path
@@ -0,0 +1,131 @@
+import json
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+def flight_key(*parts) -> str:
+    """Stable key for a request made of JSON-serialisable parts"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class Flight:
+    """A blocking request shared by every caller that asked for the same thing"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class StreamFlight:
+    """A streaming request whose chunks are replayed to every subscriber"""
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.subscribers = 0
+        self.cancel_event = threading.Event()
+        self.cond = threading.Condition()
+
+class SingleFlight:
+    """Coalesces identical concurrent requests so only one reaches the backend"""
+
+    def __init__(self):
+        self.flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn, or wait for the identical call already in flight and share its result
+
+        A waiter gives up after its own timeout seconds and returns None, however long
+        the leader is allowed to take.
+        """
+        with self._lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = Flight()
+                self.flights[key] = flight
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            logger.info("Coalesced a duplicate request onto the one in flight")
+            if not flight.done.wait(timeout):
+                logger.warning(f"Coalesced request timed out after {timeout:.1f}s waiting for the one in flight")
+                return None
+            return flight.result
+
+        try:
+            flight.result = fn()
+        finally:
+            with self._lock:
+                self.flights.pop(key, None)
+            flight.done.set()
+        return flight.result
+
+    def stream(self, key: str, start: Callable[[threading.Event], Iterator[Dict]],
+               cancel_event: Optional[threading.Event] = None) -> Iterator[Dict]:
+        """Yield the chunks of start(cancel_event), sharing one upstream stream between identical calls
+
+        The upstream runs on its own thread so a subscriber that stops early doesn't
+        starve the others; it is cancelled once every subscriber has left.
+        """
+        with self._lock:
+            flight = self.flights.get(key)
+            if isinstance(flight, StreamFlight) and not flight.done:
+                self.coalesced += 1
+                logger.info("Coalesced a duplicate stream onto the one in flight")
+            else:
+                flight = StreamFlight()
+                self.flights[key] = flight
+                self.leaders += 1
+                threading.Thread(target=self._pump, args=(key, flight, start),
+                                 name='single-flight', daemon=True).start()
+            with flight.cond:
+                flight.subscribers += 1
+
+        index = 0
+        try:
+            while True:
+                with flight.cond:
+                    while index >= len(flight.chunks) and not flight.done:
+                        flight.cond.wait(0.1)
+                        if cancel_event is not None and cancel_event.is_set():
+                            return
+                    chunks = flight.chunks[index:]
+                    done = flight.done
+                index += len(chunks)
+                for chunk in chunks:
+                    yield chunk
+                if done:
+                    return
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+        finally:
+            with flight.cond:
+                flight.subscribers -= 1
+                if flight.subscribers == 0 and not flight.done:
+                    flight.cancel_event.set()
+
+    def _pump(self, key: str, flight: StreamFlight, start: Callable[[threading.Event], Iterator[Dict]]):
+        try:
+            for chunk in start(flight.cancel_event):
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except Exception as e:
+            logger.error(f"Error in shared stream: {e}")
+        finally:
+            with self._lock:
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def summary(self) -> str:
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return f"Coalesced: {self.coalesced} of {total} requests"
@@ -0,0 +1,320 @@
+import os
+import re
+import mmap
+import time
+import struct
+import bisect
+import hashlib
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from lifai.utils.logger_utils import get_module_logger
+from lifai.utils.text_segments import Segment, split_sentences, join_segments
+
+logger = get_module_logger(__name__)
+
+# Word lists found on most Linux and macOS systems
+DEFAULT_WORDLISTS = ('/usr/share/dict/words', '/usr/share/dict/american-english',
+                     '/usr/share/dict/british-english', '/usr/share/dict/web2')
+
+# The index is cached next to the other local data, outside version control
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+WORD = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*")
+MAGIC = b'LSYM'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIII')
+
+def default_wordlist() -> Optional[str]:
+    return next((path for path in DEFAULT_WORDLISTS if os.path.isfile(path)), None)
+
+def word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def deletes(word: str, max_distance: int) -> set:
+    """Every string reachable from word by deleting up to max_distance characters"""
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        result |= frontier
+    return result
+
+def edit_distance(a: str, b: str) -> int:
+    """Damerau-Levenshtein distance (optimal string alignment)"""
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+class SpellIndex:
+    """SymSpell-style symmetric-delete index over a word list, memory-mapped from a binary file
+
+    The file holds the sorted hashes of every word, the sorted hashes of every delete
+    with the index of the word it came from, and the words themselves. Loading it is an
+    mmap, and lookups are binary searches, so nothing is parsed at startup.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_distance, words, entries, blob = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a spell index of version {VERSION}")
+        view = memoryview(self._map)
+        offset = HEADER.size
+        self.word_hashes = view[offset:offset + 8 * words].cast('Q')
+        offset += 8 * words
+        self.entry_hashes = view[offset:offset + 8 * entries].cast('Q')
+        offset += 8 * entries
+        self.entry_words = view[offset:offset + 4 * entries].cast('I')
+        offset += 4 * entries
+        self.word_offsets = view[offset:offset + 4 * (words + 1)].cast('I')
+        offset += 4 * (words + 1)
+        self.blob = view[offset:offset + blob]
+
+    @staticmethod
+    def build(wordlist: str, path: str, max_distance: int = 1) -> 'SpellIndex':
+        """Build the index file for a word list and open it"""
+        started = time.perf_counter()
+        with open(wordlist, encoding='utf-8', errors='ignore') as f:
+            words = sorted({line.strip().lower() for line in f if WORD.fullmatch(line.strip())})
+        word_hashes = array('Q', sorted(word_hash(w) for w in words))
+        pairs = sorted((word_hash(d), i) for i, w in enumerate(words) for d in deletes(w, max_distance))
+        entry_hashes = array('Q', (h for h, _ in pairs))
+        entry_words = array('I', (i for _, i in pairs))
+        encoded = [w.encode('utf-8') for w in words]
+        word_offsets = array('I', [0])
+        for word in encoded:
+            word_offsets.append(word_offsets[-1] + len(word))
+        blob = b''.join(encoded)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, max_distance, len(words), len(pairs), len(blob)))
+            for data in (word_hashes, entry_hashes, entry_words, word_offsets):
+                data.tofile(f)
+            f.write(blob)
+        os.replace(tmp_path, path)
+        logger.info(f"Built spell index of {len(words)} words and {len(pairs)} deletes "
+                    f"in {time.perf_counter() - started:.1f}s")
+        return SpellIndex(path)
+
+    @classmethod
+    def open_or_build(cls, wordlist: str, cache_dir: str, max_distance: int = 1) -> 'SpellIndex':
+        """Open the cached index for this word list, rebuilding it when the list has changed"""
+        stat = os.stat(wordlist)
+        tag = hashlib.sha1(f"{os.path.abspath(wordlist)}\0{stat.st_size}\0{stat.st_mtime}\0"
+                           f"{max_distance}".encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(cache_dir, f'spell_index_{tag}.bin')
+        if os.path.exists(path):
+            try:
+                return cls(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Rebuilding unreadable spell index: {e}")
+        return cls.build(wordlist, path, max_distance)
+
+    def close(self):
+        for view in (self.word_hashes, self.entry_hashes, self.entry_words, self.word_offsets, self.blob):
+            view.release()
+        self._map.close()
+        self._file.close()
+
+    @staticmethod
+    def _contains(hashes, value: int) -> bool:
+        i = bisect.bisect_left(hashes, value)
+        return i < len(hashes) and hashes[i] == value
+
+    def known(self, word: str) -> bool:
+        return self._contains(self.word_hashes, word_hash(word.lower()))
+
+    def word(self, index: int) -> str:
+        return bytes(self.blob[self.word_offsets[index]:self.word_offsets[index + 1]]).decode('utf-8')
+
+    def suggestions(self, word: str) -> List[Tuple[str, int]]:
+        """Dictionary words within max_distance edits of word, closest first"""
+        word = word.lower()
+        candidates = set()
+        for delete in deletes(word, self.max_distance):
+            value = word_hash(delete)
+            i = bisect.bisect_left(self.entry_hashes, value)
+            while i < len(self.entry_hashes) and self.entry_hashes[i] == value:
+                candidates.add(self.entry_words[i])
+                i += 1
+        scored = ((candidate, edit_distance(word, candidate)) for candidate in map(self.word, candidates))
+        return sorted((s for s in scored if s[1] <= self.max_distance), key=lambda s: (s[1], s[0]))
+
+    def check(self, text: str) -> Tuple[List[Tuple[str, int, str]], int, int]:
+        """Likely misspellings in text as (word, offset, suggestion), plus the known and total word counts
+
+        A word counts as misspelled only when it is unknown but close to a known word;
+        unknown words with nothing close, like names and jargon, are left alone, as are
+        capitalised words after the start of a sentence and acronyms.
+        """
+        flagged = []
+        known = total = 0
+        for match in WORD.finditer(text):
+            word = match.group()
+            i = match.start() - 1
+            while i >= 0 and text[i] in ' \t':
+                i -= 1
+            sentence_start = i < 0 or text[i] in '.!?\n'
+            total += 1
+            stem = word[:-2] if word.lower().endswith("'s") else word
+            if self.known(word) or self.known(stem):
+                known += 1
+                continue
+            if word.isupper() or (word[0].isupper() and not sentence_start) or len(word) < 3:
+                continue
+            suggestions = self.suggestions(word)
+            if suggestions:
+                flagged.append((word, match.start(), suggestions[0][0]))
+        return flagged, known, total
+
+class TemplateSpellStats:
+    def __init__(self):
+        self.calls = 0
+        self.skipped = 0
+        self.partial = 0
+        self.chars_total = 0
+        self.chars_skipped = 0
+        self.check_seconds = 0.0
+        # Seconds per character of full LLM calls, to estimate what skipped text would have cost
+        self.llm_seconds = 0.0
+        self.llm_chars = 0
+        self.seconds_saved = 0.0
+
+class SpellStats:
+    """Per-template skip rate and estimated latency saved by the spell pre-pass"""
+
+    def __init__(self):
+        self.templates = {}
+        self._lock = threading.Lock()
+
+    def record(self, template_name: str, chars: int, chars_skipped: int, check_seconds: float,
+               llm_seconds: float = 0.0, llm_chars: int = 0):
+        with self._lock:
+            stats = self.templates.setdefault(template_name, TemplateSpellStats())
+            stats.calls += 1
+            stats.chars_total += chars
+            stats.chars_skipped += chars_skipped
+            stats.check_seconds += check_seconds
+            if chars_skipped == chars:
+                stats.skipped += 1
+            elif chars_skipped:
+                stats.partial += 1
+            if llm_chars:
+                stats.llm_seconds += llm_seconds
+                stats.llm_chars += llm_chars
+            if chars_skipped and stats.llm_chars:
+                stats.seconds_saved += chars_skipped * stats.llm_seconds / stats.llm_chars
+
+    def report(self) -> str:
+        with self._lock:
+            lines = [
+                f"{name}: {s.skipped} of {s.calls} calls skipped, {s.partial} narrowed to flagged sentences, "
+                f"{s.chars_skipped / s.chars_total if s.chars_total else 0:.0%} of text not sent, "
+                f"~{s.seconds_saved:.1f}s saved, pre-pass {s.check_seconds / s.calls * 1e6:.0f} µs on average"
+                for name, s in self.templates.items()
+            ]
+        return "\n".join(lines) or "No spell pre-pass runs recorded yet"
+
+# Shared by all modules
+spell_stats = SpellStats()
+
+class SpellPrepass:
+    """Runs a spelling template only on the sentences that need it
+
+    Only templates whose profile enables spell_prepass use it, since a prompt that also
+    fixes grammar or style has work to do on text the dictionary finds clean.
+    Text with no likely misspellings comes back unchanged without an LLM call. Otherwise
+    only the flagged sentences are sent, unless they make up most of the text. Text the
+    dictionary mostly doesn't recognise, such as another language, is sent whole.
+    """
+
+    def __init__(self, wordlist: Optional[str] = None, cache_dir: str = DATA_DIR, min_known: float = 0.6,
+                 max_share: float = 0.6, max_workers: int = 4):
+        self.wordlist = wordlist or default_wordlist()
+        self.cache_dir = cache_dir
+        self.min_known = min_known
+        self.max_share = max_share
+        self.max_workers = max_workers
+        self.index = None
+        if self.wordlist:
+            threading.Thread(target=self.load, name='spell-index', daemon=True).start()
+        else:
+            logger.info("No word list found, spell pre-pass disabled")
+
+    def load(self):
+        try:
+            self.index = SpellIndex.open_or_build(self.wordlist, self.cache_dir)
+        except Exception as e:
+            logger.error(f"Could not load spell index from {self.wordlist}: {e}")
+
+    @staticmethod
+    def applies(template) -> bool:
+        return template.profile.spell_prepass
+
+    def run(self, template, text: str, generate: Callable[[str], Optional[str]]) -> Optional[str]:
+        """Correct text with generate(text), sending as little of it as the dictionary allows"""
+        if self.index is None:
+            return generate(text)
+        started = time.perf_counter()
+        sentences = split_sentences(text)
+        flagged_sentences = []
+        known = total = 0
+        for i, sentence in enumerate(sentences):
+            flagged, sentence_known, sentence_total = self.index.check(sentence.text)
+            known += sentence_known
+            total += sentence_total
+            if flagged:
+                flagged_sentences.append(i)
+                logger.debug(f"Possible misspellings: {', '.join(f'{w}→{s}' for w, _, s in flagged)}")
+        check_seconds = time.perf_counter() - started
+
+        if not total or known / total < self.min_known:
+            return self.generate_whole(template, text, generate, check_seconds)
+        if not flagged_sentences:
+            spell_stats.record(template.name, len(text), len(text), check_seconds)
+            logger.info(f"Spell pre-pass found nothing to fix in {check_seconds * 1e6:.0f} µs, skipped the model")
+            return text
+        flagged_chars = sum(len(sentences[i].text) for i in flagged_sentences)
+        if flagged_chars > len(text) * self.max_share:
+            return self.generate_whole(template, text, generate, check_seconds)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='spell') as executor:
+            results = dict(zip(flagged_sentences, executor.map(
+                lambda i: generate(sentences[i].text.strip()), flagged_sentences)))
+        if not all(results.values()):
+            logger.warning("Spell pre-pass could not correct every flagged sentence, sending the whole text")
+            return self.generate_whole(template, text, generate, check_seconds)
+        corrected = []
+        for i, sentence in enumerate(sentences):
+            output = results.get(i)
+            if output is not None:
+                leading = sentence.text[:len(sentence.text) - len(sentence.text.lstrip())]
+                corrected.append(Segment(leading + output.strip(), sentence.trailing))
+            else:
+                corrected.append(sentence)
+        spell_stats.record(template.name, len(text), len(text) - flagged_chars, check_seconds)
+        logger.info(f"Spell pre-pass sent {len(flagged_sentences)} of {len(sentences)} sentences to the model")
+        return join_segments(corrected)
+
+    def generate_whole(self, template, text: str, generate: Callable[[str], Optional[str]],
+                       check_seconds: float) -> Optional[str]:
+        started = time.perf_counter()
+        result = generate(text)
+        if result is not None:
+            spell_stats.record(template.name, len(text), 0, check_seconds,
+                               time.perf_counter() - started, len(text))
+        return result
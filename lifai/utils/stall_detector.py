@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import threading
+import traceback
+from collections import Counter
+from typing import Dict, List, Optional
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# Frames from these files identify where LifAi code was running
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return getattr(code, 'co_qualname', code.co_name)
+
+def call_site(frame, depth: int = 2) -> str:
+    """Describe a stack by its innermost LifAi call chain
+
+    For example 'OllamaClient.generate_response ← ChatWindow.send_message'.
+    Consecutive frames of the same class or module collapse into the outermost one,
+    which is the entry point that the next caller used.
+    """
+    groups = []
+    owner = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PACKAGE_DIR) and filename != __file__:
+            name = frame_name(frame)
+            frame_owner = name.rsplit('.', 1)[0] if '.' in name else filename
+            if frame_owner == owner:
+                groups[-1] = name
+            elif len(groups) == depth:
+                break
+            else:
+                groups.append(name)
+                owner = frame_owner
+        frame = frame.f_back
+    return ' ← '.join(groups) or '<outside LifAi code>'
+
+class StallSite:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.stack = ''
+
+class StallDetector:
+    """Watchdog that notices when UI heartbeats stop and records what the main thread was doing
+
+    Each event loop posts heartbeat(source) on a fixed interval. If a source is late by
+    more than threshold_ms, the watchdog samples the main thread's stack until the
+    heartbeat resumes, then attributes the stall to the call site seen most often.
+    """
+
+    def __init__(self, threshold_ms: float = 100, check_interval_ms: float = 20,
+                 main_thread_id: Optional[int] = None):
+        self.threshold = threshold_ms / 1000
+        self.check_interval = check_interval_ms / 1000
+        self.main_thread_id = main_thread_id or threading.main_thread().ident
+        self.intervals = {}
+        self.beats = {}
+        self.sites = {}
+        self.stall_count = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, source: str, interval_ms: float):
+        """Declare a heartbeat source and how often it beats"""
+        self.intervals[source] = interval_ms / 1000
+        self.beats[source] = time.perf_counter()
+
+    def heartbeat(self, source: str):
+        self.beats[source] = time.perf_counter()
+
+    def start(self):
+        """Start watching; call from the running event loop, as every source counts as beating now"""
+        if self._thread is None:
+            now = time.perf_counter()
+            for source in self.beats:
+                self.beats[source] = now
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.watch, name='stall-detector', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def late_by(self) -> float:
+        """How far past its expected beat the most overdue source is, in seconds"""
+        now = time.perf_counter()
+        return max((now - self.beats[s] - interval for s, interval in list(self.intervals.items())),
+                   default=0.0)
+
+    def watch(self):
+        while not self._stop.wait(self.check_interval):
+            late = self.late_by()
+            if late < self.threshold:
+                continue
+
+            # Stalled: sample the main thread until the heartbeats catch up
+            started = time.perf_counter() - late
+            samples = Counter()
+            stacks = {}
+            while not self._stop.is_set() and self.late_by() >= 0:
+                frame = sys._current_frames().get(self.main_thread_id)
+                if frame is not None:
+                    site = call_site(frame)
+                    samples[site] += 1
+                    if site not in stacks:
+                        stacks[site] = ''.join(traceback.format_stack(frame))
+                    del frame
+                time.sleep(self.check_interval)
+            if samples:
+                self.record(samples, stacks, (time.perf_counter() - started) * 1000)
+
+    def record(self, samples: Counter, stacks: Dict[str, str], duration_ms: float):
+        site, _ = samples.most_common(1)[0]
+        with self._lock:
+            self.stall_count += 1
+            stats = self.sites.setdefault(site, StallSite())
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.stack = stacks[site]
+        logger.warning(f"UI stalled for {duration_ms:.0f} ms in {site}")
+
+    def summary(self) -> List[Dict]:
+        """Stall totals per call site, worst first"""
+        with self._lock:
+            rows = [{
+                'site': site,
+                'count': s.count,
+                'total_ms': s.total_ms,
+                'max_ms': s.max_ms,
+                'stack': s.stack
+            } for site, s in self.sites.items()]
+        return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
+    def report(self, limit: int = 10) -> str:
+        rows = self.summary()[:limit]
+        if not rows:
+            return "No UI stalls recorded"
+        lines = [f"{self.stall_count} UI stalls over {self.threshold * 1000:.0f} ms:"]
+        for row in rows:
+            lines.append(f"  {row['total_ms']:.0f} ms total, {row['count']}x, max {row['max_ms']:.0f} ms: "
+                         f"{row['site']}")
+        worst = rows[0]
+        lines.append(f"Stack of the worst site:\n{worst['stack'].rstrip()}")
+        return "\n".join(lines)
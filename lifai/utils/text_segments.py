@@ -0,0 +1,186 @@
+import re
+import difflib
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple, Optional, Callable
+from lifai.utils.logger_utils import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# Sentence end: Latin terminal punctuation followed by whitespace, or CJK terminal punctuation
+SENTENCE_END = re.compile(r'(?<=[.!?])[\"\'”’)\]]*\s+|(?<=[。！？])[”’」』）]*\s*')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+WORD_TOKEN = re.compile(r'\s+|\w+|[^\w\s]')
+
+class Segment:
+    """A piece of text plus the whitespace that followed it in the original"""
+    def __init__(self, text: str, trailing: str = ''):
+        self.text = text
+        self.trailing = trailing
+
+    def __repr__(self):
+        return f"Segment({self.text[:30]!r}, {self.trailing!r})"
+
+def _split_keep(pattern: re.Pattern, text: str) -> List[Tuple[str, str]]:
+    """Split text on a pattern, keeping each separator with the piece before it"""
+    pieces = []
+    pos = 0
+    for match in pattern.finditer(text):
+        pieces.append((text[pos:match.start()], match.group()))
+        pos = match.end()
+    pieces.append((text[pos:], ''))
+    return [(body, sep) for body, sep in pieces if body or sep]
+
+def split_sentences(text: str) -> List[Segment]:
+    """Split text into sentences, keeping the separators for exact reassembly"""
+    segments = []
+    for body, sep in _split_keep(SENTENCE_END, text):
+        if body.strip():
+            segments.append(Segment(body, sep))
+        elif segments:
+            segments[-1].trailing += body + sep
+    return segments
+
+def split_segments(text: str, max_chars: int = 600) -> List[Segment]:
+    """Split text into paragraphs, breaking long ones into groups of whole sentences"""
+    leading = text[:len(text) - len(text.lstrip())]
+    segments = []
+    for body, sep in _split_keep(PARAGRAPH_BREAK, text.lstrip()):
+        if not body.strip():
+            if segments:
+                segments[-1].trailing += body + sep
+            continue
+        if len(body) <= max_chars:
+            segments.append(Segment(body, sep))
+            continue
+        group = None
+        for sentence in split_sentences(body):
+            if group and len(group.text) + len(group.trailing) + len(sentence.text) <= max_chars:
+                group.text += group.trailing + sentence.text
+                group.trailing = sentence.trailing
+            else:
+                group = Segment(sentence.text, sentence.trailing)
+                segments.append(group)
+        if segments:
+            segments[-1].trailing += sep
+    if segments and leading:
+        segments[0].text = leading + segments[0].text
+    return segments
+
+def join_segments(segments: List[Segment]) -> str:
+    return ''.join(s.text + s.trailing for s in segments)
+
+def word_diff(old: str, new: str) -> List[Tuple[str, str]]:
+    """Word-level diff as (op, text) pairs where op is 'equal', 'delete' or 'insert'"""
+    old_tokens = WORD_TOKEN.findall(old)
+    new_tokens = WORD_TOKEN.findall(new)
+    result = []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            result.append(('equal', ''.join(old_tokens[i1:i2])))
+            continue
+        if op in ('delete', 'replace'):
+            result.append(('delete', ''.join(old_tokens[i1:i2])))
+        if op in ('insert', 'replace'):
+            result.append(('insert', ''.join(new_tokens[j1:j2])))
+    return result
+
+class SegmentCache:
+    """Bounded LRU of segment results keyed by template version, model and segment text"""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(template, model: str, text: str) -> str:
+        raw = f"{template.name}\0{template.version}\0{model}\0{text.strip()}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+class SegmentedRewriter:
+    """Rewrites long text segment by segment, skipping segments already processed"""
+
+    def __init__(self, ollama_client, cache: Optional[SegmentCache] = None, max_workers: int = 4):
+        self.ollama_client = ollama_client
+        self.cache = cache or getattr(ollama_client, 'response_cache', None) or SegmentCache()
+        self.max_workers = max_workers
+        self.last_stats = {}
+
+    def rewrite(self, template, text: str, model: str, max_chars: int = 600,
+                on_progress: Optional[Callable[[int, int], None]] = None) -> str:
+        """Rewrite text with a template; on_progress(done, total) runs in the calling thread"""
+        segments = split_segments(text, max_chars=max_chars)
+        outputs = [None] * len(segments)
+        pending = {}
+        for i, segment in enumerate(segments):
+            cached = self.cache.get(SegmentCache.key(template, model, segment.text))
+            if cached is not None:
+                outputs[i] = cached
+            else:
+                pending[i] = segment
+
+        done = len(segments) - len(pending)
+        if on_progress:
+            on_progress(done, len(segments))
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='segment') as executor:
+                futures = {
+                    executor.submit(self.ollama_client.generate_template,
+                                    template=template, text=segment.text.strip(), model=model): i
+                    for i, segment in pending.items()
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Error rewriting segment {i}: {e}")
+                        result = None
+                    if result:
+                        outputs[i] = result
+                        self.cache.put(SegmentCache.key(template, model, segments[i].text), result)
+                    done += 1
+                    if on_progress:
+                        on_progress(done, len(segments))
+
+        # Reassemble in order, keeping the original whitespace and any failed segment as-is
+        rewritten = []
+        for segment, output in zip(segments, outputs):
+            leading = segment.text[:len(segment.text) - len(segment.text.lstrip())]
+            body = output.strip() if output is not None else segment.text.strip()
+            rewritten.append(Segment(leading + body, segment.trailing))
+
+        self.last_stats = {
+            'segments': len(segments),
+            'cached': len(segments) - len(pending),
+            'sent': len(pending),
+            'chars_sent': sum(len(s.text) for s in pending.values()),
+            'failed': sum(1 for o in outputs if o is None)
+        }
+        logger.info(f"Segmented rewrite: {self.last_stats['sent']} of {self.last_stats['segments']} segments "
+                    f"sent ({self.last_stats['chars_sent']} of {len(text)} characters), "
+                    f"{self.last_stats['cached']} reused from cache")
+        return join_segments(rewritten)
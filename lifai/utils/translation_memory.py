@@ -0,0 +1,249 @@
+import os
+import re
+import time
+import sqlite3
+import difflib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from lifai.utils.logger_utils import get_module_logger
+from lifai.utils.text_segments import Segment, split_segments, join_segments
+
+logger = get_module_logger(__name__)
+
+DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data',
+                                            'translation_memory.sqlite3'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    template TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    source_hash TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    gram_count INTEGER NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    UNIQUE (template, version, source_hash)
+);
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT NOT NULL,
+    segment_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS grams_gram ON grams (gram);
+"""
+
+REFERENCE = ("For reference, a similar sentence was translated like this before. Reuse its wording "
+             "where it fits, but translate the text above exactly, including any difference in "
+             "meaning:\n{source}\n{target}")
+
+NUMBER = re.compile(r'\d+(?:[.,]\d+)*')
+
+def normalize(text: str) -> str:
+    """Collapse whitespace so reflowed copies of a sentence share one entry"""
+    return ' '.join(text.split())
+
+def source_hash(text: str) -> str:
+    return hashlib.sha1(normalize(text).encode('utf-8')).hexdigest()
+
+def trigrams(text: str) -> set:
+    """Character trigrams of the lower-cased sentence, which work for CJK text as well as Latin"""
+    padded = f"  {normalize(text).lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TranslationStats:
+    """Per-template counts of segments served from memory versus sent to the model"""
+
+    def __init__(self):
+        self.templates = {}
+        self._lock = threading.Lock()
+
+    def record(self, template_name: str, exact: int, fuzzy: int, sent: int, chars: int, chars_sent: int):
+        with self._lock:
+            totals = self.templates.setdefault(template_name, [0, 0, 0, 0, 0])
+            for i, value in enumerate((exact, fuzzy, sent, chars, chars_sent)):
+                totals[i] += value
+
+    def report(self) -> str:
+        with self._lock:
+            lines = []
+            for name, (exact, fuzzy, sent, chars, chars_sent) in self.templates.items():
+                segments = exact + sent
+                lines.append(f"{name}: {segments} segments, {exact} served from memory, {sent} sent "
+                             f"({fuzzy} with a close match as reference); "
+                             f"{1 - chars_sent / chars if chars else 0:.0%} of characters not translated again")
+        return "\n".join(lines) or "No translations recorded yet"
+
+# Shared by all modules
+translation_stats = TranslationStats()
+
+class TranslationMemory:
+    """Sentence-level translation memory in SQLite, keyed by template and template version
+
+    Each translation template (one per target language) has its own memory, and
+    editing a template starts a new one, since its tone or wording may have changed. A
+    sentence seen before is served from its stored translation. The rest are sent to
+    the model, and their translations are stored for next time. A sentence close to a
+    stored one (trigram similarity at or above fuzzy_threshold, with the same numbers)
+    is still sent, with the stored pair as a reference to adapt: a small edit such as
+    an added "not" can invert the meaning, so a fuzzy match is never served as is.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_PATH, fuzzy_threshold: float = 0.92,
+                 max_workers: int = 4, candidates: int = 20):
+        self.db_path = db_path
+        self.fuzzy_threshold = fuzzy_threshold
+        self.max_workers = max_workers
+        self.candidates = candidates
+        self.pruned = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(segments)")]
+        if columns and 'version' not in columns:
+            # Entries from before template versions were tracked can't be matched to one
+            logger.info("Clearing translation memory stored without template versions")
+            self.db.executescript("DROP TABLE segments; DROP TABLE grams;")
+        self.db.executescript(SCHEMA)
+
+    @staticmethod
+    def applies(template) -> bool:
+        # The built-in defaults include Translate templates; the shipped prompts.json does not
+        return template.name.lower().startswith('translate')
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def prune(self, template):
+        """Delete entries stored under earlier versions of template, once per version per session"""
+        if (template.name, template.version) in self.pruned:
+            return
+        self.pruned.add((template.name, template.version))
+        with self._lock:
+            old = "SELECT id FROM segments WHERE template = ? AND version < ?"
+            self.db.execute("BEGIN")
+            self.db.execute(f"DELETE FROM grams WHERE segment_id IN ({old})", (template.name, template.version))
+            cursor = self.db.execute(f"DELETE FROM segments WHERE id IN ({old})", (template.name, template.version))
+            self.db.execute("COMMIT")
+        if cursor.rowcount:
+            logger.info(f"Removed {cursor.rowcount} translations stored for earlier versions of {template.name}")
+
+    def exact(self, template, text: str) -> Optional[str]:
+        with self._lock:
+            row = self.db.execute("SELECT id, target FROM segments WHERE template = ? AND version = ? "
+                                  "AND source_hash = ?",
+                                  (template.name, template.version, source_hash(text))).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE segments SET uses = uses + 1, used_at = ? WHERE id = ?", (time.time(), row[0]))
+        return row[1]
+
+    def fuzzy(self, template, text: str) -> Optional[Tuple[str, str, float]]:
+        """The most similar stored sentence, its translation and its similarity, if close enough"""
+        grams = trigrams(text)
+        # Very short sentences match too loosely; very long ones would exceed SQLite's parameter limit
+        if not 4 <= len(grams) <= 900:
+            return None
+        placeholders = ','.join('?' * len(grams))
+        with self._lock:
+            rows = self.db.execute(
+                f"SELECT s.id, s.source, s.target, s.gram_count, COUNT(*) AS shared FROM grams g "
+                f"JOIN segments s ON s.id = g.segment_id "
+                f"WHERE g.gram IN ({placeholders}) AND s.template = ? AND s.version = ? "
+                f"GROUP BY s.id ORDER BY shared DESC LIMIT ?",
+                (*grams, template.name, template.version, self.candidates)).fetchall()
+        numbers = NUMBER.findall(text)
+        best = None
+        for segment_id, source, target, gram_count, shared in rows:
+            # Dice coefficient over trigrams bounds the similarity cheaply before the exact ratio
+            if 2 * shared / (len(grams) + gram_count) < self.fuzzy_threshold:
+                continue
+            if NUMBER.findall(source) != numbers:
+                continue
+            ratio = difflib.SequenceMatcher(None, normalize(text), normalize(source)).ratio()
+            if ratio >= self.fuzzy_threshold and (best is None or ratio > best[3]):
+                best = (segment_id, source, target, ratio)
+        if best is None:
+            return None
+        with self._lock:
+            self.db.execute("UPDATE segments SET uses = uses + 1, used_at = ? WHERE id = ?", (time.time(), best[0]))
+        return best[1:]
+
+    def store(self, template, source: str, target: str):
+        grams = trigrams(source)
+        now = time.time()
+        with self._lock:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO segments (template, version, source_hash, source, target, gram_count, "
+                "created_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (template.name, template.version, source_hash(source), normalize(source), target,
+                 len(grams), now, now))
+            if cursor.rowcount:
+                self.db.executemany("INSERT INTO grams (gram, segment_id) VALUES (?, ?)",
+                                    [(gram, cursor.lastrowid) for gram in grams])
+
+    def translate(self, template, text: str,
+                  generate: Callable[[str, Optional[str]], Optional[str]]) -> Optional[str]:
+        """Translate text sentence by sentence, serving what the memory knows and sending the rest
+
+        generate(text, reference) translates one sentence; reference, when not None, is a
+        similar sentence and its stored translation for the model to adapt. Returns None if
+        any segment could not be translated.
+        """
+        self.prune(template)
+        # A zero size limit splits every paragraph into single sentences
+        segments = split_segments(text, max_chars=0)
+        outputs: List[Optional[str]] = [None] * len(segments)
+        pending = {}
+        references = {}
+        exact = fuzzy = 0
+        for i, segment in enumerate(segments):
+            source = segment.text.strip()
+            outputs[i] = self.exact(template, source)
+            if outputs[i] is not None:
+                exact += 1
+                continue
+            # Repeats within the same document are translated once
+            key = normalize(source)
+            if key not in pending:
+                match = self.fuzzy(template, source)
+                if match is not None:
+                    references[key] = REFERENCE.format(source=match[0], target=match[1])
+                    fuzzy += 1
+                    logger.debug(f"Fuzzy translation memory match ({match[2]:.0%}) for: {source[:60]}")
+            pending.setdefault(key, []).append(i)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='translate') as executor:
+                results = dict(zip(pending, executor.map(generate, pending,
+                                                          [references.get(source) for source in pending])))
+            for source, result in results.items():
+                if not result:
+                    continue
+                self.store(template, source, result.strip())
+                for i in pending[source]:
+                    outputs[i] = result.strip()
+            failed = sum(1 for result in results.values() if not result)
+            if failed:
+                # A partly translated document would mix languages; what did translate is
+                # stored, so trying again only sends the failed segments
+                logger.warning(f"Translation failed for {failed} of {len(pending)} segments sent to the model")
+                return None
+
+        # Reassemble in order, keeping the original whitespace
+        translated = []
+        for segment, output in zip(segments, outputs):
+            leading = segment.text[:len(segment.text) - len(segment.text.lstrip())]
+            translated.append(Segment(leading + output, segment.trailing))
+
+        sent_indexes = [i for indexes in pending.values() for i in indexes]
+        chars_sent = sum(len(source) for source in pending)
+        translation_stats.record(template.name, exact, fuzzy, len(sent_indexes), len(text), chars_sent)
+        logger.info(f"Translation memory: {exact} exact matches, {len(pending)} of {len(segments)} "
+                    f"segments sent to the model ({fuzzy} with a reference)")
+        return join_segments(translated)